@@ -0,0 +1,223 @@
+"""
+Rating analytics for the Movie app: histograms, percentiles, spread,
+per-decade and per-year breakdowns and the rating/year correlation.
+
+Only the year and rating columns are loaded, streamed from SQLite in
+chunks into two typed arrays (12 bytes per movie). Every figure is then
+computed in vectorized passes over the arrays with NumPy when it is
+installed (imported lazily, see `storage.catalog.numpy`), or with the
+standard library otherwise - same results either way.
+
+Compare with the pure-Python loops over the old dict listing:
+    python -m benchmarks.bench_analytics --rows 1000000
+"""
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+
+import storage.movie_storage_sql as storage
+from instrumentation import timed, count
+from storage.catalog import numpy, numeric_values
+from config.settings import ANALYTICS_CHUNK_SIZE, ANALYTICS_HISTOGRAM_BINS, ANALYTICS_PERCENTILES
+
+
+@timed("analytics.load_columns")
+def load_columns(chunk_size=ANALYTICS_CHUNK_SIZE):
+    """
+    Stream the year and rating columns into typed arrays.
+    Raw OMDb strings left by older versions are coerced (see
+    `storage.catalog.numeric_values`); rows that cannot be are skipped.
+    :param chunk_size: Rows fetched per round trip.
+    :return: Tuple (years, ratings) of array("i") and array("d").
+    """
+    years, ratings = array("i"), array("d")
+    with storage.engine.connect() as connection:
+        # Plain DB-API cursor: SQLAlchemy's Row wrappers would double the load time
+        cursor = connection.connection.cursor()
+        try:
+            cursor.execute("SELECT year, rating FROM movies")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                try:
+                    years.fromlist(list(map(itemgetter(0), rows)))
+                    ratings.fromlist(list(map(itemgetter(1), rows)))
+                except TypeError:
+                    # A non-numeric value: fromlist() left the failing array unchanged
+                    del years[len(ratings):]
+                    numbers = [pair for pair in (numeric_values(year, rating) for year, rating in rows)
+                               if pair is not None]
+                    years.fromlist(list(map(itemgetter(0), numbers)))
+                    ratings.fromlist(list(map(itemgetter(1), numbers)))
+        finally:
+            cursor.close()
+    count("storage.rows_read", len(ratings))
+    return years, ratings
+
+
+def histogram(ratings, bins=ANALYTICS_HISTOGRAM_BINS, low=0.0, high=10.0):
+    """
+    Count ratings in equal-width bins; the last bin includes `high`.
+    :param ratings: Sequence of ratings.
+    :param bins: Number of bins.
+    :param low: Lower edge of the first bin.
+    :param high: Upper edge of the last bin.
+    :return: List of {"from", "to", "count"} dicts.
+    """
+    width = (high - low) / bins
+    edges = [low + index * width for index in range(bins)] + [high]
+    np = numpy()
+    if np is not None:
+        counts = np.histogram(np.frombuffer(ratings, dtype=np.float64), bins=edges)[0].tolist()
+    else:
+        # Bin counts are differences of the bin edges' positions in the sorted ratings
+        ordered = sorted(ratings)
+        positions = [bisect_left(ordered, edge) for edge in edges[:-1]] + [bisect_right(ordered, high)]
+        counts = [positions[index + 1] - positions[index] for index in range(bins)]
+    return [{"from": edges[index], "to": edges[index + 1], "count": counts[index]} for index in range(bins)]
+
+
+def percentiles(ratings, points=ANALYTICS_PERCENTILES):
+    """
+    Percentiles with linear interpolation between the closest ranks
+    (NumPy's default method).
+    :param ratings: Non-empty sequence of ratings.
+    :param points: Percentiles to compute (0-100).
+    :return: Dict percentile -> rating.
+    """
+    np = numpy()
+    if np is not None:
+        values = np.percentile(np.frombuffer(ratings, dtype=np.float64), points)
+        return {point: float(value) for point, value in zip(points, values)}
+    ordered = sorted(ratings)
+    result = {}
+    for point in points:
+        position = (len(ordered) - 1) * point / 100
+        below = math.floor(position)
+        above = min(below + 1, len(ordered) - 1)
+        result[point] = ordered[below] + (ordered[above] - ordered[below]) * (position - below)
+    return result
+
+
+def spread(ratings):
+    """
+    Mean and population standard deviation.
+    :param ratings: Non-empty sequence of ratings.
+    :return: Dict with "mean" and "stdev".
+    """
+    np = numpy()
+    if np is not None:
+        values = np.frombuffer(ratings, dtype=np.float64)
+        return {"mean": float(values.mean()), "stdev": float(values.std())}
+    mean = math.fsum(ratings) / len(ratings)
+    return {"mean": mean, "stdev": math.sqrt(math.fsum((rating - mean) ** 2 for rating in ratings) / len(ratings))}
+
+
+def group_by(years, ratings, bucket=1):
+    """
+    Count, mean, min and max rating per year (or per group of years).
+    :param years: Sequence of years.
+    :param ratings: Sequence of ratings (same length).
+    :param bucket: Group width in years (10 = decades).
+    :return: List of {"from", "count", "mean", "min", "max"} dicts, oldest first.
+    """
+    np = numpy()
+    if np is not None:
+        keys = np.frombuffer(years, dtype=np.int32) // bucket * bucket
+        values = np.frombuffer(ratings, dtype=np.float64)
+        order = np.argsort(keys, kind="stable")
+        keys, values = keys[order], values[order]
+        groups, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+        sums = np.add.reduceat(values, starts)
+        lows, highs = np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts)
+        return [{"from": int(group), "count": int(size), "mean": float(total / size),
+                 "min": float(low), "max": float(high)}
+                for group, size, total, low, high in zip(groups, counts, sums, lows, highs)]
+    groups = _groups(years, ratings, bucket)
+    return [{"from": key, "count": len(values), "mean": math.fsum(values) / len(values),
+             "min": min(values), "max": max(values)} for key, values in sorted(groups.items())]
+
+
+def regroup(groups, bucket):
+    """
+    Merge `group_by()` results into wider groups (e.g. years into decades)
+    without another pass over the movies.
+    :param groups: Result of group_by().
+    :param bucket: New group width in years; a multiple of the old one.
+    :return: List in the same shape as group_by().
+    """
+    merged = []
+    for group in groups:
+        key = group["from"] // bucket * bucket
+        if merged and merged[-1]["from"] == key:
+            last = merged[-1]
+            total = last["mean"] * last["count"] + group["mean"] * group["count"]
+            last["count"] += group["count"]
+            last["mean"] = total / last["count"]
+            last["min"], last["max"] = min(last["min"], group["min"]), max(last["max"], group["max"])
+        else:
+            merged.append({**group, "from": key})
+    return merged
+
+
+def _groups(years, ratings, bucket):
+    """Ratings per year group, for the standard library code paths."""
+    groups = {}
+    for year, rating in zip(years, ratings):
+        key = year // bucket * bucket
+        values = groups.get(key)
+        if values is None:
+            groups[key] = values = array("d")
+        values.append(rating)
+    return groups
+
+
+def correlation(years, ratings, by_year=None):
+    """
+    Pearson correlation of rating and release year.
+    :param years: Sequence of years.
+    :param ratings: Sequence of ratings (same length).
+    :param by_year: Optional `group_by(years, ratings)` result to reuse.
+    :return: Float from -1 to 1, or None if either column is constant.
+    """
+    np = numpy()
+    if np is not None:
+        x = np.frombuffer(years, dtype=np.int32).astype(np.float64)
+        y = np.frombuffer(ratings, dtype=np.float64)
+        x, y = x - x.mean(), y - y.mean()
+        denominator = math.sqrt(float((x * x).sum()) * float((y * y).sum()))
+        return float((x * y).sum()) / denominator if denominator else None
+    # Years take few distinct values: sum the cross products per year
+    size = len(ratings)
+    groups = [(group["from"], group["count"], group["mean"]) for group in by_year or group_by(years, ratings)]
+    mean_x = math.fsum(year * group_size for year, group_size, _ in groups) / size
+    mean_y = math.fsum(ratings) / size
+    covariance = math.fsum((year - mean_x) * group_size * (group_mean - mean_y)
+                           for year, group_size, group_mean in groups)
+    denominator = math.sqrt(math.fsum(group_size * (year - mean_x) ** 2 for year, group_size, _ in groups) *
+                            math.fsum((rating - mean_y) ** 2 for rating in ratings))
+    return covariance / denominator if denominator else None
+
+
+@timed("analytics.report")
+def report(columns=None, points=ANALYTICS_PERCENTILES, bins=ANALYTICS_HISTOGRAM_BINS):
+    """
+    Compute the extended statistics report.
+    :param columns: Optional (years, ratings) arrays (default: load_columns()).
+    :param points: Percentiles to compute.
+    :param bins: Histogram bins over the 0-10 rating scale.
+    :return: Dict with "count", "mean", "stdev", "percentiles", "histogram",
+        "decades", "years" and "year_rating_correlation"; only "count" (0) if empty.
+    """
+    years, ratings = columns if columns is not None else load_columns()
+    if not ratings:
+        return {"count": 0}
+    # Without NumPy, sort once: the percentile and histogram sorts then run in O(n)
+    ordered = ratings if numpy() is not None else array("d", sorted(ratings))
+    by_year = group_by(years, ratings)
+    return {"count": len(ratings), **spread(ordered), "percentiles": percentiles(ordered, points),
+            "histogram": histogram(ordered, bins), "decades": regroup(by_year, 10), "years": by_year,
+            "year_rating_correlation": correlation(years, ratings, by_year)}
@@ -0,0 +1,448 @@
+"""
+Read-only JSON HTTP API for the movie database.
+
+Endpoints (all GET):
+    /movies?page=1&per_page=50&order=id|title|rating&descending=1
+            &min_rating=&max_rating=&year_from=&year_to=
+    /movies/<title>         one movie (case-insensitive, URL-encoded title)
+    /search?q=<text>&limit=
+    /top?limit=100&offset=0&decade=1990&year_from=&year_to=
+    /stats
+    /random?weighted=1&min_rating=&...   never cached
+    /health
+
+Each keep-alive HTTP/1.1 connection gets its own thread (at most
+API_MAX_CONNECTIONS; more are answered with 503), and connections idle
+for API_IDLE_TIMEOUT seconds are closed. Only API_WORKERS requests are
+processed at a time, so a connection waiting for its next request holds
+no worker. Rendered responses are kept in an in-process LRU cache, tagged
+with the database change counter (bumped by triggers on every write, from
+any process), so an entry is served only while nothing changed. Every
+cacheable response carries an ETag, and a request whose If-None-Match
+still matches gets an empty 304.
+
+Usage:
+    python api_server.py [--host 127.0.0.1] [--port 8000] [--workers 8] [--max-connections 64]
+Load test:
+    python -m benchmarks.bench_api --url http://127.0.0.1:8000 --clients 8 --seconds 10
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from itertools import islice
+from urllib.parse import urlsplit, parse_qs, unquote, urlencode
+
+import storage.movie_storage_sql as storage
+from instrumentation import timed, enable_from_settings
+from config.settings import (API_HOST, API_PORT, API_WORKERS, API_MAX_CONNECTIONS, API_IDLE_TIMEOUT,
+                             API_CACHE_ENTRIES, API_PAGE_SIZE, API_MAX_PAGE_SIZE, TOP_N)
+
+
+class ApiError(Exception):
+    """A request that cannot be answered; carries the HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def etag_matches(header, etag):
+    """
+    Check an If-None-Match header against the current ETag (weak comparison).
+    :param header: Header value: "*" or comma-separated ETags, possibly W/-prefixed.
+    :param etag: Current ETag.
+    :return: True if one of the listed ETags is the current one, or the header is "*".
+    """
+    for candidate in (header or "").split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:].strip()
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    LRU of rendered responses, each tagged with the change counter it was built at.
+    """
+
+    def __init__(self, max_entries=API_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    def get(self, key, version):
+        """
+        Look up a response built at the given database version.
+        :param key: Request path with query string.
+        :param version: Current change counter.
+        :return: Tuple (etag, body), or None on a miss or a stale entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[1], entry[2]
+
+    def put(self, key, version, etag, body):
+        """
+        Store a response, evicting the least recently used ones.
+        :return: None
+        """
+        with self._lock:
+            self._entries[key] = (version, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def not_modified(self):
+        """
+        Count a request answered with 304 Not Modified.
+        :return: None
+        """
+        with self._lock:
+            self.counters["not_modified"] += 1
+
+    def stats(self):
+        """
+        Return the counters, the number of entries and the hit rate.
+        :return: Dict.
+        """
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {**self.counters, "entries": len(self._entries),
+                    "hit_rate": self.counters["hits"] / lookups if lookups else 0.0}
+
+
+def movie_record(title, data):
+    """
+    JSON representation of a movie.
+    :return: Dict with title, year, rating and poster_image_url.
+    """
+    return {"title": title, "year": data["year"], "rating": data["rating"],
+            "poster_image_url": data["poster_image_url"]}
+
+
+def query_value(query, name, convert=str, default=None):
+    """
+    Read and convert one query string parameter.
+    :param query: Parsed query (dict of lists).
+    :param name: Parameter name.
+    :param convert: Conversion function (e.g. int).
+    :param default: Value if the parameter is missing.
+    :return: Converted value.
+    :raises ApiError: 400 if the value cannot be converted.
+    """
+    if name not in query:
+        return default
+    try:
+        return convert(query[name][-1])
+    except ValueError:
+        raise ApiError(400, f"invalid value for {name!r}")
+
+
+def flag(value):
+    """Interpret a query string flag such as descending=1 / true / yes."""
+    return value.lower() in ("1", "true", "yes")
+
+
+def list_movies(query, path):
+    """
+    One page of the catalog.
+    The "next" link carries the sort key of the page's last movie
+    (after_id, or after_rating and after_title), so following the links
+    reads each page with one indexed keyset query; a bare ?page=N still
+    works by skipping rows.
+    :param query: Parsed query string.
+    :param path: Request path (for the "next" link).
+    :return: Dict with movies, page, per_page, total and next.
+    """
+    page = query_value(query, "page", int, 1)
+    per_page = query_value(query, "per_page", int, API_PAGE_SIZE)
+    if page < 1 or not 1 <= per_page <= API_MAX_PAGE_SIZE:
+        raise ApiError(400, f"page must be >= 1 and per_page between 1 and {API_MAX_PAGE_SIZE}")
+    order = query_value(query, "order", str, "id")
+    if order not in storage.LISTING_ORDERS:
+        raise ApiError(400, f"cannot order by {order!r}")
+
+    key_columns = storage.LISTING_ORDERS[order][1]
+    converters = {"id": int, "rating": float, "title": str}
+    after = {column: query_value(query, f"after_{column}", converters[column]) for column in key_columns}
+    if all(value is None for value in after.values()):
+        after, skip = None, (page - 1) * per_page
+    elif any(value is None for value in after.values()):
+        raise ApiError(400, f"ordering by {order!r} needs {', '.join(f'after_{c}' for c in key_columns)}")
+    else:
+        skip = 0
+
+    movies = storage.iter_movies(
+        order_by=order, descending=query_value(query, "descending", flag, False),
+        min_rating=query_value(query, "min_rating", float), max_rating=query_value(query, "max_rating", float),
+        year_from=query_value(query, "year_from", int), year_to=query_value(query, "year_to", int),
+        after=after, chunk_size=min(skip + per_page + 1, storage.LIST_CHUNK_SIZE),
+    )
+    window = list(islice(movies, skip, skip + per_page + 1))
+    movies.close()  # ends the read (and its timing) now rather than when collected
+    next_link = None
+    if len(window) > per_page:
+        last_title, last = window[per_page - 1]
+        cursor = {f"after_{column}": last_title if column == "title" else last[column] for column in key_columns}
+        params = {key: values[-1] for key, values in query.items() if not key.startswith("after_")}
+        next_link = f"{path}?{urlencode({**params, 'page': page + 1, **cursor})}"
+    return {"movies": [movie_record(title, data) for title, data in window[:per_page]],
+            "page": page, "per_page": per_page, "total": storage.count_movies(), "next": next_link}
+
+
+def get_movie(title):
+    """
+    One movie by title.
+    :raises ApiError: 404 if there is no such movie.
+    """
+    movie = storage.get_movie(title)
+    if movie is None:
+        raise ApiError(404, f"movie {title!r} not found")
+    return movie
+
+
+def search(query):
+    """
+    Search titles, best matches first.
+    :return: Dict with the query and the matching movies.
+    """
+    text = query_value(query, "q", str, "").strip()
+    if not text:
+        raise ApiError(400, "missing search text 'q'")
+    limit = query_value(query, "limit", int, storage.SEARCH_RESULT_LIMIT)
+    if not 1 <= limit <= API_MAX_PAGE_SIZE:
+        raise ApiError(400, f"limit must be between 1 and {API_MAX_PAGE_SIZE}")
+    movies = storage.search_movies(text, limit=limit)
+    return {"query": text, "movies": [movie_record(title, data) for title, data in movies.items()]}
+
+
+def top(query):
+    """
+    A page of the rating leaderboard.
+    :return: Dict with the ranked movies.
+    """
+    limit = query_value(query, "limit", int, TOP_N)
+    offset = query_value(query, "offset", int, 0)
+    if not 1 <= limit <= API_MAX_PAGE_SIZE or offset < 0:
+        raise ApiError(400, f"limit must be between 1 and {API_MAX_PAGE_SIZE} and offset >= 0")
+    try:
+        movies = storage.top_movies(limit, offset, year_from=query_value(query, "year_from", int),
+                                    year_to=query_value(query, "year_to", int),
+                                    decade=query_value(query, "decade", int))
+    except ValueError as e:
+        raise ApiError(400, str(e))
+    return {"movies": movies, "limit": limit, "offset": offset}
+
+
+def stats():
+    """
+    Rating statistics.
+    :return: Dict from storage.movie_stats(), or {"count": 0}.
+    """
+    result = storage.movie_stats()
+    return result if result["count"] else {"count": 0}
+
+
+def random_movie(query):
+    """
+    A random movie, sampled in SQLite.
+    Accepts the rating/year filters of /movies and weighted=1 (by rating).
+    :raises ApiError: 404 if no movie matches.
+    """
+    movie = storage.random_movie(
+        min_rating=query_value(query, "min_rating", float), max_rating=query_value(query, "max_rating", float),
+        year_from=query_value(query, "year_from", int), year_to=query_value(query, "year_to", int),
+        weighted=query_value(query, "weighted", flag, False),
+    )
+    if movie is None:
+        raise ApiError(404, "no matching movie in the database")
+    return movie
+
+
+@timed("api.route")
+def route(path, query):
+    """
+    Dispatch a request path to its handler.
+    :param path: URL path.
+    :param query: Parsed query string.
+    :return: Tuple (JSON-serializable result, cacheable).
+    :raises ApiError: 404 for unknown paths.
+    """
+    if path == "/movies":
+        return list_movies(query, path), True
+    if path.startswith("/movies/") and len(path) > len("/movies/"):
+        return get_movie(unquote(path[len("/movies/"):])), True
+    if path == "/search":
+        return search(query), True
+    if path == "/top":
+        return top(query), True
+    if path == "/stats":
+        return stats(), True
+    if path == "/random":
+        return random_movie(query), False
+    if path == "/health":
+        return {"status": "ok"}, False
+    raise ApiError(404, f"no such endpoint {path!r}")
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """Serves the API; the cache is shared through the server."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY the body
+    # waits for the client's delayed ACK (~40 ms per keep-alive request)
+    disable_nagle_algorithm = True
+    # Socket timeout: an idle keep-alive connection is closed after this many seconds
+    timeout = API_IDLE_TIMEOUT
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        key = url.path + ("?" + url.query if url.query else "")
+        cache = self.server.cache
+        try:
+            # Hold a worker slot for the database work only, not while sending
+            with self.server.workers:
+                version = storage.change_counter()
+                cached = cache.get(key, version)
+                if cached is not None:
+                    etag, body = cached
+                else:
+                    result, cacheable = route(url.path, parse_qs(url.query))
+                    body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+                    etag = None
+                    if cacheable:
+                        etag = f'"{version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+                        cache.put(key, version, etag, body)
+        except ApiError as e:
+            return self.send_json(e.status, json.dumps({"error": str(e)}).encode("utf-8"))
+        except Exception as e:
+            self.log_error("%s failed: %r", self.path, e)
+            return self.send_json(500, json.dumps({"error": "internal error"}).encode("utf-8"))
+
+        if etag is not None and etag_matches(self.headers.get("If-None-Match"), etag):
+            cache.not_modified()
+            return self.send_json(304, b"", etag)
+        self.send_json(200, body, etag)
+
+    def send_json(self, status, body, etag=None):
+        """
+        Send a JSON response with Content-Length (keeps the connection reusable).
+        :param status: HTTP status code.
+        :param body: Encoded body (empty for 304).
+        :param etag: ETag header value, or None for uncacheable responses.
+        :return: None
+        """
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        else:
+            self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            super().log_message(*args)
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer with one thread per connection, a cap on open connections and
+    a smaller pool of worker slots for processing requests.
+    """
+
+    # Sent to connections over the cap, before any request is read
+    BUSY_RESPONSE = (b"HTTP/1.1 503 Service Unavailable\r\nRetry-After: 1\r\n"
+                     b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+
+    def __init__(self, address, handler, workers=API_WORKERS, max_connections=API_MAX_CONNECTIONS,
+                 cache=None, verbose=False):
+        super().__init__(address, handler)
+        self.workers = threading.BoundedSemaphore(workers)
+        self.connections = threading.BoundedSemaphore(max_connections)
+        self.cache = cache or ResponseCache()
+        self.verbose = verbose
+
+    def process_request(self, request, client_address):
+        if not self.connections.acquire(blocking=False):
+            try:
+                request.sendall(self.BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        threading.Thread(target=self._process, args=(request, client_address), daemon=True).start()
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.connections.release()
+
+
+def start_server(host=API_HOST, port=API_PORT, workers=API_WORKERS, max_connections=API_MAX_CONNECTIONS,
+                 verbose=False):
+    """
+    Start the API server in a background thread.
+    :param host: Interface to bind.
+    :param port: Port to bind (0 picks a free port).
+    :param workers: Requests processed at the same time.
+    :param max_connections: Open connections allowed at the same time.
+    :param verbose: Log every request to stderr.
+    :return: Tuple (server, base_url). Call server.shutdown() and server.server_close() when done.
+    """
+    server = PooledHTTPServer((host, port), ApiRequestHandler, workers=workers, max_connections=max_connections,
+                              verbose=verbose)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main(argv=None):
+    """
+    Parse arguments and serve the API until interrupted.
+    :param argv: Optional argument list (defaults to sys.argv).
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Serve the movie database as a read-only JSON API.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    parser.add_argument("--max-connections", type=int, default=API_MAX_CONNECTIONS)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    enable_from_settings()
+    storage.init_db()
+    server = PooledHTTPServer((args.host, args.port), ApiRequestHandler, workers=args.workers,
+                              max_connections=args.max_connections, verbose=args.verbose)
+    print(f"Serving the movie API on http://{args.host}:{server.server_port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
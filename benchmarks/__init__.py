@@ -0,0 +1,3 @@
+"""
+Benchmarks for the Movie app, run as modules from the project root.
+"""
@@ -0,0 +1,96 @@
+"""
+Compare the extended statistics report (analytics.py) with the same
+figures computed the way main.py computes stats: Python loops over the
+old dict-of-dicts listing.
+
+Both run on the same synthetic rows in memory (no database). The report
+side includes building its two columns from the rows.
+
+Usage:
+    python -m benchmarks.bench_analytics [--rows 1000000] [--json]
+"""
+
+import argparse
+import json
+import math
+import statistics
+import time
+from array import array
+
+import analytics
+from benchmarks.bench_catalog import dict_listing
+from benchmarks.suite import synthetic_movies
+from storage.catalog import numpy
+
+
+def loop_report(movies):
+    """The report figures from per-movie loops over the dict listing."""
+    ratings = [data["rating"] for data in movies.values()]
+    mean = sum(ratings) / len(ratings)
+    stdev = math.sqrt(sum((rating - mean) ** 2 for rating in ratings) / len(ratings))
+    quartiles = statistics.quantiles(ratings, n=100, method="inclusive")
+    histogram = [0] * 10
+    for data in movies.values():
+        histogram[min(int(data["rating"]), 9)] += 1
+    decades, years = {}, {}
+    for data in movies.values():
+        for groups, key in ((decades, data["year"] // 10 * 10), (years, data["year"])):
+            groups.setdefault(key, []).append(data["rating"])
+    breakdowns = [{key: (len(values), sum(values) / len(values), min(values), max(values))
+                   for key, values in sorted(groups.items())} for groups in (decades, years)]
+    year_mean = sum(data["year"] for data in movies.values()) / len(movies)
+    covariance = sum((data["year"] - year_mean) * (data["rating"] - mean) for data in movies.values())
+    year_spread = sum((data["year"] - year_mean) ** 2 for data in movies.values())
+    correlation = covariance / math.sqrt(year_spread * stdev ** 2 * len(ratings))
+    return {"mean": mean, "stdev": stdev, "percentiles": quartiles, "histogram": histogram,
+            "breakdowns": breakdowns, "correlation": correlation}
+
+
+def columns(rows):
+    """The (years, ratings) arrays analytics.load_columns() would return."""
+    return array("i", (row[1] for row in rows)), array("d", (row[2] for row in rows))
+
+
+def seconds(function):
+    """Run a function once and return (duration, result)."""
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def run(rows):
+    """
+    Compute both reports and time them.
+    :param rows: Catalog size.
+    :return: Dict with loops_s, vectorized_s and speedup.
+    """
+    data = list(synthetic_movies(rows))
+    movies = dict_listing(data)
+    loops_s, _ = seconds(lambda: loop_report(movies))
+    vectorized_s, _ = seconds(lambda: analytics.report(columns(data)))
+    return {"loops_s": loops_s, "vectorized_s": vectorized_s, "speedup": loops_s / vectorized_s}
+
+
+def main(argv=None):
+    """
+    Parse arguments, run the comparison and print it.
+    :param argv: Optional argument list (defaults to sys.argv).
+    :return: Result dict from run().
+    """
+    parser = argparse.ArgumentParser(description="Compare the analytics report with per-movie loops.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="catalog size")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    result = run(args.rows)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{args.rows} movies, NumPy {'on' if numpy() else 'off'}")
+        print(f"loops {result['loops_s']:.3f} s, vectorized {result['vectorized_s']:.3f} s "
+              f"({result['speedup']:.1f}x)")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Load test for the read-only JSON API (api_server.py).
+
+Every client thread keeps one keep-alive connection open and requests a
+fixed mix of endpoints (listing pages, single movies, search, stats) for a
+number of seconds. With --revalidate the clients remember each ETag and
+send If-None-Match, like a browser or CDN revalidating its copy.
+
+The number of clients defaults to the server's API_WORKERS. The report
+includes the fewest and most requests a single client completed, so
+clients starved by the others show up even when the total looks fine.
+
+Usage:
+    python api_server.py &
+    python -m benchmarks.bench_api [--url http://127.0.0.1:8000] [--clients 8] [--seconds 10]
+                                   [--revalidate] [--json]
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit, quote
+
+from config.settings import API_WORKERS
+
+
+def request_mix(titles):
+    """
+    Build the list of paths the clients pick from.
+    :param titles: Some movie titles for /movies/<title> requests.
+    :return: List of request paths.
+    """
+    paths = [f"/movies?page={page}" for page in range(1, 6)]
+    paths += ["/movies?order=rating&descending=1&per_page=20", "/stats", "/search?q=the", "/search?q=star"]
+    paths += [f"/movies/{quote(title, safe='')}" for title in titles[:20]]
+    return paths
+
+
+def percentile(samples, fraction):
+    """
+    Nearest-rank percentile of a sorted list.
+    :return: Sample value, or 0.0 for no samples.
+    """
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def run_client(host, port, paths, deadline, revalidate, seed, results):
+    """
+    Send requests on one connection until the deadline.
+    :param results: List receiving one list of (latency seconds, status) tuples per client.
+    :return: None
+    """
+    rng = random.Random(seed)
+    etags = {}
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    samples = []
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        headers = {"If-None-Match": etags[path]} if revalidate and path in etags else {}
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=10)
+            samples.append((time.perf_counter() - started, "error"))
+            continue
+        samples.append((time.perf_counter() - started, response.status))
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    connection.close()
+    results.append(samples)
+
+
+def run_load(url, clients, seconds, revalidate=False):
+    """
+    Run the load test.
+    :param url: Base URL of the API.
+    :param clients: Concurrent client threads.
+    :param seconds: Test duration.
+    :param revalidate: Send If-None-Match with remembered ETags.
+    :return: Dict with requests, requests_per_second, p50_ms, p95_ms, p99_ms, statuses and
+        per_client (min/max requests completed by one client).
+    """
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port)
+    connection.request("GET", "/movies?per_page=20")
+    titles = [movie["title"] for movie in json.loads(connection.getresponse().read())["movies"]]
+    connection.close()
+    paths = request_mix(titles)
+
+    results = []
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=run_client,
+                                args=(parts.hostname, parts.port, paths, deadline, revalidate, seed, results))
+               for seed in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    per_client = [len(samples) for samples in results]
+    samples = [sample for client_samples in results for sample in client_samples]
+    latencies = sorted(latency for latency, _ in samples)
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {"requests": len(samples), "requests_per_second": len(samples) / elapsed,
+            "p50_ms": percentile(latencies, 0.50) * 1000, "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000, "statuses": statuses,
+            "per_client": {"min": min(per_client), "max": max(per_client)}}
+
+
+def main(argv=None):
+    """
+    Parse arguments, run the load test and print the results.
+    :param argv: Optional argument list (defaults to sys.argv).
+    :return: Result dict from run_load().
+    """
+    parser = argparse.ArgumentParser(description="Load test the movie API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=API_WORKERS, help="concurrent keep-alive connections")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--revalidate", action="store_true", help="send If-None-Match with known ETags")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    result = run_load(args.url, args.clients, args.seconds, args.revalidate)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['requests']} requests, {result['requests_per_second']:.0f} req/s")
+        print(f"latency p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+        print(f"requests per client: min {result['per_client']['min']}, max {result['per_client']['max']}")
+        print("statuses: " + ", ".join(f"{status}: {count}" for status, count in sorted(result["statuses"].items())))
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare the column-oriented MovieCatalog with the old dict-of-dicts listing.
+
+Both are built from the same synthetic rows in memory (no database), then:
+    - memory:  bytes allocated per movie (tracemalloc), excluding the title
+               and poster strings both layouts share
+    - stats:   count/sum/average/median/min/max/best/worst
+    - sorted:  full rating order, best first
+    - random:  10,000 random picks
+
+Usage:
+    python -m benchmarks.bench_catalog [--rows 100000] [--json]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.suite import synthetic_movies
+from storage.catalog import MovieCatalog, numpy
+
+RANDOM_PICKS = 10_000
+
+
+def dict_listing(rows):
+    """The old list_movies() layout."""
+    return {title: {"year": year, "rating": rating, "poster_image_url": poster}
+            for title, year, rating, poster in rows}
+
+
+def dict_stats(movies):
+    """Stats as main.py computed them from the dict listing."""
+    ratings = [data["rating"] for data in movies.values()]
+    best_rating, worst_rating = max(ratings), min(ratings)
+    return {"count": len(ratings), "average": sum(ratings) / len(ratings), "median": statistics.median(ratings),
+            "best": [title for title, data in movies.items() if data["rating"] == best_rating],
+            "worst": [title for title, data in movies.items() if data["rating"] == worst_rating]}
+
+
+def allocated(build, rows):
+    """
+    Measure the memory a layout allocates on top of the shared row strings.
+    :return: Tuple (object, bytes).
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(rows)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def seconds(function):
+    """Run a function once and return its duration."""
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def run(rows):
+    """
+    Build both layouts and measure them.
+    :param rows: Catalog size.
+    :return: Dict layout -> measurements.
+    """
+    data = list(synthetic_movies(rows))
+    movies, dict_bytes = allocated(dict_listing, data)
+    catalog, catalog_bytes = allocated(MovieCatalog.from_rows, data)
+    rng = random.Random(1)
+    return {
+        "dict": {"bytes_per_movie": dict_bytes / rows,
+                 "stats_s": seconds(lambda: dict_stats(movies)),
+                 "sorted_s": seconds(lambda: sorted(movies.items(), key=lambda item: item[1]["rating"],
+                                                    reverse=True)),
+                 "random_s": seconds(lambda: [rng.choice(list(movies.items())) for _ in range(10)])
+                 * RANDOM_PICKS / 10},
+        "catalog": {"bytes_per_movie": catalog_bytes / rows,
+                    "stats_s": seconds(catalog.stats),
+                    "sorted_s": seconds(lambda: catalog.rating_order(descending=True)),
+                    "random_s": seconds(lambda: [catalog.random(rng) for _ in range(RANDOM_PICKS)])},
+    }
+
+
+def main(argv=None):
+    """
+    Parse arguments, run the comparison and print it.
+    :param argv: Optional argument list (defaults to sys.argv).
+    :return: Result dict from run().
+    """
+    parser = argparse.ArgumentParser(description="Compare the catalog layouts.")
+    parser.add_argument("--rows", type=int, default=100_000, help="catalog size")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.rows)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.rows} movies, NumPy {'on' if numpy() else 'off'}")
+        print(f"{'':18}{'dict':>14}{'catalog':>14}")
+        for name in results["dict"]:
+            print(f"{name:18}{results['dict'][name]:>14.3f}{results['catalog'][name]:>14.3f}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Compare the SQLite engine profiles (see DB_ENGINE_PROFILES in config.settings).
+
+For every profile a temporary database is created and migrated, then:
+    - commits:   single-row inserts, one transaction each (like add_movie)
+    - bulk:      one batched insert of all remaining rows
+    - listing:   a full `iter_movies()` pass
+    - mixed:     a full listing while another thread keeps committing
+                 single-row writes; reports both sides and lock errors
+
+Usage:
+    python -m benchmarks.bench_engine_profiles [--rows 20000] [--commits 500] [--json]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+import storage.movie_storage_sql as storage
+from config.settings import DB_ENGINE_PROFILES
+from storage.engine import create_storage_engine
+
+
+def synthetic_rows(start, count, prefix="Movie"):
+    """
+    Generate movie rows with distinct titles.
+    :param start: Index of the first row.
+    :param count: Number of rows.
+    :param prefix: Title prefix.
+    :return: List of row dicts for storage.add_movies().
+    """
+    return [{"title": f"{prefix} {index}", "year": 1950 + index % 75, "rating": (index % 91) / 10,
+             "poster_image_url": "N/A"} for index in range(start, start + count)]
+
+
+def timed(function, *args):
+    """
+    Call a function and measure it.
+    :return: Tuple (result, seconds).
+    """
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def run_profile(profile, rows, commits, directory):
+    """
+    Run all measurements against a fresh database using one profile.
+    :param profile: Engine profile name.
+    :param rows: Catalog size.
+    :param commits: Number of single-row transactions measured.
+    :param directory: Directory for the temporary database.
+    :return: Dict of measurements (seconds and counts).
+    """
+    engine = create_storage_engine(f"sqlite:///{os.path.join(directory, profile + '.db')}", profile=profile)
+    storage.init_db(engine)
+    storage.engine = engine
+    result = {}
+
+    _, seconds = timed(lambda: [storage.add_movies([row]) for row in synthetic_rows(0, commits)])
+    result["commits_per_second"] = commits / seconds
+
+    _, result["bulk_insert_seconds"] = timed(storage.add_movies, synthetic_rows(commits, rows - commits))
+    _, result["listing_seconds"] = timed(lambda: sum(1 for _ in storage.iter_movies()))
+
+    stop = threading.Event()
+    writer = {"commits": 0, "errors": 0}
+
+    def write():
+        index = 0
+        while not stop.is_set():
+            try:
+                storage.add_movies(synthetic_rows(index, 1, prefix="Concurrent"))
+                writer["commits"] += 1
+            except OperationalError:
+                writer["errors"] += 1
+            index += 1
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    _, result["mixed_listing_seconds"] = timed(lambda: sum(1 for _ in storage.iter_movies()))
+    stop.set()
+    thread.join()
+    result["mixed_writer_commits_per_second"] = writer["commits"] / result["mixed_listing_seconds"]
+    result["mixed_writer_lock_errors"] = writer["errors"]
+
+    engine.dispose()
+    return result
+
+
+def main(argv=None):
+    """
+    Parse arguments, benchmark every profile and print the comparison.
+    :param argv: Optional argument list (defaults to sys.argv).
+    :return: Dict profile -> measurements.
+    """
+    parser = argparse.ArgumentParser(description="Compare the SQLite engine profiles.")
+    parser.add_argument("--rows", type=int, default=20_000, help="catalog size")
+    parser.add_argument("--commits", type=int, default=500, help="single-row transactions to time")
+    parser.add_argument("--profiles", nargs="+", default=list(DB_ENGINE_PROFILES))
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    original_engine = storage.engine
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            for profile in args.profiles:
+                results[profile] = run_profile(profile, args.rows, min(args.commits, args.rows), directory)
+        finally:
+            storage.engine = original_engine
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        names = list(next(iter(results.values())))
+        print(f"{'':34}" + "".join(f"{profile:>14}" for profile in results))
+        for name in names:
+            print(f"{name:34}" + "".join(f"{results[profile][name]:>14.3f}" for profile in results))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+A local stand-in for the OMDb HTTP API, used by tests and benchmarks.
+
+Every title is "found" except titles starting with "missing", and the
+answers are generated deterministically from the title. An optional
+per-request delay simulates network latency.
+
+Run standalone to measure throughput against it:
+    python -m benchmarks.fake_omdb_server --port 8765 --delay 0.05
+    python bulk_import.py titles.txt --api-url http://127.0.0.1:8765/ --rps 0
+"""
+
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def fake_payload(title):
+    """
+    Build a deterministic OMDb-style response for a title.
+    :param title: Requested title.
+    :return: Response dict.
+    """
+    if title.lower().startswith("missing"):
+        return {"Response": "False", "Error": "Movie not found!"}
+    seed = zlib.crc32(title.lower().encode("utf-8"))
+    return {
+        "Response": "True",
+        "Title": title,
+        "Year": str(1950 + seed % 75),
+        "imdbRating": f"{1 + (seed % 90) / 10:.1f}",
+        "Poster": f"https://example.invalid/posters/{seed}.jpg",
+    }
+
+
+class FakeOmdbHandler(BaseHTTPRequestHandler):
+    """Answers GET /?t=<title> like OMDb does."""
+
+    delay = 0.0
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        self.server.request_count += 1
+        query = parse_qs(urlparse(self.path).query)
+        body = json.dumps(fake_payload(query.get("t", [""])[0])).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(port=0, delay=0.0):
+    """
+    Start the fake server in a background thread.
+    :param port: Port to bind (0 picks a free port).
+    :param delay: Seconds to sleep before answering each request.
+    :return: Tuple (server, base_url). Call server.shutdown() when done.
+    """
+    handler = type("Handler", (FakeOmdbHandler,), {"delay": delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.request_count = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake OMDb API locally.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+    server, url = start_server(args.port, args.delay)
+    print(f"Fake OMDb listening on {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
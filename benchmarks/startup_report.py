@@ -0,0 +1,113 @@
+"""
+Startup cost report for the command-line entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter,
+then lists the slowest imports (cumulative microseconds, like the raw
+importtime output but sorted and trimmed). It also times a full
+`python main.py` session that exits right away (menu choice 0).
+
+Usage:
+    python -m benchmarks.startup_report [--module main] [--top 15] [--runs 5] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module="main"):
+    """
+    Import a module in a fresh interpreter and collect its import timings.
+    :param module: Module to import.
+    :return: List of dicts with "module", "self_us", "cumulative_us" and "depth",
+        in the order the imports finished.
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+                        "depth": (len(name) - len(name.lstrip()) - 1) // 2})
+    return timings
+
+
+def module_subtree(timings, module="main"):
+    """
+    Select the imports triggered by one top-level module.
+    importtime reports a module after everything it imported, so its
+    subtree is the run of nested entries right before it.
+    :param timings: Result of import_times().
+    :param module: Top-level module name.
+    :return: List of entries, the module itself last (empty if not imported).
+    """
+    for index, entry in enumerate(timings):
+        if entry["depth"] == 0 and entry["module"] == module:
+            start = index
+            while start > 0 and timings[start - 1]["depth"] > 0:
+                start -= 1
+            return timings[start:index + 1]
+    return []
+
+
+def session_seconds(runs=5):
+    """
+    Time `python main.py` answering "0" (Exit) to the menu.
+    :param runs: Number of sessions; the median is reported.
+    :return: Median wall time in seconds.
+    """
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "main.py"], cwd=PROJECT_ROOT, input="0\n",
+                       capture_output=True, text=True, check=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    """
+    Parse arguments and print the startup report.
+    :param argv: Optional argument list (defaults to sys.argv).
+    :return: Report dict.
+    """
+    parser = argparse.ArgumentParser(description="Report the startup cost of the Movie app.")
+    parser.add_argument("--module", default="main", help="module whose import is measured")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports listed")
+    parser.add_argument("--runs", type=int, default=5, help="timed `main.py` sessions (0 = skip)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    # Imports done by the interpreter itself (site, encodings, ...) are left out
+    subtree = module_subtree(import_times(args.module), args.module)
+    report = {
+        "module": args.module,
+        "import_ms": subtree[-1]["cumulative_us"] / 1000 if subtree else 0.0,
+        "slowest": sorted(subtree, key=lambda entry: entry["cumulative_us"], reverse=True)[:args.top],
+        "session_ms": session_seconds(args.runs) * 1000 if args.runs and args.module == "main" else None,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return report
+
+    print(f"import {args.module}: {report['import_ms']:.1f} ms")
+    if report["session_ms"] is not None:
+        print(f"python main.py -> Exit: {report['session_ms']:.1f} ms (median of {args.runs})")
+    print(f"\n{'cumulative [ms]':>16} {'self [ms]':>10}  module")
+    for entry in report["slowest"]:
+        print(f"{entry['cumulative_us'] / 1000:>16.1f} {entry['self_us'] / 1000:>10.1f}  "
+              f"{'  ' * entry['depth']}{entry['module']}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
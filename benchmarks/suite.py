@@ -0,0 +1,279 @@
+"""
+Reproducible benchmark suite for storage, website generation and the OMDb client.
+
+For every catalog size a synthetic catalog is generated (seeded, so runs
+are comparable) in a temporary database, and each benchmark is timed
+`--repeat` times. The OMDb client benchmarks run against the local fake
+server (`benchmarks.fake_omdb_server`), never the real API.
+
+Results are printed as JSON (or written with `--output`) together with the
+commit they were measured on. `--compare` checks them against an earlier
+result file and exits with status 1 if a benchmark got slower than the
+threshold allows.
+
+Usage:
+    python -m benchmarks.suite [--sizes 1000 100000 1000000] [--repeat 3] [--output results.json]
+    python -m benchmarks.suite --sizes 1000 --compare baseline.json [--threshold 0.25]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import storage.movie_storage_sql as storage
+from storage.engine import create_storage_engine
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+SEED = 20240501
+GENERATE_BATCH_SIZE = 50_000
+SINGLE_WRITE_OPERATIONS = 100
+CLIENT_TITLES = 200
+
+ADJECTIVES = ["Dark", "Silent", "Lost", "Golden", "Broken", "Hidden", "Last", "Eternal", "Wild", "Frozen",
+              "Crimson", "Electric", "Distant", "Savage", "Midnight", "Iron", "Secret", "Burning", "Quiet", "Final"]
+NOUNS = ["Star", "River", "City", "Empire", "Garden", "Storm", "Kingdom", "Shadow", "Road", "Ocean",
+         "Mountain", "Dream", "Machine", "Forest", "Island", "Planet", "Heart", "Witness", "Harbor", "Signal"]
+SEARCH_QUERIES = ["star", "dark riv", "lost empire", "midnight", "ocean 12"]
+FUZZY_QUERIES = ["The Drak River 12", "Silnet Empire", "goldn storm 7"]
+
+
+def synthetic_movies(size, seed=SEED):
+    """
+    Generate a deterministic catalog of distinct movies.
+    :param size: Number of movies.
+    :param seed: Random seed.
+    :return: Generator of (title, year, rating, poster_image_url) tuples.
+    """
+    rng = random.Random(seed)
+    for index in range(size):
+        title = f"The {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {index}"
+        yield title, rng.randint(1920, 2025), rng.randint(10, 100) / 10, \
+            f"https://example.invalid/posters/{index}.jpg"
+
+
+def create_catalog(directory, size):
+    """
+    Create and fill a temporary movies database.
+    :param directory: Directory for the database file.
+    :param size: Number of movies.
+    :return: Engine bound to the new database.
+    """
+    engine = create_storage_engine(f"sqlite:///{os.path.join(directory, f'catalog_{size}.db')}")
+    storage.init_db(engine)
+    movies = synthetic_movies(size)
+    with engine.connect() as connection:
+        while True:
+            batch = [row for _, row in zip(range(GENERATE_BATCH_SIZE), movies)]
+            if not batch:
+                break
+            connection.exec_driver_sql(
+                "INSERT INTO movies (title, year, rating, poster_image_url) VALUES (?, ?, ?, ?)", batch
+            )
+            connection.commit()
+    return engine
+
+
+def measure(function, repeat):
+    """
+    Time a benchmark several times.
+    :param function: Callable without arguments; may return an operation count.
+    :param repeat: Number of timed runs.
+    :return: Dict with "median_s", "min_s" and (if given) "operations".
+    """
+    samples = []
+    operations = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        operations = function()
+        samples.append(time.perf_counter() - started)
+    result = {"median_s": statistics.median(samples), "min_s": min(samples)}
+    if operations:
+        result["operations"] = operations
+    return result
+
+
+def storage_benchmarks(size, output_dir):
+    """
+    Build the storage and website benchmarks for one catalog.
+    :param size: Catalog size (titles of the synthetic catalog are known from it).
+    :param output_dir: Directory for generated website files.
+    :return: Dict name -> callable.
+    """
+    import main
+    import website_generator
+
+    # The CLI commands use the module engine the suite points at the catalog
+    main._storage = storage
+    rng = random.Random(SEED)
+    titles = [title for title, *_ in synthetic_movies(size)]
+    output_path = os.path.join(output_dir, "index.html")
+
+    def quiet(function, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function(*args)
+
+    def single_writes():
+        picks = rng.sample(titles, min(SINGLE_WRITE_OPERATIONS, len(titles)))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for index, title in enumerate(picks):
+                storage.add_movie(f"Benchmark Movie {index}", 2000, 5.0, "N/A")
+                storage.update_movie(title, 7.7)
+                storage.delete_movie(f"Benchmark Movie {index}")
+        return 3 * len(picks)
+
+    return {
+        "list_movies": lambda: len(storage.list_movies()),
+        "iter_movies": lambda: sum(1 for _ in storage.iter_movies()),
+        "search": lambda: sum(len(storage.search_movies(query)) for query in SEARCH_QUERIES),
+        "fuzzy_search": lambda: sum(len(storage.fuzzy_search_movies(query)) for query in FUZZY_QUERIES),
+        "stats": lambda: storage.movie_stats()["count"],
+        "sorted_listing": lambda: sum(1 for _ in storage.iter_movies(order_by="rating", descending=True)),
+        "random_pick": lambda: quiet(main.command_random_movie),
+        "add_update_delete": single_writes,
+        "generate_website": lambda: len(website_generator.generate_site(output_path=output_path,
+                                                                        incremental=False)),
+        "generate_website_unchanged": lambda: len(website_generator.generate_site(output_path=output_path)),
+    }
+
+
+def client_benchmarks(directory):
+    """
+    Run the OMDb client benchmarks against the local fake server.
+    :param directory: Directory for the temporary response cache.
+    :return: Dict name -> measurement.
+    """
+    import bulk_import
+    import data.ombd_client as client
+    from benchmarks.fake_omdb_server import start_server
+
+    server, url = start_server(delay=0.005)
+    unlimited = client.TokenBucket(0)
+    titles = [f"Client Benchmark {index}" for index in range(CLIENT_TITLES)]
+    results = {}
+
+    def fetch_all():
+        for title in titles:
+            client.fetch_movie_payload(title, api_url=url, limiter=unlimited)
+        return len(titles)
+
+    try:
+        client.set_cache(client.ResponseCache(db_url=f"sqlite:///{os.path.join(directory, 'cache.db')}"))
+        results["client_cold"] = measure(fetch_all, 1)
+        results["client_cached"] = measure(fetch_all, 3)
+
+        client.set_cache(client.ResponseCache(db_url=f"sqlite:///{os.path.join(directory, 'cache2.db')}"))
+        engine = create_storage_engine(f"sqlite:///{os.path.join(directory, 'import.db')}")
+        storage.init_db(engine)
+        storage.engine = engine
+        results["bulk_import"] = measure(
+            lambda: bulk_import.import_titles(titles, workers=8, requests_per_second=0, api_url=url)["imported"], 1)
+        engine.dispose()
+    finally:
+        client.set_cache(None)
+        server.shutdown()
+    return results
+
+
+def current_commit():
+    """
+    Identify the code being measured.
+    :return: Short commit hash, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes=DEFAULT_SIZES, repeat=3, include_client=True):
+    """
+    Run all benchmarks.
+    :param sizes: Catalog sizes.
+    :param repeat: Timed runs per benchmark.
+    :param include_client: Also run the OMDb client benchmarks.
+    :return: Result document (JSON-serializable).
+    """
+    original_engine = storage.engine
+    document = {"commit": current_commit(), "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version, "repeat": repeat, "results": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            for size in sizes:
+                started = time.perf_counter()
+                storage.engine = create_catalog(directory, size)
+                seconds = time.perf_counter() - started
+                results = {"generate_catalog": {"median_s": seconds, "min_s": seconds}}
+                for name, function in storage_benchmarks(size, directory).items():
+                    results[name] = measure(function, repeat)
+                document["results"][str(size)] = results
+                storage.engine.dispose()
+            if include_client:
+                document["results"]["client"] = client_benchmarks(directory)
+        finally:
+            storage.engine = original_engine
+    return document
+
+
+def compare(current, baseline, threshold):
+    """
+    Find benchmarks that got slower than allowed.
+    :param current: Result document of this run.
+    :param baseline: Result document to compare against.
+    :param threshold: Allowed slowdown as a fraction (0.25 = 25 %).
+    :return: List of (group, benchmark, baseline seconds, current seconds) regressions.
+    """
+    regressions = []
+    for group, results in current["results"].items():
+        for name, result in results.items():
+            before = baseline.get("results", {}).get(group, {}).get(name)
+            if before and result["median_s"] > before["median_s"] * (1 + threshold):
+                regressions.append((group, name, before["median_s"], result["median_s"]))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Parse arguments, run the suite, write the results and check for regressions.
+    :param argv: Optional argument list (defaults to sys.argv).
+    :return: Exit status (1 if a regression was found).
+    """
+    parser = argparse.ArgumentParser(description="Run the Movie app benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="catalog sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument("--no-client", action="store_true", help="skip the OMDb client benchmarks")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    document = run_suite(args.sizes, args.repeat, include_client=not args.no_client)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fileobj:
+            json.dump(document, fileobj, indent=2)
+    else:
+        print(json.dumps(document, indent=2))
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fileobj:
+            regressions = compare(document, json.load(fileobj), args.threshold)
+        for group, name, before, after in regressions:
+            print(f"⚠️ Regression in {group}/{name}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms",
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
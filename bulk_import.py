@@ -0,0 +1,213 @@
+"""
+Bulk import of many movie titles from OMDb into the database.
+
+Reads a file of titles (plain text, one title per line, or JSONL with a
+"title" field), fetches the metadata concurrently through a bounded thread
+pool with a requests-per-second limit (a token bucket used instead of
+the client's shared default), and inserts the results with batched
+`executemany` calls, one transaction per batch. Ends with a report of
+imported, skipped and failed titles.
+
+Usage:
+    python bulk_import.py titles.txt [--workers 8] [--rps 10] [--batch-size 500]
+"""
+
+import argparse
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import storage.movie_storage_sql as storage
+from data.ombd_client import fetch_movie_payload, TokenBucket
+from instrumentation import enable_from_settings
+from config.settings import IMPORT_WORKERS, IMPORT_REQUESTS_PER_SECOND, IMPORT_BATCH_SIZE
+
+
+def read_titles(file_name):
+    """
+    Yield titles from a text or JSONL file, skipping blank lines.
+    A line starting with "{" is parsed as JSON and its "title" (or "Title") is used.
+    A line that is not valid JSON is yielded as ValueError(line label, reason),
+    which import_titles() reports as a failure.
+    :param file_name: Path to the titles file.
+    :return: Generator of title strings (or ValueErrors for malformed lines).
+    """
+    with open(file_name, "r", encoding="utf-8") as fileobj:
+        for number, line in enumerate(fileobj, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield ValueError(f"line {number}", f"not valid JSON: {e.msg}")
+                    continue
+                line = str(record.get("title") or record.get("Title") or "").strip()
+                if not line:
+                    continue
+            yield line
+
+
+def payload_to_row(payload):
+    """
+    Convert an OMDb response into a row for the movies table.
+    :param payload: Decoded OMDb JSON document.
+    :return: Tuple (row, error) - exactly one of them is None.
+    """
+    if payload.get("Response") == "False":
+        return None, payload.get("Error", "not found")
+
+    title = str(payload.get("Title") or "").strip()
+    if not title:
+        return None, "response has no title"
+    year_match = re.match(r"\d{4}", str(payload.get("Year") or ""))
+    if not year_match:
+        return None, f"invalid year {payload.get('Year')!r}"
+    try:
+        rating = float(payload.get("imdbRating", ""))
+    except (TypeError, ValueError):
+        return None, f"invalid rating {payload.get('imdbRating')!r}"
+
+    return {"title": title, "year": int(year_match.group()), "rating": rating,
+            "poster_image_url": payload.get("Poster", "N/A")}, None
+
+
+def batched(iterable, size):
+    """
+    Split an iterable into lists of at most `size` items.
+    :param iterable: Source items.
+    :param size: Maximum batch length.
+    :return: Generator of lists.
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_titles(titles, workers=IMPORT_WORKERS, requests_per_second=IMPORT_REQUESTS_PER_SECOND,
+                  batch_size=IMPORT_BATCH_SIZE, api_url=None):
+    """
+    Fetch and insert many titles.
+    Each batch is checked against the database (one indexed NOCASE lookup)
+    before it is fetched, and again for the titles OMDb resolved it to, so
+    the stored titles are never loaded up front.
+    :param titles: Iterable of titles to import.
+    :param workers: Size of the thread pool used for OMDb lookups.
+    :param requests_per_second: Overall request rate limit (0 disables it).
+    :param batch_size: Titles fetched and inserted per transaction.
+    :param api_url: Optional OMDb base URL override (e.g. a local fake server).
+    :return: Report dict with "imported", "skipped", "failed" and timing information.
+    """
+    limiter = TokenBucket(requests_per_second)
+    seen = set()
+    report = {"imported": 0, "skipped": [], "failed": []}
+    started = time.perf_counter()
+
+    def fetch(title):
+        try:
+            return title, fetch_movie_payload(title, api_url=api_url, limiter=limiter), None
+        except Exception as e:
+            return title, None, str(e)
+
+    def new_titles():
+        for title in titles:
+            if isinstance(title, ValueError):
+                report["failed"].append(title.args)
+                continue
+            key = storage.title_key(title)
+            if key in seen:
+                report["skipped"].append((title, "duplicate in input"))
+                continue
+            seen.add(key)
+            yield title
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch in batched(new_titles(), batch_size):
+            with storage.engine.connect() as connection:
+                stored = storage.existing_titles(connection, batch)
+            for title in batch:
+                if storage.title_key(title) in stored:
+                    report["skipped"].append((title, "already in database"))
+            batch = [title for title in batch if storage.title_key(title) not in stored]
+
+            fetched = []
+            for title, payload, error in executor.map(fetch, batch):
+                if error is None:
+                    row, error = payload_to_row(payload)
+                if error is not None:
+                    report["failed"].append((title, error))
+                    continue
+                fetched.append((title, row))
+
+            # OMDb may resolve a title to a movie we already have
+            with storage.engine.connect() as connection:
+                stored = storage.existing_titles(connection, (row["title"] for _, row in fetched))
+            rows = []
+            for title, row in fetched:
+                key = storage.title_key(row["title"])
+                if key in stored:
+                    report["skipped"].append((title, f"resolves to existing '{row['title']}'"))
+                    continue
+                stored.add(key)
+                rows.append(row)
+            for row, outcome in zip(rows, storage.add_movies(rows)):
+                if outcome == "inserted":
+                    report["imported"] += 1
+                else:
+                    # Another writer added this title meanwhile
+                    report["skipped"].append((row["title"], "already in database"))
+
+    report["seconds"] = time.perf_counter() - started
+    processed = report["imported"] + len(report["skipped"]) + len(report["failed"])
+    report["titles_per_second"] = processed / report["seconds"] if report["seconds"] else 0.0
+    return report
+
+
+def print_report(report):
+    """
+    Print a human-readable summary of an import run.
+    :param report: Report dict returned by import_titles().
+    :return: None
+    """
+    print("\n *********** BULK IMPORT REPORT *********** \n")
+    print(f"Imported: {report['imported']}")
+    print(f"Skipped:  {len(report['skipped'])}")
+    print(f"Failed:   {len(report['failed'])}")
+    print(f"Time:     {report['seconds']:.1f}s ({report['titles_per_second']:.1f} titles/s)")
+    for title, reason in report["skipped"]:
+        print(f"  skipped '{title}': {reason}")
+    for title, reason in report["failed"]:
+        print(f"  ⚠️ failed '{title}': {reason}")
+
+
+def main(argv=None):
+    """
+    Parse command-line arguments, run the import and print the report.
+    :param argv: Optional argument list (defaults to sys.argv).
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Bulk import movie titles from OMDb.")
+    parser.add_argument("file", help="text file (one title per line) or JSONL file")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS)
+    parser.add_argument("--rps", type=float, default=IMPORT_REQUESTS_PER_SECOND,
+                        help="max OMDb requests per second (0 = unlimited)")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--api-url", default=None, help="override the OMDb URL (e.g. a local fake server)")
+    args = parser.parse_args(argv)
+
+    enable_from_settings()
+    storage.init_db()
+    report = import_titles(read_titles(args.file), workers=args.workers, requests_per_second=args.rps,
+                           batch_size=args.batch_size, api_url=args.api_url)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
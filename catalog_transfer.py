@@ -0,0 +1,337 @@
+"""
+Move the movie catalog in and out of the database without copying
+data/movies.db by hand.
+
+    export    stream `movies` into CSV or JSONL (gzip-compressed if the file
+              name ends in .gz), one keyset-paginated chunk at a time
+    import    stream CSV/JSONL records back in with batched upserts, one
+              bounded transaction per batch; a checkpoint file next to the
+              source records the progress, so an interrupted import resumes
+              after the last committed batch
+    snapshot  copy the live database file with SQLite's online backup API
+              (readers and, in WAL mode, writers carry on meanwhile)
+
+Each direction keeps at most one chunk in memory and ends with a report of
+rows per second.
+
+Usage:
+    python catalog_transfer.py export movies.csv.gz
+    python catalog_transfer.py import movies.csv.gz [--skip-existing] [--restart] [--batch-size 5000]
+    python catalog_transfer.py snapshot backup.db [--pages 1000]
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import time
+from itertools import islice
+
+import storage.movie_storage_sql as storage
+from instrumentation import enable_from_settings, timed
+from config.settings import TRANSFER_CHUNK_SIZE, SNAPSHOT_PAGES_PER_STEP, SNAPSHOT_STEP_SLEEP
+
+FIELDS = ("title", "year", "rating", "poster_image_url")
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+# Bad records listed in an import report (the rest are only counted)
+MAX_REPORTED_ERRORS = 20
+
+
+def detect_format(path):
+    """
+    Infer the file format from its name (a trailing .gz is ignored).
+    :param path: File name, e.g. "movies.csv.gz".
+    :return: "csv" or "jsonl".
+    :raises ValueError: For other extensions.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path!r}; use .csv or .jsonl (optionally .gz) or --format")
+    return FORMATS[extension]
+
+
+def open_text(path, mode, compressed=None):
+    """
+    Open a UTF-8 text file, gzip-compressed if the name ends in .gz.
+    :param mode: "r" or "w".
+    :param compressed: Override the name-based choice.
+    :return: File object.
+    """
+    if path.endswith(".gz") if compressed is None else compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def rate(rows, seconds):
+    """Rows per second, 0.0 for an instant run."""
+    return rows / seconds if seconds else 0.0
+
+
+@timed("transfer.export")
+def export_catalog(path, file_format=None, chunk_size=TRANSFER_CHUNK_SIZE):
+    """
+    Write every movie to a CSV or JSONL file, in id order.
+    Chunks are separate reads, so writes during a long export may show up
+    in it; use snapshot_database() for a point-in-time copy. The file is
+    written under a temporary name and renamed when complete.
+    :param path: Target file name.
+    :param file_format: "csv" or "jsonl" (default: from the file name).
+    :param chunk_size: Rows read per query.
+    :return: Report dict with "path", "rows", "seconds" and "rows_per_second".
+    """
+    file_format = file_format or detect_format(path)
+    started = time.perf_counter()
+    rows = 0
+    partial = f"{path}.part"
+    with open_text(partial, "w", compressed=path.endswith(".gz")) as fileobj:
+        if file_format == "csv":
+            writer = csv.writer(fileobj)
+            writer.writerow(FIELDS)
+            write = writer.writerow
+        else:
+            def write(row):
+                fileobj.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n")
+        for title, data in storage.iter_movies(chunk_size=chunk_size):
+            write((title, data["year"], data["rating"], data["poster_image_url"]))
+            rows += 1
+    os.replace(partial, path)
+    seconds = time.perf_counter() - started
+    return {"path": path, "rows": rows, "seconds": seconds, "rows_per_second": rate(rows, seconds)}
+
+
+def read_records(path, file_format=None):
+    """
+    Stream the records of a CSV (with header) or JSONL file.
+    A JSONL line that is not valid JSON is yielded as a ValueError, so it
+    is reported by record_to_row() like any other invalid record.
+    :param path: Source file name.
+    :param file_format: "csv" or "jsonl" (default: from the file name).
+    :return: Generator of dicts (or ValueErrors for malformed lines).
+    """
+    file_format = file_format or detect_format(path)
+    with open_text(path, "r") as fileobj:
+        if file_format == "csv":
+            yield from csv.DictReader(fileobj)
+        else:
+            for number, line in enumerate(fileobj, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield ValueError(f"line {number} is not valid JSON: {e.msg}")
+
+
+def record_to_row(record):
+    """
+    Validate an exported record and convert it into a row for add_movies().
+    :param record: Dict read from CSV (all strings) or JSONL, or the
+        ValueError read_records() yields for a malformed line.
+    :return: Tuple (row, error) - exactly one of them is None.
+    """
+    if isinstance(record, ValueError):
+        return None, str(record)
+    if not isinstance(record, dict):
+        return None, "record is not a JSON object"
+    title = str(record.get("title") or "").strip()
+    if not title:
+        return None, "missing title"
+    try:
+        year, rating = int(record.get("year")), float(record.get("rating"))
+    except (TypeError, ValueError):
+        return None, f"invalid year or rating for '{title}'"
+    if not 0 <= rating <= 10:
+        return None, f"rating {rating} of '{title}' is not between 0 and 10"
+    return {"title": title, "year": year, "rating": rating,
+            "poster_image_url": record.get("poster_image_url") or "N/A"}, None
+
+
+def checkpoint_path(path):
+    """Name of the progress file kept next to an import source."""
+    return f"{path}.progress"
+
+
+def load_checkpoint(path):
+    """
+    Records already imported from a source, if its checkpoint still
+    matches the file (same size and modification time).
+    :param path: Source file name.
+    :return: Number of records to skip.
+    """
+    try:
+        with open(checkpoint_path(path), "r", encoding="utf-8") as fileobj:
+            checkpoint = json.load(fileobj)
+    except (OSError, ValueError):
+        return 0
+    status = os.stat(path)
+    if (checkpoint.get("size"), checkpoint.get("mtime_ns")) != (status.st_size, status.st_mtime_ns):
+        print(f"⚠️ {path} changed since the interrupted import; starting over.")
+        return 0
+    return checkpoint.get("records", 0)
+
+
+def save_checkpoint(path, records):
+    """
+    Record the number of imported records (atomically, via rename).
+    :param path: Source file name.
+    :param records: Records committed so far.
+    :return: None
+    """
+    status = os.stat(path)
+    partial = f"{checkpoint_path(path)}.part"
+    with open(partial, "w", encoding="utf-8") as fileobj:
+        json.dump({"size": status.st_size, "mtime_ns": status.st_mtime_ns, "records": records}, fileobj)
+    os.replace(partial, checkpoint_path(path))
+
+
+@timed("transfer.import")
+def import_catalog(path, file_format=None, batch_size=TRANSFER_CHUNK_SIZE, upsert=True, resume=True):
+    """
+    Load a CSV or JSONL export into the database.
+    Every batch is one add_movies() transaction; after each commit the
+    checkpoint advances. Replaying a batch after a crash between the two
+    is harmless, as upserts (and skips) are idempotent.
+    :param path: Source file name.
+    :param file_format: "csv" or "jsonl" (default: from the file name).
+    :param batch_size: Records per transaction.
+    :param upsert: Overwrite stored movies with the same title (otherwise skip them).
+    :param resume: Continue after the last checkpoint of an interrupted import.
+    :return: Report dict with "records", "resumed_from", "inserted", "updated", "skipped",
+        "failed", "errors" (the first few), "seconds" and "rows_per_second".
+    """
+    skip = load_checkpoint(path) if resume else 0
+    report = {"records": skip, "resumed_from": skip, "inserted": 0, "updated": 0, "skipped": 0,
+              "failed": 0, "errors": []}
+    started = time.perf_counter()
+    records = islice(read_records(path, file_format), skip, None)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        rows = []
+        for record in batch:
+            row, error = record_to_row(record)
+            if error is None:
+                rows.append(row)
+            else:
+                report["failed"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append(error)
+        for outcome in storage.add_movies(rows, upsert=upsert):
+            report[outcome] += 1
+        report["records"] += len(batch)
+        save_checkpoint(path, report["records"])
+    try:
+        os.remove(checkpoint_path(path))
+    except FileNotFoundError:
+        pass
+    report["seconds"] = time.perf_counter() - started
+    report["rows_per_second"] = rate(report["records"] - skip, report["seconds"])
+    return report
+
+
+@timed("transfer.snapshot")
+def snapshot_database(path, pages=SNAPSHOT_PAGES_PER_STEP, sleep=SNAPSHOT_STEP_SLEEP, progress=None):
+    """
+    Copy the live database into a new SQLite file with the online backup API.
+    With pages=-1 the copy is one read transaction - a consistent snapshot
+    that, in WAL mode, does not block writers. With a page count the copy
+    runs in steps that release the lock in between (writers are not held up
+    in rollback-journal mode either), but restarts when another connection
+    writes meanwhile.
+    :param path: Target file name (replaced when the copy is complete).
+    :param pages: Pages copied per step (-1 = all at once).
+    :param sleep: Seconds to pause between steps.
+    :param progress: Optional callback(status, remaining, total) called after each step.
+    :return: Report dict with "path", "rows", "bytes", "seconds" and "rows_per_second".
+    """
+    started = time.perf_counter()
+    partial = f"{path}.part"
+    if os.path.exists(partial):
+        os.remove(partial)
+    source = storage.engine.raw_connection()
+    try:
+        target = sqlite3.connect(partial)
+        try:
+            source.driver_connection.backup(target, pages=pages, progress=progress, sleep=sleep)
+            rows = target.execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+        finally:
+            target.close()
+    finally:
+        source.close()
+    os.replace(partial, path)
+    seconds = time.perf_counter() - started
+    return {"path": path, "rows": rows, "bytes": os.path.getsize(path), "seconds": seconds,
+            "rows_per_second": rate(rows, seconds)}
+
+
+def print_report(action, report):
+    """
+    Print a human-readable summary of a transfer.
+    :param action: "export", "import" or "snapshot".
+    :param report: Report dict of the matching function.
+    :return: None
+    """
+    print(f"\n *********** {action.upper()} REPORT *********** \n")
+    if action == "import":
+        if report["resumed_from"]:
+            print(f"Resumed after record {report['resumed_from']}")
+        print(f"Inserted: {report['inserted']}")
+        print(f"Updated:  {report['updated']}")
+        print(f"Skipped:  {report['skipped']}")
+        print(f"Failed:   {report['failed']}")
+        rows = report["records"] - report["resumed_from"]
+        for error in report["errors"]:
+            print(f"  ⚠️ {error}")
+    else:
+        rows = report["rows"]
+        print(f"{rows} movies -> {report['path']}" + (f" ({report['bytes']} bytes)" if "bytes" in report else ""))
+    print(f"Time:     {report['seconds']:.1f}s ({report['rows_per_second']:.0f} rows/s, {rows} rows)")
+
+
+def main(argv=None):
+    """
+    Parse command-line arguments, run the transfer and print the report.
+    :param argv: Optional argument list (defaults to sys.argv).
+    :return: Report dict.
+    """
+    parser = argparse.ArgumentParser(description="Export, import or snapshot the movie catalog.")
+    actions = parser.add_subparsers(dest="action", required=True)
+
+    export = actions.add_parser("export", help="write the movies to CSV or JSONL")
+    export.add_argument("file", help="target file (.csv or .jsonl, optionally .gz)")
+    export.add_argument("--format", choices=["csv", "jsonl"])
+    export.add_argument("--chunk-size", type=int, default=TRANSFER_CHUNK_SIZE)
+
+    load = actions.add_parser("import", help="load movies from CSV or JSONL")
+    load.add_argument("file", help="source file (.csv or .jsonl, optionally .gz)")
+    load.add_argument("--format", choices=["csv", "jsonl"])
+    load.add_argument("--batch-size", type=int, default=TRANSFER_CHUNK_SIZE)
+    load.add_argument("--skip-existing", action="store_true", help="keep stored movies instead of overwriting them")
+    load.add_argument("--restart", action="store_true", help="ignore the checkpoint of an interrupted import")
+
+    snapshot = actions.add_parser("snapshot", help="copy the live database with the online backup API")
+    snapshot.add_argument("file", help="target SQLite file")
+    snapshot.add_argument("--pages", type=int, default=SNAPSHOT_PAGES_PER_STEP,
+                          help="pages per backup step (-1 = one step)")
+    args = parser.parse_args(argv)
+
+    enable_from_settings()
+    storage.init_db()
+    if args.action == "export":
+        report = export_catalog(args.file, args.format, args.chunk_size)
+    elif args.action == "import":
+        report = import_catalog(args.file, args.format, args.batch_size, upsert=not args.skip_existing,
+                                resume=not args.restart)
+    else:
+        report = snapshot_database(args.file, args.pages)
+    print_report(args.action, report)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,137 @@
+import os
+
+# Opt-in instrumentation (see instrumentation.py): MOVIES_METRICS=1 enables it.
+# The JSON summary and Prometheus text file are written at exit; set
+# MOVIES_PROFILE to a path to also dump cProfile stats of the whole run.
+METRICS_ENABLED = os.getenv("MOVIES_METRICS", "") not in ("", "0")
+METRICS_JSON_PATH = os.getenv("MOVIES_METRICS_JSON", "data/metrics.json")
+METRICS_PROMETHEUS_PATH = os.getenv("MOVIES_METRICS_PROM", "data/metrics.prom")
+METRICS_PROFILE_PATH = os.getenv("MOVIES_PROFILE") or None
+
 # Database connection URL (relative SQLite file in the project root)
 DB_URL = "sqlite:///data/movies.db"
 
+# SQLite engine profiles (see storage/engine.py): PRAGMAs run on every new
+# connection, plus connection pool options. "default" keeps stock settings.
+DB_ENGINE_PROFILE = "tuned"
+DB_ENGINE_PROFILES = {
+    "default": {},
+    "tuned": {
+        "pragmas": {
+            "journal_mode": "WAL",                  # readers don't block the writer (and vice versa)
+            "synchronous": "NORMAL",                # no fsync per commit; durable at checkpoints
+            "mmap_size": 256 * 1024 * 1024,         # read pages through a memory map
+            "cache_size": -64 * 1024,               # page cache size in KiB (negative = KiB)
+            "temp_store": "MEMORY",                 # sorts and temp indexes in memory
+            "busy_timeout": 5000,                   # ms to wait for a competing writer
+        },
+        "pool_size": 5,                             # connections kept open
+        "max_overflow": 10,                         # extra connections under load
+        "pool_pre_ping": False,                     # local file: no stale connections to detect
+    },
+}
+
+# Rows per transaction when a schema migration backfills existing data
+MIGRATION_BATCH_SIZE = 10_000
+
+# Rows fetched per query when streaming listings (keyset pagination)
+LIST_CHUNK_SIZE = 1000
+
+# Read count and rating sum from the trigger-maintained aggregates row
+# instead of a COUNT/SUM pass over the table
+STATS_USE_AGGREGATES = True
+
+# Maximum number of results returned by a title search
+SEARCH_RESULT_LIMIT = 50
+
+# Typo-tolerant search over the trigram index
+FUZZY_QUERY_TRIGRAMS = 8            # rarest trigrams of the query looked up in the index
+FUZZY_PROBE_LIMIT = 1000            # titles counted per trigram to find the rarest ones
+FUZZY_POSTINGS_LIMIT = 5000         # titles read per selected trigram at most
+FUZZY_CANDIDATES = 200              # titles sharing the most trigrams, re-ranked in Python
+FUZZY_MIN_SIMILARITY = 0.3          # trigram similarity (0-1) for search suggestions
+DUPLICATE_MIN_SIMILARITY = 0.6      # similarity at which a new title counts as a near-duplicate
+
+# Extended statistics report (analytics.py)
+ANALYTICS_CHUNK_SIZE = 50_000               # rows fetched per round trip when loading the columns
+ANALYTICS_HISTOGRAM_BINS = 10               # equal-width rating bins over 0-10
+ANALYTICS_PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+# Rankings: movies shown by the menu's ranking and the static top page
+TOP_N = 100
+
+# Random picks: ids tried before falling back to counting the matching rows
+RANDOM_MAX_ATTEMPTS = 32
+
+# In-process cache of the catalog, stats and searches for interactive
+# sessions, invalidated by our own writes and by PRAGMA data_version
+CATALOG_CACHE_ENABLED = True
+CATALOG_CACHE_ENTRIES = 256
+
 # Website generation settings
 HOMEPAGE_TITLE = "MY MOVIE APP"
 TEMPLATE_PATH = "static/index_template.html"  # was _static/
 OUTPUT_PATH = "static/index.html"
 PH_TITLE = "__TEMPLATE_TITLE__"
-PH_MOVIE_GRID = "__TEMPLATE_MOVIE_GRID__"
\ No newline at end of file
+PH_MOVIE_GRID = "__TEMPLATE_MOVIE_GRID__"
+PH_PAGINATION = "__TEMPLATE_PAGINATION__"
+MOVIES_PER_PAGE = 100                       # index.html, page-2.html, ...; 0 = one page (edits re-render it all)
+TOP_OUTPUT_PATH = "static/top.html"         # "Top N" leaderboard page (None = don't write it)
+WRITE_CHUNK_SIZE = 500                      # <li> fragments buffered per file write
+
+# Local poster mirror used by the website generator
+POSTER_MIRROR = True                        # download posters and reference local copies
+POSTER_DIR = "static/posters"               # content-addressed image store (+ index.db)
+POSTER_WORKERS = 8                          # concurrent downloads
+POSTER_DISPLAY_WIDTH = 128                  # width the posters are shown at in the grid
+POSTER_REVALIDATE_AFTER = 7 * 24 * 60 * 60  # seconds before a mirrored poster is re-checked
+POSTER_MAX_BYTES = 5 * 1024 * 1024          # larger downloads are rejected
+
+# OMDb API client (key from the environment / .env file: KEY or OMDB_API_KEY)
+def omdb_api_key():
+    """
+    Read the OMDb API key. The .env file is loaded here, on first use, so
+    importing the settings does not pay for python-dotenv.
+    :return: The API key, or None if it is not set.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    return os.getenv("KEY") or os.getenv("OMDB_API_KEY")
+
+
+OMDB_API_URL = "http://www.omdbapi.com/"
+OMDB_POOL_SIZE = 10                         # keep-alive connections kept per host
+OMDB_CONNECT_TIMEOUT = 3.05                 # seconds to establish a connection
+OMDB_READ_TIMEOUT = 10.0                    # seconds to wait for the response
+OMDB_MAX_RETRIES = 3                        # retries on 5xx/429 and connection errors
+OMDB_BACKOFF_FACTOR = 0.5                   # first backoff in seconds, doubled each retry
+OMDB_BACKOFF_MAX = 30.0                     # upper bound for a single backoff sleep
+OMDB_RATE_LIMIT = 10.0                      # requests per second shared by all threads (0 = off)
+OMDB_RATE_BURST = 10                        # token bucket capacity
+
+# OMDb response cache (in-memory LRU in front of an on-disk SQLite table)
+OMDB_CACHE_DB_URL = "sqlite:///data/omdb_cache.db"
+OMDB_CACHE_TTL = 7 * 24 * 60 * 60           # seconds a found movie stays valid
+OMDB_CACHE_NEGATIVE_TTL = 24 * 60 * 60      # seconds a "Movie not found" answer stays valid
+OMDB_CACHE_MEMORY_ENTRIES = 256             # max entries kept in the in-process LRU
+OMDB_CACHE_DISK_ENTRIES = 10_000            # max rows kept in the on-disk cache table
+
+# Bulk import settings
+IMPORT_WORKERS = 8                          # concurrent OMDb lookups
+IMPORT_REQUESTS_PER_SECOND = 10.0           # overall OMDb request rate limit
+IMPORT_BATCH_SIZE = 500                     # rows per executemany / transaction
+
+# Catalog export/import and snapshots (catalog_transfer.py)
+TRANSFER_CHUNK_SIZE = 5000                  # rows per read query / per import transaction
+SNAPSHOT_PAGES_PER_STEP = -1                # backup pages copied per step (-1 = all in one step)
+SNAPSHOT_STEP_SLEEP = 0.005                 # seconds between backup steps, for waiting writers
+
+# Read-only JSON HTTP API (api_server.py)
+API_HOST = "127.0.0.1"
+API_PORT = 8000
+API_WORKERS = 8                             # requests processed at the same time
+API_MAX_CONNECTIONS = 64                    # open connections; more are answered with 503
+API_IDLE_TIMEOUT = 5.0                      # seconds a keep-alive connection may sit idle
+API_CACHE_ENTRIES = 1024                    # rendered responses kept in memory
+API_PAGE_SIZE = 50                          # default /movies page size
+API_MAX_PAGE_SIZE = 500                     # largest accepted per_page / limit
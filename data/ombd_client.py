@@ -1,31 +1,468 @@
 """
 OMDb (omdbapi.com) client helpers.
 
-Loads the API key from the environment variable `KEY` and exposes a
-function to fetch movie metadata by title. Returns a 4-tuple
-(year, rating, poster_image_url, title) or `None` if not found or on
-HTTP/JSON error.
+Takes the API key from `config.settings` (environment variable `KEY`, or
+the .env file, read on the first request). The entry point is
+`fetch_movie_payload()`, which returns the decoded OMDb document for a
+title and raises on network errors, so callers (the CLI, batch scripts,
+the bulk importer) decide how to report failures. `fetch_movie_data()` is
+the original interface, kept for existing callers: it prints problems and
+returns a 4-tuple (year, rating, poster_image_url, title) or `None`.
+
+All requests go through one shared `requests.Session` with a keep-alive
+connection pool, connect/read timeouts, retries with exponential backoff
+and jitter on 5xx/429, and a token-bucket rate limiter shared across
+threads. Per-request latencies are recorded (see `latency_stats()`).
+
+Responses are cached: an in-process LRU sits in front of an on-disk
+SQLite table, so looking up the same title again (e.g. add + refresh)
+costs no network round trip until the entry's TTL runs out.
 """
 
-import os
+import json
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
 import requests
-from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from sqlalchemy import create_engine, text
+
+from instrumentation import timed
+from config.settings import (omdb_api_key, OMDB_API_URL, OMDB_POOL_SIZE, OMDB_CONNECT_TIMEOUT,
+                             OMDB_READ_TIMEOUT, OMDB_MAX_RETRIES, OMDB_BACKOFF_FACTOR, OMDB_BACKOFF_MAX,
+                             OMDB_RATE_LIMIT, OMDB_RATE_BURST,
+                             OMDB_CACHE_DB_URL, OMDB_CACHE_TTL, OMDB_CACHE_NEGATIVE_TTL,
+                             OMDB_CACHE_MEMORY_ENTRIES, OMDB_CACHE_DISK_ENTRIES)
+
+API_KEY = None  # read on first use, see api_key()
+API_URL = OMDB_API_URL
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
 
-load_dotenv()
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+    Allows bursts of up to `capacity` requests and refills at `rate` tokens per second.
+    A rate of 0 (or None) disables limiting.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate or 0.0
+        self.capacity = max(capacity or self.rate or 1, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
 
-API_KEY = os.getenv("KEY")
-API_URL = f"http://www.omdbapi.com/?apikey={API_KEY}&"
+    def acquire(self):
+        """
+        Take one token, sleeping until one is available.
+        :return: Seconds spent waiting.
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # A negative balance is a reservation: wait until it is paid back
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class LatencyMetrics:
+    """
+    Thread-safe per-request latency recorder.
+    Keeps totals plus the most recent `window` samples for percentiles.
+    """
+
+    def __init__(self, window=1000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "errors": 0, "retries": 0, "total_seconds": 0.0}
+
+    def record(self, seconds, error=False, retry=False):
+        """
+        Record one HTTP attempt.
+        :param seconds: Wall-clock duration of the attempt.
+        :param error: True if the attempt failed (exception or retryable status).
+        :param retry: True if the attempt will be retried.
+        :return: None
+        """
+        with self._lock:
+            self._samples.append(seconds)
+            self.counters["requests"] += 1
+            self.counters["errors"] += int(error)
+            self.counters["retries"] += int(retry)
+            self.counters["total_seconds"] += seconds
+
+    def stats(self):
+        """
+        Return counters plus mean/p50/p95/p99/max latency in seconds.
+        :return: Dict of latency statistics.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+            result = dict(self.counters)
+        result["mean"] = result["total_seconds"] / result["requests"] if result["requests"] else 0.0
+        for name, quantile in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            result[name] = samples[min(int(quantile * len(samples)), len(samples) - 1)] if samples else 0.0
+        result["max"] = samples[-1] if samples else 0.0
+        return result
+
+    def reset(self):
+        """Clear all samples and counters."""
+        with self._lock:
+            self._samples.clear()
+            self.counters = {"requests": 0, "errors": 0, "retries": 0, "total_seconds": 0.0}
+
+
+_session = None
+_session_lock = threading.Lock()
+rate_limiter = TokenBucket(OMDB_RATE_LIMIT, OMDB_RATE_BURST)
+metrics = LatencyMetrics()
+
+
+def api_key():
+    """
+    Return the OMDb API key, reading it (and the .env file) on first use.
+    :return: The API key, or None if it is not set.
+    """
+    global API_KEY
+    if API_KEY is None:
+        API_KEY = omdb_api_key()
+    return API_KEY
+
+
+def get_session():
+    """
+    Return the shared HTTP session, creating it on first use.
+    The session keeps up to OMDB_POOL_SIZE keep-alive connections per host.
+    :return: requests.Session instance.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=OMDB_POOL_SIZE, pool_maxsize=OMDB_POOL_SIZE, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Compute the sleep before retry number `attempt` (0-based).
+    Exponential backoff with full jitter, capped at OMDB_BACKOFF_MAX;
+    a numeric Retry-After header takes precedence.
+    :param attempt: Index of the failed attempt.
+    :param retry_after: Value of the Retry-After header, if any.
+    :return: Seconds to sleep.
+    """
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), OMDB_BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(OMDB_BACKOFF_MAX, OMDB_BACKOFF_FACTOR * (2 ** attempt)))
+
+
+@timed("omdb.request")
+def omdb_get(params, api_url=None, limiter=None):
+    """
+    Send a GET request to OMDb with rate limiting, timeouts and retries.
+    :param params: Query parameters (the API key is added automatically).
+    :param api_url: Optional base URL override (e.g. a local fake OMDb server).
+    :param limiter: Optional TokenBucket to use instead of the shared one.
+    :return: The successful requests.Response.
+    :raises requests.RequestException: When all retries are exhausted.
+    """
+    session = get_session()
+    params = {"apikey": api_key(), **params}
+    limiter = limiter or rate_limiter
+
+    for attempt in range(OMDB_MAX_RETRIES + 1):
+        limiter.acquire()
+        last_try = attempt == OMDB_MAX_RETRIES
+        started = time.perf_counter()
+        try:
+            response = session.get(api_url or API_URL, params=params,
+                                   timeout=(OMDB_CONNECT_TIMEOUT, OMDB_READ_TIMEOUT))
+        except (requests.ConnectionError, requests.Timeout):
+            metrics.record(time.perf_counter() - started, error=True, retry=not last_try)
+            if last_try:
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        retryable = response.status_code in RETRY_STATUS_CODES
+        metrics.record(time.perf_counter() - started, error=retryable, retry=retryable and not last_try)
+        if not retryable or last_try:
+            response.raise_for_status()
+            return response
+        time.sleep(backoff_delay(attempt, response.headers.get("Retry-After")))
+
+
+def latency_stats():
+    """
+    Return latency statistics for all OMDb requests made so far.
+    :return: Dict with request/error/retry counts and latency percentiles.
+    """
+    return metrics.stats()
+
+
+class LRUCache:
+    """
+    Small size-bounded LRU mapping of key -> (expires_at, payload).
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """
+        Return the live payload for key, or None if missing or expired.
+        :param key: Cache key.
+        :return: Cached payload or None.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    def put(self, key, payload, expires_at):
+        """
+        Store payload under key, evicting the least recently used entry if full.
+        :param key: Cache key.
+        :param payload: Value to store.
+        :param expires_at: Unix timestamp after which the entry is stale.
+        :return: Number of evicted entries.
+        """
+        self._entries[key] = (expires_at, payload)
+        self._entries.move_to_end(key)
+        evicted = 0
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def clear(self):
+        """Drop all entries."""
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ResponseCache:
+    """
+    Two-level OMDb response cache: in-memory LRU in front of a SQLite table.
+
+    Payloads are the decoded OMDb JSON documents. Found movies live for `ttl`
+    seconds, "Movie not found" answers for `negative_ttl` seconds. The disk
+    table is trimmed to `max_disk_entries` rows, least recently used first.
+    """
+
+    def __init__(self, db_url=OMDB_CACHE_DB_URL, ttl=OMDB_CACHE_TTL,
+                 negative_ttl=OMDB_CACHE_NEGATIVE_TTL,
+                 max_memory_entries=OMDB_CACHE_MEMORY_ENTRIES,
+                 max_disk_entries=OMDB_CACHE_DISK_ENTRIES):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_disk_entries = max_disk_entries
+        self.memory = LRUCache(max_memory_entries)
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self.engine = create_engine(db_url, echo=False)
+
+        with self.engine.connect() as connection:
+            connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS omdb_cache (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_omdb_cache_accessed ON omdb_cache (accessed_at)"
+            ))
+            connection.commit()
+
+    def get(self, key):
+        """
+        Look up a payload, first in memory, then on disk.
+        :param key: Normalized cache key.
+        :return: Cached payload dict, or None on a miss.
+        """
+        with self._lock:
+            payload = self.memory.get(key)
+            if payload is not None:
+                self.counters["memory_hits"] += 1
+                return payload
+
+        now = time.time()
+        with self.engine.connect() as connection:
+            row = connection.execute(
+                text("SELECT payload, expires_at FROM omdb_cache WHERE key = :key"),
+                {"key": key}
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    connection.execute(text("DELETE FROM omdb_cache WHERE key = :key"), {"key": key})
+                    connection.commit()
+                with self._lock:
+                    self.counters["misses"] += 1
+                return None
+            connection.execute(
+                text("UPDATE omdb_cache SET accessed_at = :now WHERE key = :key"),
+                {"now": now, "key": key}
+            )
+            connection.commit()
+
+        payload = json.loads(row[0])
+        with self._lock:
+            self.counters["evictions"] += self.memory.put(key, payload, row[1])
+            self.counters["disk_hits"] += 1
+        return payload
+
+    def put(self, key, payload):
+        """
+        Store a payload in both cache levels with the matching TTL.
+        :param key: Normalized cache key.
+        :param payload: Decoded OMDb JSON document.
+        :return: None
+        """
+        now = time.time()
+        ttl = self.negative_ttl if payload.get("Response") == "False" else self.ttl
+        expires_at = now + ttl
+        with self._lock:
+            self.counters["evictions"] += self.memory.put(key, payload, expires_at)
+
+        with self.engine.connect() as connection:
+            connection.execute(
+                text("""INSERT INTO omdb_cache (key, payload, expires_at, accessed_at)
+                    VALUES (:key, :payload, :expires_at, :now)
+                    ON CONFLICT (key) DO UPDATE SET
+                        payload = excluded.payload,
+                        expires_at = excluded.expires_at,
+                        accessed_at = excluded.accessed_at"""),
+                {"key": key, "payload": json.dumps(payload), "expires_at": expires_at, "now": now}
+            )
+            result = connection.execute(
+                text("""DELETE FROM omdb_cache WHERE key IN (
+                    SELECT key FROM omdb_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET :keep
+                )"""),
+                {"keep": self.max_disk_entries}
+            )
+            connection.commit()
+        with self._lock:
+            self.counters["evictions"] += max(result.rowcount, 0)
+
+    def clear(self):
+        """
+        Remove every cached entry from memory and disk.
+        :return: None
+        """
+        with self._lock:
+            self.memory.clear()
+        with self.engine.connect() as connection:
+            connection.execute(text("DELETE FROM omdb_cache"))
+            connection.commit()
+
+    def stats(self):
+        """
+        Return hit/miss counters and the current hit rate.
+        :return: Dict with counters, lookups and hit_rate.
+        """
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        lookups = hits + self.counters["misses"]
+        return {**self.counters, "lookups": lookups,
+                "hit_rate": hits / lookups if lookups else 0.0}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the shared response cache, creating it on first use.
+    :return: The module-wide ResponseCache instance.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def set_cache(cache):
+    """
+    Replace the shared response cache (e.g. with one backed by a temporary database).
+    :param cache: A ResponseCache instance, or None to recreate the default on next use.
+    :return: None
+    """
+    global _cache
+    _cache = cache
+
+
+def cache_key(title):
+    """
+    Normalize a title into a cache key (trimmed, case-insensitive).
+    :param title: Movie title as typed by the user.
+    :return: Cache key string.
+    """
+    return " ".join(title.split()).lower()
+
+
+@timed("omdb.fetch_movie_payload")
+def fetch_movie_payload(title, api_url=None, limiter=None):
+    """
+    Return the decoded OMDb JSON document for a title, using the cache.
+    Does not print anything, so it is safe to call from worker threads.
+    :param title: Movie title to look up.
+    :param api_url: Optional base URL override (e.g. a local fake OMDb server).
+    :param limiter: Optional TokenBucket to use instead of the shared one.
+    :return: The OMDb response dict (with "Response": "False" when not found).
+    :raises requests.RequestException: On network errors after all retries.
+    """
+    cache = get_cache()
+    key = cache_key(title)
+    data = cache.get(key)
+
+    if data is None:
+        response = omdb_get({"t": title}, api_url=api_url, limiter=limiter)
+        data = response.json()
+        # Only cache real answers - not e.g. "Invalid API key!" or "Request limit reached!"
+        if data.get("Response") != "False" or "not found" in data.get("Error", "").lower():
+            cache.put(key, data)
+    return data
 
 
 def fetch_movie_data(title):
     """
-    Fetch movie metadata by title from OMDb.
+    Fetch movie metadata by title from OMDb (kept for existing callers;
+    new code uses `fetch_movie_payload()`).
     :param title: Movie title to look up.
     :return: A tuple (year, rating, poster_image_url, title) if found, otherwise None.
     """
-    params = {"t": title}
-    response = requests.get(API_URL, params=params)
-    data = response.json()
+    try:
+        data = fetch_movie_payload(title)
+    except (requests.RequestException, ValueError) as e:
+        print(f"⚠️ Could not reach OMDb for '{title}': {e}")
+        return None
 
     # API-Fehlerbehandlung: Film nicht gefunden
     if data.get("Response") == "False":
@@ -36,9 +473,4 @@ def fetch_movie_data(title):
     year = data["Year"]
     rating = data["imdbRating"]
     poster_image_url = data["Poster"]
-    print(year, rating, poster_image_url, title)
     return year, rating, poster_image_url, title
-
-
-
-
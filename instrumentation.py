@@ -0,0 +1,326 @@
+"""
+Opt-in instrumentation for the hot paths of the Movie app.
+
+Storage calls, OMDb requests and website generator stages are wrapped with
+`timed()`, and the storage layer counts rows read and written with
+`count()`. Both are no-ops (one flag check) until `enable()` is called,
+for example by setting the environment variable `MOVIES_METRICS=1`.
+
+Once enabled, every SQL statement is also timed through SQLAlchemy cursor
+events, and the collected numbers (plus OMDb latency and response cache
+hit rates) can be exported:
+    - as a Prometheus text file (`write_prometheus()`),
+    - as a JSON summary, written at exit if METRICS_JSON_PATH is set,
+    - as a cProfile dump of the whole run, if METRICS_PROFILE_PATH is set.
+
+Importing the module loads only the standard library (SQLAlchemy is
+imported by `enable()`), so it adds nothing to startup.
+"""
+
+import atexit
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from config.settings import (METRICS_ENABLED, METRICS_JSON_PATH, METRICS_PROMETHEUS_PATH,
+                             METRICS_PROFILE_PATH)
+
+# Code flag of generator functions (inspect.CO_GENERATOR, without importing inspect)
+CO_GENERATOR = 0x20
+
+ENABLED = False
+_lock = threading.Lock()
+_timings = {}   # name -> [count, total seconds, max seconds, errors]
+_counters = {}  # name -> value
+_profiler = None
+
+
+def record(name, seconds, error=False):
+    """
+    Add one timing sample.
+    :param name: Metric name, e.g. "storage.add_movies".
+    :param seconds: Duration.
+    :param error: Whether the timed call raised.
+    :return: None
+    """
+    with _lock:
+        timing = _timings.setdefault(name, [0, 0.0, 0.0, 0])
+        timing[0] += 1
+        timing[1] += seconds
+        timing[2] = max(timing[2], seconds)
+        timing[3] += error
+
+
+def count(name, value=1):
+    """
+    Increase a counter (ignored while instrumentation is disabled).
+    :param name: Counter name, e.g. "storage.rows_read".
+    :param value: Amount to add.
+    :return: None
+    """
+    if ENABLED:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+
+@contextmanager
+def _measure(name):
+    started = time.perf_counter()
+    try:
+        yield
+    except GeneratorExit:
+        # A timed generator closed before it was exhausted: a normal end, not a failure
+        record(name, time.perf_counter() - started)
+        raise
+    except BaseException:
+        record(name, time.perf_counter() - started, error=True)
+        raise
+    record(name, time.perf_counter() - started)
+
+
+def timed(name):
+    """
+    Time a function (as a decorator) or a block (as a context manager).
+    Generator functions are timed until they are exhausted or closed.
+
+        @timed("storage.list_movies")
+        def list_movies(): ...
+
+        with timed("generator.poster_sync"):
+            ...
+
+    :param name: Metric name.
+    :return: Decorator that is also a context manager.
+    """
+    return _Timer(name)
+
+
+class _Timer:
+    """Decorator/context manager returned by timed()."""
+
+    __slots__ = ("name", "_block")
+
+    def __init__(self, name):
+        self.name = name
+        self._block = None
+
+    def __enter__(self):
+        if ENABLED:
+            self._block = _measure(self.name)
+            self._block.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        block, self._block = self._block, None
+        return block.__exit__(*exc_info) if block is not None else False
+
+    def __call__(self, function):
+        name = self.name
+
+        if function.__code__.co_flags & CO_GENERATOR:
+            @functools.wraps(function)
+            def generator_wrapper(*args, **kwargs):
+                if not ENABLED:
+                    return (yield from function(*args, **kwargs))
+                with _measure(name):
+                    return (yield from function(*args, **kwargs))
+            return generator_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            with _measure(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("instrumentation_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["instrumentation_started"].pop()
+    database = os.path.basename(conn.engine.url.database or "memory")
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    record(f"sql.{database}.{verb.lower()}", time.perf_counter() - started)
+    if verb in ("INSERT", "UPDATE", "DELETE") and cursor.rowcount > 0:
+        count(f"sql.{database}.rows_written", cursor.rowcount)
+
+
+def _handle_error(context):
+    connection = context.connection
+    started = connection.info.get("instrumentation_started") if connection is not None else None
+    if started:
+        database = os.path.basename(connection.engine.url.database or "memory")
+        record(f"sql.{database}.failed", time.perf_counter() - started.pop(), error=True)
+
+
+def enable(json_path=METRICS_JSON_PATH, prometheus_path=METRICS_PROMETHEUS_PATH, profile_path=METRICS_PROFILE_PATH):
+    """
+    Start collecting metrics; optionally export them when the process exits.
+    :param json_path: Write a JSON summary here at exit (None = don't).
+    :param prometheus_path: Write a Prometheus text file here at exit (None = don't).
+    :param profile_path: Run cProfile and dump its stats here at exit (None = don't).
+    :return: None
+    """
+    global ENABLED, _profiler
+    if ENABLED:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    ENABLED = True
+
+    if profile_path:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+        atexit.register(_dump_profile, profile_path)
+    if json_path:
+        atexit.register(write_json, json_path)
+    if prometheus_path:
+        atexit.register(write_prometheus, prometheus_path)
+
+
+def disable():
+    """
+    Stop collecting metrics (collected values are kept until reset()).
+    :return: None
+    """
+    global ENABLED
+    if not ENABLED:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.remove(Engine, "handle_error", _handle_error)
+    ENABLED = False
+    if _profiler is not None:
+        _profiler.disable()
+
+
+def enable_from_settings():
+    """
+    Enable instrumentation if METRICS_ENABLED is set (env MOVIES_METRICS=1).
+    :return: True if instrumentation is on.
+    """
+    if METRICS_ENABLED:
+        enable()
+    return ENABLED
+
+
+def reset():
+    """
+    Forget all collected timings and counters.
+    :return: None
+    """
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+
+
+def _dump_profile(path):
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(path)
+
+
+def snapshot():
+    """
+    Collect all metrics, including OMDb latency and cache hit rates if the
+    client has been used in this process, and the catalog cache counters.
+    :return: Dict with "timings", "counters" and (if available) "omdb" and "catalog_cache" sections.
+    """
+    with _lock:
+        timings = {name: {"count": calls, "total_seconds": total, "max_seconds": longest,
+                          "mean_seconds": total / calls if calls else 0.0, "errors": errors}
+                   for name, (calls, total, longest, errors) in sorted(_timings.items())}
+        counters = dict(sorted(_counters.items()))
+    result = {"timings": timings, "counters": counters}
+
+    # Only report the client if something imported it - never import it here
+    client = sys.modules.get("data.ombd_client")
+    if client is not None:
+        result["omdb"] = {"latency": client.latency_stats()}
+        if client._cache is not None:
+            result["omdb"]["cache"] = client._cache.stats()
+    storage = sys.modules.get("storage.movie_storage_sql")
+    if storage is not None:
+        result["catalog_cache"] = storage.catalog_cache.stats()
+    return result
+
+
+def write_json(path):
+    """
+    Write snapshot() as JSON.
+    :param path: Output file.
+    :return: None
+    """
+    with open(path, "w", encoding="utf-8") as fileobj:
+        json.dump(snapshot(), fileobj, indent=2)
+
+
+def metric_name(name):
+    """
+    Turn a dotted metric name into a Prometheus metric name.
+    :param name: E.g. "storage.add_movies".
+    :return: E.g. "movies_storage_add_movies".
+    """
+    return "movies_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def prometheus_text():
+    """
+    Render snapshot() in the Prometheus text exposition format.
+    :return: String of metric lines.
+    """
+    data = snapshot()
+    lines = []
+    for name, timing in data["timings"].items():
+        metric = metric_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        lines.append(f"{metric}_count {timing['count']}")
+        lines.append(f"{metric}_sum {timing['total_seconds']:.9f}")
+        lines.append(f"# TYPE {metric_name(name)}_errors_total counter")
+        lines.append(f"{metric_name(name)}_errors_total {timing['errors']}")
+    for name, value in data["counters"].items():
+        metric = metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    omdb = data.get("omdb", {})
+    for key in ("requests", "errors", "retries"):
+        if key in omdb.get("latency", {}):
+            lines.append(f"# TYPE movies_omdb_{key}_total counter")
+            lines.append(f"movies_omdb_{key}_total {omdb['latency'][key]}")
+    if "cache" in omdb:
+        lines.append("# TYPE movies_omdb_cache_hit_ratio gauge")
+        lines.append(f"movies_omdb_cache_hit_ratio {omdb['cache']['hit_rate']:.6f}")
+    for key, value in data.get("catalog_cache", {}).items():
+        if key in ("hits", "misses", "invalidations"):
+            lines.append(f"# TYPE movies_catalog_cache_{key}_total counter")
+            lines.append(f"movies_catalog_cache_{key}_total {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """
+    Write the metrics as a Prometheus text file (e.g. for the node exporter's
+    textfile collector). Written to a temporary file first, then renamed.
+    :param path: Output file.
+    :return: None
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as fileobj:
+        fileobj.write(prometheus_text())
+    os.replace(temp_path, path)
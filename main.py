@@ -2,19 +2,34 @@
 Main entry point and CLI for the Movie database app.
 Provides a text-based menu to list, add, delete, update and search movies,
 show basic statistics, and generate a static website from the stored data.
+
+Startup is kept cheap: the storage layer (SQLAlchemy, schema migrations),
+the OMDb client (requests) and the website generator are imported and
+initialized on first use, so the menu appears (and "Exit" returns) without
+loading them. Measure with `python -m benchmarks.startup_report`.
 """
 
-import random
-import statistics
+import json
+import math
+import re
+import sys
 from datetime import datetime
-from data.ombd_client import fetch_movie_data
-import storage.movie_storage_sql as storage
-from website_generator import main as generate_website
+from itertools import islice
+from types import GeneratorType
+
+from config.settings import DUPLICATE_MIN_SIMILARITY, TOP_N
+from instrumentation import enable_from_settings
 
 MIN_YEAR = 1895
 CURRENT_YEAR = datetime.now().year
 RUN_PROGRAM = True
 
+# Trailing sequel number: "2", "Part 2", "II", "Part IV" (roman numerals up to 39)
+SEQUEL_SUFFIX = re.compile(r"\s+(?:part\s+)?(?:\d+|(?=[ivx])x{0,3}(?:ix|iv|v?i{0,3}))$")
+
+# Storage module, imported and migrated by get_storage() on first use
+_storage = None
+
 MENU_OPTIONS = [
     "Exit",
     "List movies",
@@ -25,7 +40,8 @@ MENU_OPTIONS = [
     "Random movie",
     "Search movie",
     "Movies sorted by rating",
-    "Generate website"
+    "Generate website",
+    "Extended stats"
 ]
 
 
@@ -44,56 +60,112 @@ def command_menu_listing(menu_options):
     return menu_body
 
 
+def get_storage():
+    """
+    Import the storage layer and bring the database schema up to date, once.
+    :return: The `storage.movie_storage_sql` module.
+    """
+    global _storage
+    if _storage is None:
+        import storage.movie_storage_sql as storage
+        storage.init_db()
+        _storage = storage
+    return _storage
+
+
 def command_list_movies():
     """
     Print all movies stored in the database along with their details.
+    Movies are streamed from storage in chunks, so memory use stays bounded.
     :return: None
     """
-    movies_data = get_movie_data()
+    storage = get_storage()
+    movies_count = storage.count_movies()
 
-    if not movies_data:
+    if not movies_count:
         print("⚠️ No movies in the database to list.")
         return
 
     print("")
-    print(f"*********** {len(movies_data)} MOVIES IN TOTAL ***********\n")
+    print(f"*********** {movies_count} MOVIES IN TOTAL ***********\n")
 
-    for title, stats in movies_data.items():
+    for title, stats in storage.iter_movies():
         print(title)
         print(f"Title: {title} \nRating: {stats['rating']} \nYear: {stats['year']}")
         print("")
 
 
+def title_stem(title):
+    """
+    A title without its sequel number and plural "s", e.g. "Aliens" and
+    "Alien 3" both give "alien".
+    :param title: Movie title.
+    :return: Case-folded stem.
+    """
+    stem = SEQUEL_SUFFIX.sub("", " ".join(title.casefold().split()))
+    return stem[:-1] if stem.endswith("s") else stem
+
+
+def near_duplicates(storage, title):
+    """
+    Stored titles spelled so much like `title` that it is probably a duplicate.
+    Sequels and plurals ("Alien 3", "Aliens" for "Alien") share most
+    trigrams with the original but are different movies, so they are not
+    reported.
+    :param storage: Storage module.
+    :param title: Title about to be added.
+    :return: List of similar stored titles, best match first.
+    """
+    similar = storage.fuzzy_search_movies(title, limit=3, min_similarity=DUPLICATE_MIN_SIMILARITY)
+    return [stored for stored in similar if title_stem(stored) != title_stem(title)]
+
+
 def command_add_movie():
     """
     Prompt the user to add a new movie (title, year, rating) and save it to storage.
+    The OMDb answer is normalized like in bulk imports: the first year of a
+    range ("2008–2013") and a numeric rating; movies without one are not added.
     :return: None
     """
+    from requests import RequestException
+    from bulk_import import payload_to_row
+    from data.ombd_client import fetch_movie_payload
+    storage = get_storage()
     print("\n *********** ADD MOVIE *********** \n")
 
     # Keep asking for movie title until input is valid or user quits
     while True:
         input_new_film = input("Enter new movie name: ").strip()
-        result = fetch_movie_data(title=input_new_film)
-        if result is None:
+        if input_new_film == "":
+            print("\n⚠️ Movie title cannot be empty - Please try again.\n")
+            continue
+
+        # Duplicate checks run on the local indexes before any OMDb request
+        if storage.get_movie(input_new_film) is not None:
+            print(f"⚠️ Movie '{input_new_film}' already exists")
+            continue
+        similar = near_duplicates(storage, input_new_film)
+        if similar:
+            print(f"⚠️ Similar movies already stored: {', '.join(similar)}")
+            if input("Add it anyway? (y/n): ").strip().lower() != "y":
+                return
+
+        try:
+            payload = fetch_movie_payload(input_new_film)
+        except (RequestException, ValueError) as e:
+            print(f"⚠️ Could not reach OMDb for '{input_new_film}': {e}")
             return
-        year, rating, poster_image_url, title = result
-
-        movies_data = get_movie_data()
-        print(f"Test: {movies_data}")
-        print(f"Test title: {title}")
-        print(f"Test result: {result}")
-
-        if movies_data:
-            if any(title in movie for movie in movies_data):
-                print(f"⚠️ Movie '{input_new_film}' already exists")
-            elif input_new_film == "":
-                print("\n⚠️ Movie title cannot be empty - Please try again.\n")
-            else:
-                break
+        row, error = payload_to_row(payload)
+        if error is not None:
+            print(f"⚠️ Movie '{input_new_film}' could not be added: {error}")
+            return
+
+        # OMDb may answer with the canonical title of a movie that is already stored
+        if storage.get_movie(row["title"]) is not None:
+            print(f"⚠️ Movie '{row['title']}' already exists")
         else:
             break
-    storage.add_movie(title, year, rating, poster_image_url)
+    storage.add_movie(row["title"], row["year"], row["rating"], row["poster_image_url"])
 
 
 def command_delete_movie():
@@ -101,6 +173,7 @@ def command_delete_movie():
     Delete an existing movie from the database after prompting for its title.
     :return: None
     """
+    storage = get_storage()
     print("\n *********** DELETE MOVIES *********** \n")
 
     # Asks until valid input is provided or user quits
@@ -126,11 +199,12 @@ def command_update_movie():
     Allows user to return to the main menu by entering 'q' or 'quit'.
     :return: None
     """
+    storage = get_storage()
     print("\n *********** UPDATE MOVIE RATINGS *********** \n")
 
     # Prompt until valid movie title is entered or user quits
     while True:
-        update_movie_name_input = input("Enter movie name: ").strip().lower()
+        update_movie_name_input = input("Enter movie name: ").strip()
         if update_movie_name_input.lower() in ("q", "quit"):
             print("Returning to main menu...\n")
             return
@@ -158,87 +232,104 @@ def command_update_movie():
 def command_show_all_stats():
     """
     Calls functions to show average, median, best and worst rated movies.
+    All numbers are computed by the storage layer in SQL (and cached until the next write).
     :return: None
     """
+    storage = get_storage()
     print("\n *********** STATISTICS MOVIES *********** \n")
 
-    movies_data = get_movie_data()
+    stats = storage.cached_stats()
 
-    if not movies_data:
+    if not stats["count"]:
         print("⚠️ No movies in the database to list.")
         return
 
-    movie_stats_average(movies_data)
-    movie_stats_median(movies_data)
-    movie_stats_best_movie(movies_data)
-    movie_stats_worst_movie(movies_data)
+    movie_stats_average(stats)
+    movie_stats_median(stats)
+    movie_stats_best_movie(stats)
+    movie_stats_worst_movie(stats)
 
 
-def movie_stats_average(movies):
+def command_show_extended_stats():
     """
-    Calculates and displays the average rating of all movies.
-    :param movies: list of movie dictionaries
+    Shows the extended report: percentiles, histogram, decades and correlation.
+    Computed by the analytics module over the year and rating columns.
     :return: None
     """
-    count_all_ratings = 0
-    count_all_movies = len(movies)
-    for stats in movies.values():
-        count_all_ratings += stats["rating"]
-    average_rating = count_all_ratings / count_all_movies
-    print(f"Average rating: {average_rating:.1f}")
+    import analytics
+    print("\n *********** EXTENDED STATISTICS *********** \n")
 
+    report = analytics.report()
+    if not report["count"]:
+        print("⚠️ No movies in the database to list.")
+        return
+    movie_stats_extended(report)
 
-def movie_stats_median(movies):
+
+def movie_stats_average(stats):
     """
-    Calculates and displays the median rating of all movies.
-    :param movies: list of movie dictionaries
+    Displays the average rating of all movies.
+    :param stats: statistics dictionary from storage.movie_stats()
     :return: None
     """
-    all_ratings_list = []
-    for stats in movies.values():
-        all_ratings_list.append(stats["rating"])
-    median_rating_not_equal_count = statistics.median(all_ratings_list)
-    print(f"Median rating: {median_rating_not_equal_count} \n")
+    print(f"Average rating: {stats['average']:.1f}")
 
 
-def movie_stats_best_movie(movies):
+def movie_stats_median(stats):
     """
-    Finds and displays the movie(s) with the highest rating.
-    :param movies: list of movie dictionaries
+    Displays the median rating of all movies.
+    :param stats: statistics dictionary from storage.movie_stats()
     :return: None
     """
-    max_rating = 0
-    max_title = []
-
-    for stats in movies.values():
-        if stats["rating"] > max_rating:
-            max_rating = stats["rating"]
+    print(f"Median rating: {stats['median']} \n")
 
-    for movie, stats in movies.items():
-        if stats["rating"] == max_rating:
-            max_title.append(movie)
 
+def movie_stats_best_movie(stats):
+    """
+    Displays the movie(s) with the highest rating.
+    :param stats: statistics dictionary from storage.movie_stats()
+    :return: None
+    """
     init_result = "Best movie(s): \n"
-    for movie in max_title:
-        init_result += f"{movie}, with rating {max_rating}\n"
+    for movie in stats["best"]:
+        init_result += f"{movie}, with rating {stats['max']}\n"
     print(init_result)
 
 
-def movie_stats_worst_movie(movies):
+def movie_stats_worst_movie(stats):
     """
-    Finds and displays the movie(s) with the lowest rating.
-    :param movies: list of movie dictionaries
+    Displays the movie(s) with the lowest rating.
+    :param stats: statistics dictionary from storage.movie_stats()
     :return: None
     """
-    min_rating = min([stats["rating"] for stats in movies.values()])
-    min_title = [movie for movie, stats in movies.items() if stats["rating"] == min_rating]
-
     init_result = "Worst movie(s): \n"
-    for movie in min_title:
-        init_result += f"{movie}, with rating {min_rating}\n"
+    for movie in stats["worst"]:
+        init_result += f"{movie}, with rating {stats['min']}\n"
     print(init_result)
 
 
+def movie_stats_extended(report):
+    """
+    Displays the extended report: spread, percentiles, rating histogram,
+    per-decade breakdown and the rating/year correlation.
+    :param report: dictionary from analytics.report()
+    :return: None
+    """
+    print(f"Standard deviation: {report['stdev']:.2f}")
+    print("Percentiles: " + ", ".join(f"p{point} {value:.1f}" for point, value in report["percentiles"].items()))
+    print("\nRatings:")
+    widest = max(bucket["count"] for bucket in report["histogram"]) or 1
+    for bucket in report["histogram"]:
+        bar = "#" * round(40 * bucket["count"] / widest)
+        print(f"{bucket['from']:4.1f} - {bucket['to']:4.1f} {bucket['count']:>8} {bar}")
+    print("\nDecades:")
+    for decade in report["decades"]:
+        print(f"{decade['from']}s {decade['count']:>8} movies, average {decade['mean']:.1f} "
+              f"({decade['min']} - {decade['max']})")
+    correlation = report["year_rating_correlation"]
+    print(f"\nRating/year correlation: {'n/a' if correlation is None else f'{correlation:+.2f}'}\n")
+
+
 def command_random_movie():
     """
     Selects and displays a random movie from the film database, including its rating.
@@ -246,27 +337,36 @@ def command_random_movie():
     """
     print("\n *********** RANDOM MOVIE *********** \n")
 
-    movies_data = get_movie_data()
+    movie = pick_random_movie()
 
-    if not movies_data:
+    if movie is None:
         print("⚠️ No movies in the database to to select from.")
         return
 
-    random_title, movie_data = random.choice(list(movies_data.items()))
+    random_title, movie_data = movie
     print(f"YOUR RANDOM MOVIE: {random_title}, rated {movie_data['rating']}.")
 
 
+def pick_random_movie(**options):
+    """
+    Pick one stored movie at random, sampled in SQLite (the catalog is not loaded).
+    :param options: Filters and weighting of storage.random_movie().
+    :return: Tuple (title, data dictionary), or None if no movie matches.
+    """
+    movie = get_storage().random_movie(**options)
+    return (movie["title"], movie) if movie else None
+
+
 def command_search_movie():
     """
-    Allows the user to search for a movie by partial title.
-    All matching movies and their ratings will be displayed.
+    Allows the user to search for a movie by words or word beginnings of its title.
+    The best matching movies and their ratings will be displayed; if nothing
+    matches, titles that are spelled similarly are suggested.
     :return: None
     """
     print("\n *********** SEARCH MOVIES *********** \n")
 
-    movies_data = get_movie_data()
-
-    if not movies_data:
+    if not get_storage().has_movies():
         print("⚠️ No movies in the database to search.")
         return
 
@@ -278,33 +378,56 @@ def command_search_movie():
         else:
             break
 
-    movie_found = False
+    movies_found = get_storage().cached_search(search_input)
+
+    for movie, stats in movies_found.items():
+        print(f"{movie}, {stats['rating']}")
+    if movies_found:
+        return
 
-    for movie, stats in movies_data.items():
-        if search_input.lower() in movie.lower():
-            movie_found = True
-            print(f"{movie}, {stats['rating']}")
-    if not movie_found:
+    # No title contains these words - maybe they are misspelled
+    suggestions = get_storage().fuzzy_search_movies(search_input, limit=5)
+    if not suggestions:
         print(f"Movie not found for search: '{search_input}'")
+        return
+    print(f"Movie not found for search: '{search_input}'. Did you mean:")
+    for movie, stats in suggestions.items():
+        print(f"{movie}, {stats['rating']}")
 
 
 def command_movies_sorted_by_rating():
     """
-    Display all movies sorted by rating in descending order.
+    Display the best rated movies (top TOP_N), optionally of one decade.
+    The leaderboard is read from the rating index, so the rest of the table
+    is never touched; tied movies share a rank.
     :return: None
     """
+    storage = get_storage()
     print("\n *********** MOVIE RANKING - BY RATING *********** \n")
 
-    movies_data = get_movie_data()
-
-    if not movies_data:
+    if not storage.has_movies():
         print("⚠️ No movies in the database to list.")
         return
 
-    movies_sorted_list = sorted(movies_data.items(), key=lambda movie: movie[1]["rating"], reverse=True)
+    decade = None
+    while True:
+        decade_input = input("Decade to rank (e.g. 1990), or Enter for all movies: ").strip()
+        if not decade_input:
+            break
+        try:
+            decade = int(decade_input)
+            storage.decade_range(decade)
+            break
+        except ValueError:
+            print("\n⚠️ Please enter the first year of a decade, e.g. 1990.\n")
 
-    for index, movie in enumerate(movies_sorted_list):
-        print(f"{index + 1}.  {movie[1]['rating']} - {movie[0]}")
+    ranking = storage.top_movies(TOP_N, decade=decade)
+    if not ranking:
+        print(f"⚠️ No movies from the {decade}s in the database.")
+        return
+    print(f"TOP {len(ranking)}" + (f" OF THE {decade}s" if decade else "") + "\n")
+    for movie in ranking:
+        print(f"{movie['rank']}.  {movie['rating']} - {movie['title']}")
 
 
 def command_exit_program():
@@ -323,18 +446,447 @@ def command_generate_website():
     Generate the static website using the website generator module.
     :return: None
     """
+    from website_generator import main as generate_website
+    get_storage()
     generate_website()
 
 
-def get_movie_data():
+class ScriptError(Exception):
+    """A scripted command could not be carried out (reported, not raised to the shell)."""
+
+
+def check_number(name, value, kind=float):
     """
-    Get all movies from the storage module.
-    :return: Mapping of movie title to its data dictionary.
+    Validate a numeric argument; batch lines may also pass numeric strings.
+    :param name: Argument name for the message.
+    :param value: Value given (None means not set).
+    :param kind: float or int.
+    :return: The value as `kind`, or None.
+    :raises ScriptError: If the value is not a number (or not a whole number for int).
     """
-    return storage.list_movies()
+    if value is None:
+        return None
+    expected = "a whole number" if kind is int else "a number"
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ScriptError(f"{name} must be {expected}")
+    try:
+        number = float(value)
+    except ValueError:
+        raise ScriptError(f"{name} must be {expected}")
+    if not math.isfinite(number) or (kind is int and not number.is_integer()):
+        raise ScriptError(f"{name} must be {expected}")
+    return kind(number)
 
 
-def main():
+def check_count(name, value):
+    """
+    Validate a limit or offset.
+    :param name: Argument name for the message.
+    :param value: Value given (None means no limit).
+    :return: The value as int, or None.
+    :raises ScriptError: If the value is not a whole number or is negative.
+    """
+    value = check_number(name, value, int)
+    if value is not None and value < 0:
+        raise ScriptError(f"{name} must be >= 0")
+    return value
+
+
+def check_text(name, value):
+    """
+    Validate a string argument.
+    :raises ScriptError: If the value is not a string.
+    """
+    if not isinstance(value, str):
+        raise ScriptError(f"{name} must be a string")
+    return value
+
+
+def check_flag(name, value):
+    """
+    Validate a true/false argument.
+    :raises ScriptError: If the value is not a boolean.
+    """
+    if not isinstance(value, bool):
+        raise ScriptError(f"{name} must be true or false")
+    return value
+
+
+def check_filters(min_rating, max_rating, year_from, year_to):
+    """
+    Validate the rating and year filters shared by list and random.
+    :return: Dict of keyword arguments for the storage functions.
+    """
+    return {"min_rating": check_number("min_rating", min_rating),
+            "max_rating": check_number("max_rating", max_rating),
+            "year_from": check_number("year_from", year_from, int),
+            "year_to": check_number("year_to", year_to, int)}
+
+
+def movie_record(title, data):
+    """
+    Build the JSON representation of a movie.
+    :param title: Movie title.
+    :param data: Data dictionary from storage.
+    :return: Dict with title, year, rating and poster_image_url.
+    """
+    return {"title": title, "year": data["year"], "rating": data["rating"],
+            "poster_image_url": data["poster_image_url"]}
+
+
+def script_list(order="id", descending=False, min_rating=None, max_rating=None, year_from=None, year_to=None,
+                limit=None):
+    """
+    List movies (streamed).
+    :return: Generator of movie records.
+    :raises ScriptError: For an unknown order, a negative limit or a non-numeric filter.
+    """
+    limit = check_count("limit", limit)
+    filters = check_filters(min_rating, max_rating, year_from, year_to)
+    if order not in get_storage().LISTING_ORDERS:
+        raise ScriptError(f"cannot order by {order!r}")
+    movies = get_storage().iter_movies(order_by=order, descending=check_flag("descending", descending), **filters)
+    return (movie_record(title, data) for title, data in islice(movies, limit))
+
+
+def script_sorted(limit=None):
+    """
+    List movies by rating, best first (streamed).
+    :return: Generator of movie records.
+    """
+    return script_list(order="rating", descending=True, limit=limit)
+
+
+def script_top(limit=TOP_N, offset=0, year_from=None, year_to=None, decade=None):
+    """
+    A page of the rating leaderboard (tied movies share a rank).
+    :return: List of movie records with "rank".
+    :raises ScriptError: For a negative limit or offset, a non-numeric year or a year
+        that does not start a decade.
+    """
+    limit, offset = check_count("limit", limit), check_count("offset", offset)
+    year_from, year_to = check_number("year_from", year_from, int), check_number("year_to", year_to, int)
+    decade = check_number("decade", decade, int)
+    try:
+        return get_storage().top_movies(limit, offset, year_from=year_from, year_to=year_to, decade=decade)
+    except ValueError as e:
+        raise ScriptError(str(e))
+
+
+def script_add(title, upsert=False, force=False):
+    """
+    Fetch a movie from OMDb and store it.
+    Stored and near-duplicate titles are detected before OMDb is asked.
+    :param title: Title to look up.
+    :param upsert: Overwrite the stored movie if it already exists.
+    :param force: Add the movie even if a similarly spelled title is stored.
+    :return: Dict with the stored movie and the outcome ("inserted", "updated" or "skipped").
+    :raises ScriptError: For an empty title, a near-duplicate or a failed lookup.
+    """
+    from requests import RequestException
+    from bulk_import import payload_to_row
+    from data.ombd_client import fetch_movie_payload
+
+    if not check_text("title", title).strip():
+        raise ScriptError("movie title cannot be empty")
+    check_flag("upsert", upsert)
+    check_flag("force", force)
+    storage = get_storage()
+    if not upsert:
+        stored = storage.get_movie(title)
+        if stored is not None:
+            return {**stored, "outcome": "skipped"}
+        if not force:
+            similar = near_duplicates(storage, title)
+            if similar:
+                raise ScriptError(f"'{title}' looks like stored movie(s) {', '.join(map(repr, similar))}; "
+                                  "use force to add it anyway")
+    try:
+        payload = fetch_movie_payload(title)
+    except (RequestException, ValueError) as e:
+        raise ScriptError(f"'{title}': OMDb request failed: {e}")
+    row, error = payload_to_row(payload)
+    if error is not None:
+        raise ScriptError(f"'{title}': {error}")
+    outcome, = storage.add_movies([row], upsert=upsert)
+    return {**row, "outcome": outcome}
+
+
+def script_delete(titles):
+    """
+    Delete movies by title.
+    :param titles: List of titles.
+    :return: List of {"title", "outcome"} with outcome "deleted" or "not found".
+    :raises ScriptError: If titles is not a list of strings.
+    """
+    if not isinstance(titles, list) or not all(isinstance(title, str) for title in titles):
+        raise ScriptError("titles must be a list of strings")
+    outcomes = get_storage().delete_movies(titles)
+    return [{"title": title, "outcome": outcome} for title, outcome in zip(titles, outcomes)]
+
+
+def script_update(title, rating):
+    """
+    Set the rating of a movie.
+    :param title: Movie title.
+    :param rating: New rating (0-10).
+    :return: Dict with title, rating and outcome ("updated" or "not found").
+    :raises ScriptError: For a non-string title or a rating that is not a number from 0 to 10.
+    """
+    check_text("title", title)
+    rating = check_number("rating", rating)
+    if rating is None or not 0 <= rating <= 10:
+        raise ScriptError("rating must be between 0 and 10")
+    outcome, = get_storage().update_ratings([(title, rating)])
+    return {"title": title, "rating": rating, "outcome": outcome}
+
+
+def script_stats(extended=False):
+    """
+    Rating statistics.
+    :param extended: Add the report of analytics.report() under "extended".
+    :return: Dict from storage.movie_stats(), or {"count": 0} for an empty database.
+    """
+    check_flag("extended", extended)
+    stats = get_storage().cached_stats()
+    if not stats["count"]:
+        return {"count": 0}
+    if extended:
+        import analytics
+        stats = {**stats, "extended": analytics.report()}
+    return stats
+
+
+def script_search(query, limit=None, fuzzy=False):
+    """
+    Search titles.
+    :param query: Words or word prefixes (with fuzzy: a title, typos allowed).
+    :param limit: Maximum number of results (default SEARCH_RESULT_LIMIT).
+    :param fuzzy: Rank titles by trigram similarity instead of matching words.
+    :return: List of movie records, best matches first (with fuzzy: plus "similarity").
+    :raises ScriptError: For a non-string query or a negative limit.
+    """
+    check_text("query", query)
+    limit = check_count("limit", limit)
+    storage = get_storage()
+    search = storage.fuzzy_search_movies if check_flag("fuzzy", fuzzy) else storage.cached_search
+    movies = search(query) if limit is None else search(query, limit=limit)
+    if fuzzy:
+        return [{**movie_record(title, data), "similarity": data["similarity"]} for title, data in movies.items()]
+    return [movie_record(title, data) for title, data in movies.items()]
+
+
+def script_random(min_rating=None, max_rating=None, year_from=None, year_to=None, weighted=False):
+    """
+    Pick a random movie.
+    :param weighted: Pick movies in proportion to their rating.
+    :return: Movie record, or None if no movie matches.
+    :raises ScriptError: For a non-numeric filter.
+    """
+    movie = pick_random_movie(**check_filters(min_rating, max_rating, year_from, year_to),
+                              weighted=check_flag("weighted", weighted))
+    return movie_record(*movie) if movie else None
+
+
+def script_generate():
+    """
+    Build the website.
+    :return: Dict with the rewritten files and the poster sync counts.
+    """
+    from website_generator import build_website
+    get_storage()
+    return build_website()
+
+
+SCRIPT_COMMANDS = {
+    "list": script_list,
+    "add": script_add,
+    "delete": script_delete,
+    "update": script_update,
+    "stats": script_stats,
+    "search": script_search,
+    "sorted": script_sorted,
+    "random": script_random,
+    "top": script_top,
+    "generate": script_generate,
+}
+
+
+def build_parser():
+    """
+    Build the command-line parser for the scripting mode.
+    :return: argparse.ArgumentParser
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Movie database. Without a command the interactive menu starts; "
+                    "commands print JSON.")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    listing = commands.add_parser("list", help="list movies")
+    listing.add_argument("--order", choices=["id", "title", "rating"], default="id")
+    listing.add_argument("--descending", action="store_true")
+    listing.add_argument("--min-rating", type=float)
+    listing.add_argument("--max-rating", type=float)
+    listing.add_argument("--year-from", type=int)
+    listing.add_argument("--year-to", type=int)
+    listing.add_argument("--limit", type=int)
+
+    add = commands.add_parser("add", help="fetch a movie from OMDb and store it")
+    add.add_argument("title")
+    add.add_argument("--upsert", action="store_true", help="overwrite the movie if it exists")
+    add.add_argument("--force", action="store_true", help="add it even if a similar title is stored")
+
+    delete = commands.add_parser("delete", help="delete movies")
+    delete.add_argument("titles", nargs="+")
+
+    update = commands.add_parser("update", help="set the rating of a movie")
+    update.add_argument("title")
+    update.add_argument("rating", type=float)
+
+    stats = commands.add_parser("stats", help="rating statistics")
+    stats.add_argument("--extended", action="store_true",
+                       help="add percentiles, histogram, per-decade/per-year breakdowns and correlation")
+
+    search = commands.add_parser("search", help="search titles")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int)
+    search.add_argument("--fuzzy", action="store_true", help="tolerate typos (trigram similarity)")
+
+    ranking = commands.add_parser("sorted", help="movies by rating, best first")
+    ranking.add_argument("--limit", type=int)
+
+    top = commands.add_parser("top", help="rating leaderboard with ranks")
+    top.add_argument("--limit", type=int, default=TOP_N)
+    top.add_argument("--offset", type=int, default=0)
+    top.add_argument("--year-from", type=int)
+    top.add_argument("--year-to", type=int)
+    top.add_argument("--decade", type=int, help="e.g. 1990")
+
+    pick = commands.add_parser("random", help="a random movie")
+    pick.add_argument("--min-rating", type=float)
+    pick.add_argument("--max-rating", type=float)
+    pick.add_argument("--year-from", type=int)
+    pick.add_argument("--year-to", type=int)
+    pick.add_argument("--weighted", action="store_true", help="favour better rated movies")
+    commands.add_parser("generate", help="generate the website")
+    commands.add_parser("batch", help="run JSONL commands from stdin, one JSON result per line")
+    return parser
+
+
+def run_script_command(command, params):
+    """
+    Run one scripted command.
+    :param command: Name from SCRIPT_COMMANDS.
+    :param params: Keyword arguments of the command.
+    :return: The command's JSON-serializable result (lists may be generators).
+    :raises ScriptError: For unknown commands or bad input.
+    """
+    import inspect
+
+    handler = SCRIPT_COMMANDS.get(command)
+    if handler is None:
+        raise ScriptError(f"unknown command {command!r}")
+    # Only the binding is checked, so a TypeError inside a handler still surfaces as a bug
+    try:
+        inspect.signature(handler).bind(**params)
+    except TypeError as e:
+        raise ScriptError(f"bad arguments for {command!r}: {e}")
+    return handler(**params)
+
+
+def write_json(value, stream):
+    """
+    Write a value as JSON; generators are streamed as a JSON array.
+    :param value: Result of a scripted command.
+    :param stream: Text stream.
+    :return: None
+    """
+    if not isinstance(value, GeneratorType):
+        stream.write(json.dumps(value, ensure_ascii=False))
+        return
+    stream.write("[")
+    for index, item in enumerate(value):
+        stream.write(("," if index else "") + json.dumps(item, ensure_ascii=False))
+    stream.write("]")
+
+
+def run_batch(lines, stream):
+    """
+    Run JSONL commands, e.g. {"command": "update", "title": "Alien", "rating": 8.5},
+    in this process and write one JSON result line per command:
+    {"ok": true, "result": ...} or {"ok": false, "error": "..."} ("id" is echoed if given).
+    :param lines: Iterable of JSON lines (blank lines are skipped).
+    :param stream: Text stream for the results.
+    :return: Number of failed commands.
+    """
+    failures = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ScriptError("each line must be a JSON object")
+            params = dict(request)
+            request_id = params.pop("id", None)
+            command = params.pop("command", None)
+            result = run_script_command(command, params)
+            # Materialize streamed listings, so an error can't cut a line in half
+            if isinstance(result, GeneratorType):
+                result = list(result)
+            response = {"ok": True, "result": result}
+        except Exception as e:
+            failures += 1
+            response = {"ok": False, "error": str(e)}
+        if request_id is not None:
+            response = {"id": request_id, **response}
+        stream.write(json.dumps(response, ensure_ascii=False) + "\n")
+        stream.flush()
+    return failures
+
+
+def run_script(argv):
+    """
+    Run the scripting mode.
+    :param argv: Command-line arguments (without the program name).
+    :return: Exit status.
+    """
+    args = vars(build_parser().parse_args(argv))
+    command = args.pop("command")
+    if command is None:
+        build_parser().print_help()
+        return 2
+    if command == "batch":
+        return 1 if run_batch(sys.stdin, sys.stdout) else 0
+    try:
+        write_json(run_script_command(command, args), sys.stdout)
+    except ScriptError as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        return 1
+    sys.stdout.write("\n")
+    return 0
+
+
+def main(argv=None):
+    """
+    Entry point: runs a scripted command if arguments are given
+    (`python main.py list --limit 10`, `python main.py batch < commands.jsonl`),
+    otherwise the interactive menu.
+    :param argv: Command-line arguments (defaults to sys.argv[1:]).
+    :return: Exit status.
+    """
+    enable_from_settings()
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        return run_script(argv)
+    run_menu()
+    return 0
+
+
+def run_menu():
     """
     Main loop: handles user input and dispatches selected actions.
     :return: None
@@ -350,6 +902,7 @@ def main():
         7: command_search_movie,
         8: command_movies_sorted_by_rating,
         9: command_generate_website,
+        10: command_show_extended_stats,
     }
 
     # Menu loop continues while RUN_PROGRAM is True, first
@@ -385,4 +938,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
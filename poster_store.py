@@ -0,0 +1,334 @@
+"""
+Local, content-addressed mirror of poster images for the static website.
+
+Posters are downloaded concurrently by a bounded worker pool and stored as
+`<POSTER_DIR>/<first 2 hex digits>/<sha256>.<ext>`, so identical images
+from different URLs are stored once. An index table (`index.db` in the
+same directory) maps each URL to its image, size, ETag and Last-Modified,
+which are sent back as If-None-Match / If-Modified-Since when a poster is
+revalidated. Downloads are streamed and abandoned once they pass
+POSTER_MAX_BYTES. When Pillow is installed, a JPEG thumbnail
+`POSTER_DISPLAY_WIDTH` pixels wide is stored next to each image and used
+by the pages; without it the original image is scaled by width/height
+attributes computed from the image header.
+
+Only the posters of movies changed since the last sync are looked up,
+plus the mirrored ones that are due for revalidation, so a sync costs
+O(changes) rather than O(catalog) (see `website_generator.sync_posters`).
+"""
+
+import hashlib
+import io
+import os
+import struct
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import create_engine, text
+
+from instrumentation import timed
+from config.settings import (POSTER_DIR, POSTER_WORKERS, POSTER_DISPLAY_WIDTH, POSTER_REVALIDATE_AFTER,
+                             POSTER_MAX_BYTES, OMDB_CONNECT_TIMEOUT, OMDB_READ_TIMEOUT)
+
+EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/gif": "gif", "image/webp": "webp"}
+SYNC_BATCH_SIZE = 200
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_pillow = None
+
+
+def pillow():
+    """
+    Import Pillow's Image module on first use (thumbnails are optional).
+    :return: The PIL.Image module, or None if Pillow is not installed.
+    """
+    global _pillow
+    if _pillow is None:
+        try:
+            from PIL import Image
+        except ImportError:
+            Image = False
+        _pillow = Image
+    return _pillow or None
+
+
+def read_limited(response, max_bytes):
+    """
+    Read a streamed response body, giving up as soon as it grows too large.
+    :param response: Response of a request made with stream=True.
+    :param max_bytes: Largest accepted body.
+    :return: Body bytes.
+    :raises ValueError: If the body is larger than max_bytes.
+    """
+    too_large = ValueError(f"poster larger than {max_bytes} bytes")
+    if int(response.headers.get("Content-Length") or 0) > max_bytes:
+        raise too_large
+    body = bytearray()
+    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+        body += chunk
+        if len(body) > max_bytes:
+            raise too_large
+    return bytes(body)
+
+
+def image_size(data):
+    """
+    Read the pixel size from a JPEG, PNG or GIF header.
+    :param data: Image bytes.
+    :return: Tuple (width, height), or None for unknown formats.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        return struct.unpack("<HH", data[6:10])
+    if data[:2] == b"\xff\xd8":
+        offset = 2
+        while offset + 9 < len(data):
+            if data[offset] != 0xFF:
+                offset += 1
+                continue
+            marker = data[offset + 1]
+            length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+            # SOF0-SOF15 carry the frame size (except DHT, JPG and DAC markers)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+                return width, height
+            offset += 2 + length
+    return None
+
+
+class PosterStore:
+    """
+    Content-addressed poster mirror with an URL index for revalidation.
+    """
+
+    def __init__(self, root=POSTER_DIR, workers=POSTER_WORKERS, display_width=POSTER_DISPLAY_WIDTH,
+                 revalidate_after=POSTER_REVALIDATE_AFTER):
+        self.root = root
+        self.workers = workers
+        self.display_width = display_width
+        self.revalidate_after = revalidate_after
+        os.makedirs(root, exist_ok=True)
+        self.engine = create_engine(f"sqlite:///{os.path.join(root, 'index.db')}", echo=False)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        with self.engine.connect() as connection:
+            connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS posters (
+                    url TEXT PRIMARY KEY,
+                    path TEXT,
+                    width INTEGER,
+                    height INTEGER,
+                    etag TEXT,
+                    last_modified TEXT,
+                    checked_at REAL NOT NULL,
+                    error TEXT
+                )
+            """))
+            connection.execute(text("CREATE INDEX IF NOT EXISTS idx_posters_checked_at ON posters (checked_at)"))
+            connection.execute(text(
+                "CREATE TABLE IF NOT EXISTS sync_state (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER)"
+            ))
+            connection.commit()
+
+    def _rows(self, connection, urls):
+        """Fetch the index rows of several URLs in one query."""
+        urls = list(urls)
+        if not urls:
+            return {}
+        placeholders = ", ".join(f":u{index}" for index in range(len(urls)))
+        result = connection.execute(
+            text(f"SELECT url, path, width, height, etag, last_modified, checked_at, error "
+                 f"FROM posters WHERE url IN ({placeholders})"),
+            {f"u{index}": url for index, url in enumerate(urls)}
+        ).mappings()
+        return {row["url"]: dict(row) for row in result}
+
+    def _write(self, relative, data):
+        """
+        Write a file of the store unless it exists.
+        The bytes go to a unique temporary file that is then hard-linked into
+        place, so concurrent downloads of the same image never clash.
+        :return: True if the file was written, False if it already existed.
+        """
+        full_path = os.path.join(self.root, relative)
+        if os.path.exists(full_path):
+            return False
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as fileobj:
+                fileobj.write(data)
+            os.link(temp_path, full_path)
+        except FileExistsError:
+            return False
+        finally:
+            os.unlink(temp_path)
+        return True
+
+    def _thumbnail(self, relative, digest):
+        """
+        Store (once) a JPEG thumbnail `display_width` pixels wide, if Pillow is installed.
+        :return: Tuple (thumbnail path relative to the store root, width, height),
+            or None without Pillow or for images Pillow cannot read.
+        """
+        Image = pillow()
+        if Image is None:
+            return None
+        thumb = os.path.join(digest[:2], f"{digest}-{self.display_width}w.jpg")
+        try:
+            if not os.path.exists(os.path.join(self.root, thumb)):
+                with Image.open(os.path.join(self.root, relative)) as image:
+                    image = image.convert("RGB")
+                    image.thumbnail((self.display_width, self.display_width * 4))
+                    buffer = io.BytesIO()
+                    image.save(buffer, "JPEG", quality=85)
+                self._write(thumb, buffer.getvalue())
+            with Image.open(os.path.join(self.root, thumb)) as image:
+                return thumb, image.width, image.height
+        except (OSError, ValueError, Image.DecompressionBombError):
+            return None
+
+    def store_image(self, data, content_type):
+        """
+        Save image bytes under their content hash, plus a thumbnail if possible.
+        If the image already exists it counts as deduplicated.
+        :param data: Image bytes.
+        :param content_type: Content-Type header of the download.
+        :return: Tuple (path relative to the store root, width, height, stored) -
+            `stored` is False when an identical image already existed.
+        :raises ValueError: If the image header gives a width or height of 0.
+        """
+        size = image_size(data)
+        if size is not None and 0 in size:
+            raise ValueError(f"poster has an empty size {size[0]}x{size[1]}")
+        digest = hashlib.sha256(data).hexdigest()
+        extension = EXTENSIONS.get((content_type or "").split(";")[0].strip(), "img")
+        relative = os.path.join(digest[:2], f"{digest}.{extension}")
+        stored = self._write(relative, data)
+
+        thumbnail = self._thumbnail(relative, digest)
+        if thumbnail is not None:
+            return (*thumbnail, stored)
+        if size is None:
+            return relative, None, None, stored
+        width, height = size
+        return relative, self.display_width, round(height * self.display_width / width), stored
+
+    @timed("posters.fetch")
+    def fetch(self, url, known):
+        """
+        Download (or revalidate) one poster. Runs in a worker thread.
+        :param url: Poster URL.
+        :param known: Index row from the last check, or None.
+        :return: Tuple (url, new index row, outcome) where outcome is one of
+            "downloaded", "deduplicated", "not_modified" or "failed".
+        """
+        headers = {}
+        if known and known.get("path"):
+            if known.get("etag"):
+                headers["If-None-Match"] = known["etag"]
+            if known.get("last_modified"):
+                headers["If-Modified-Since"] = known["last_modified"]
+        row = {"url": url, "path": None, "width": None, "height": None, "etag": None,
+               "last_modified": None, "checked_at": time.time(), "error": None}
+        try:
+            with self.session.get(url, headers=headers, timeout=(OMDB_CONNECT_TIMEOUT, OMDB_READ_TIMEOUT),
+                                  stream=True) as response:
+                if response.status_code == 304 and known:
+                    return url, {**known, "checked_at": row["checked_at"], "error": None}, "not_modified"
+                response.raise_for_status()
+                data = read_limited(response, POSTER_MAX_BYTES)
+            path, width, height, stored = self.store_image(data, response.headers.get("Content-Type"))
+        except (requests.RequestException, OSError, ValueError) as e:
+            # Keep serving the previous copy if there is one
+            if known and known.get("path"):
+                return url, {**known, "checked_at": row["checked_at"], "error": str(e)}, "failed"
+            return url, {**row, "error": str(e)}, "failed"
+
+        row.update(path=path, width=width, height=height, etag=response.headers.get("ETag"),
+                   last_modified=response.headers.get("Last-Modified"))
+        return url, row, "downloaded" if stored else "deduplicated"
+
+    @timed("posters.sync")
+    def sync(self, urls):
+        """
+        Mirror the posters of many URLs. Only URLs never seen or last checked
+        more than `revalidate_after` seconds ago are requested.
+        :param urls: Iterable of poster URLs (duplicates and non-HTTP values are skipped).
+        :return: Dict counting "downloaded", "deduplicated", "not_modified", "fresh" and "failed" URLs.
+        """
+        counts = {"downloaded": 0, "deduplicated": 0, "not_modified": 0, "fresh": 0, "failed": 0}
+        urls = (url for url in urls if isinstance(url, str) and url.startswith(("http://", "https://")))
+        now = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                batch = list(dict.fromkeys(islice(urls, SYNC_BATCH_SIZE)))
+                if not batch:
+                    return counts
+                with self.engine.connect() as connection:
+                    known = self._rows(connection, batch)
+                due = [url for url in batch
+                       if url not in known or known[url]["checked_at"] < now - self.revalidate_after]
+                counts["fresh"] += len(batch) - len(due)
+
+                results = list(executor.map(lambda url: self.fetch(url, known.get(url)), due))
+                with self.engine.connect() as connection:
+                    for url, row, outcome in results:
+                        counts[outcome] += 1
+                        connection.execute(
+                            text("""INSERT OR REPLACE INTO posters
+                                (url, path, width, height, etag, last_modified, checked_at, error)
+                                VALUES (:url, :path, :width, :height, :etag, :last_modified, :checked_at, :error)"""),
+                            row
+                        )
+                    connection.commit()
+
+    def due_urls(self):
+        """
+        List mirrored URLs last checked more than `revalidate_after` seconds ago (indexed).
+        :return: List of poster URLs.
+        """
+        with self.engine.connect() as connection:
+            result = connection.execute(text("SELECT url FROM posters WHERE checked_at < :cutoff"),
+                                        {"cutoff": time.time() - self.revalidate_after})
+            return [row[0] for row in result]
+
+    def synced_version(self):
+        """
+        Return the movie change counter value of the last completed catalog sync.
+        :return: Counter value, or None if the catalog was never synced.
+        """
+        with self.engine.connect() as connection:
+            return connection.execute(text("SELECT version FROM sync_state WHERE id = 1")).scalar()
+
+    def save_synced_version(self, version):
+        """
+        Record the movie change counter value a catalog sync covered.
+        :param version: Counter value read before the sync started.
+        """
+        with self.engine.connect() as connection:
+            connection.execute(text("INSERT OR REPLACE INTO sync_state (id, version) VALUES (1, :version)"),
+                               {"version": version})
+            connection.commit()
+
+    def lookup(self, urls, relative_to):
+        """
+        Map poster URLs to their local copies.
+        :param urls: Iterable of poster URLs.
+        :param relative_to: Directory of the HTML page the paths are used in.
+        :return: Dict url -> {"src", "width", "height"} for mirrored posters only.
+        """
+        with self.engine.connect() as connection:
+            rows = self._rows(connection, dict.fromkeys(url for url in urls if url))
+        return {url: {"src": os.path.relpath(os.path.join(self.root, row["path"]), relative_to).replace(os.sep, "/"),
+                      "width": row["width"], "height": row["height"]}
+                for url, row in rows.items() if row["path"]}
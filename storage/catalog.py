@@ -0,0 +1,257 @@
+"""
+Compact in-memory representation of the movie catalog.
+
+`MovieCatalog` keeps the catalog in columns: titles and poster URLs in two
+lists, years and ratings in typed `array` buffers (4 and 8 bytes per movie)
+instead of a dict per row. Stats, rating order and random picks run over
+the columns - with NumPy when it is installed, with the standard library
+otherwise.
+
+`storage.iter_movies()` streams the same `Movie` records (with their id).
+For existing callers the catalog still behaves like the old
+`{title: {"year", "rating", "poster_image_url"}}` mapping: indexing it
+returns a `Movie`, a `__slots__` record that also answers `movie["rating"]`
+and `movie.get("year")` and compares equal to the equivalent dict.
+
+Rows stored by older versions may still hold OMDb's raw strings (a year of
+"2008–2013", a rating of "N/A"). Those are coerced like new rows are (see
+`numeric_values()`), and rows that cannot be are left out of the catalog.
+"""
+
+import math
+import random
+import re
+from array import array
+from collections.abc import Mapping
+
+_numpy = None
+
+YEAR_PATTERN = re.compile(r"\d{4}")
+
+
+def numpy():
+    """
+    Import NumPy on first use (it is optional and slow to import).
+    :return: The numpy module, or None if it is not installed.
+    """
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy as np
+        except ImportError:
+            np = False
+        _numpy = np
+    return _numpy or None
+
+
+def numeric_values(year, rating):
+    """
+    Coerce a stored year and rating to numbers the way `bulk_import.payload_to_row`
+    converts OMDb answers: the first four digits of the year and the rating as a float.
+    :param year: Stored year (int, or a string such as "2008–2013").
+    :param rating: Stored rating (number, or a string such as "8.1" or "N/A").
+    :return: Tuple (year, rating), or None if either value is not numeric.
+    """
+    if not isinstance(year, int):
+        match = YEAR_PATTERN.match(str(year or ""))
+        if not match:
+            return None
+        year = int(match.group())
+    if not isinstance(rating, (int, float)):
+        try:
+            rating = float(rating)
+        except (TypeError, ValueError):
+            return None
+        if not math.isfinite(rating):
+            return None
+    return year, rating
+
+
+class Movie:
+    """
+    One movie; readable as attributes or, like the old dicts, by key.
+    Records streamed by `iter_movies()` also carry the row id (as "id");
+    catalog records do not.
+    """
+
+    __slots__ = ("title", "year", "rating", "poster_image_url", "id")
+
+    FIELDS = ("year", "rating", "poster_image_url")
+
+    def __init__(self, title, year, rating, poster_image_url, id=None):
+        self.title = title
+        self.year = year
+        self.rating = rating
+        self.poster_image_url = poster_image_url
+        self.id = id
+
+    def _has(self, key):
+        return key in self.__slots__ and (key != "id" or self.id is not None)
+
+    def __getitem__(self, key):
+        if not self._has(key):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if self._has(key) else default
+
+    def keys(self):
+        return self.FIELDS if self.id is None else ("id", *self.FIELDS)
+
+    def __eq__(self, other):
+        if isinstance(other, Movie):
+            return ((self.title, self.year, self.rating, self.poster_image_url) ==
+                    (other.title, other.year, other.rating, other.poster_image_url))
+        if isinstance(other, Mapping):
+            return {key: self[key] for key in self.keys()} == dict(other)
+        return NotImplemented
+
+    def __repr__(self):
+        movie_id = "" if self.id is None else f", id={self.id!r}"
+        return (f"Movie(title={self.title!r}, year={self.year!r}, rating={self.rating!r}, "
+                f"poster_image_url={self.poster_image_url!r}{movie_id})")
+
+
+class MovieCatalog(Mapping):
+    """
+    Read-only, column-oriented snapshot of the catalog, mapping title -> Movie.
+    """
+
+    def __init__(self, titles=(), years=(), ratings=(), posters=()):
+        self.titles = list(titles)
+        self.posters = list(posters)
+        self.skipped = 0
+        self._positions = None
+        years, ratings = list(years), list(ratings)
+        try:
+            self.years = array("i", years)
+            self.ratings = array("d", ratings)
+        except TypeError:
+            rows = list(zip(self.titles, years, ratings, self.posters))
+            self.titles, self.posters, self.years, self.ratings = [], [], array("i"), array("d")
+            self._append_rows(rows)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build a catalog from (title, year, rating, poster_image_url) rows.
+        Non-numeric years and ratings are coerced with `numeric_values()`;
+        rows where that fails are skipped and counted in `skipped`.
+        :param rows: Iterable of row tuples (e.g. a database cursor).
+        :return: MovieCatalog
+        """
+        catalog = cls()
+        catalog._append_rows(rows)
+        return catalog
+
+    def _append_rows(self, rows):
+        """Append (title, year, rating, poster_image_url) rows to the columns."""
+        titles, years, ratings, posters = (self.titles.append, self.years.append,
+                                           self.ratings.append, self.posters.append)
+        for title, year, rating, poster_image_url in rows:
+            if not (isinstance(year, int) and isinstance(rating, (int, float))):
+                numbers = numeric_values(year, rating)
+                if numbers is None:
+                    self.skipped += 1
+                    continue
+                year, rating = numbers
+            titles(title)
+            years(year)
+            ratings(rating)
+            posters(poster_image_url)
+
+    def movie(self, index):
+        """
+        Materialize the movie at a column position.
+        :param index: Position in the columns.
+        :return: Movie
+        """
+        return Movie(self.titles[index], self.years[index], self.ratings[index], self.posters[index])
+
+    def __getitem__(self, title):
+        if self._positions is None:
+            # Built on the first lookup by title; listings and stats never need it
+            self._positions = {title: index for index, title in enumerate(self.titles)}
+        return self.movie(self._positions[title])
+
+    def __iter__(self):
+        return iter(self.titles)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def items(self):
+        """
+        Iterate (title, Movie) pairs in storage order, without a title index.
+        :return: Generator of pairs.
+        """
+        for index, title in enumerate(self.titles):
+            yield title, self.movie(index)
+
+    def random(self, rng=random):
+        """
+        Pick one movie at random in O(1).
+        :param rng: Random number generator (anything with randrange()).
+        :return: Tuple (title, Movie), or None for an empty catalog.
+        """
+        if not self.titles:
+            return None
+        movie = self.movie(rng.randrange(len(self.titles)))
+        return movie.title, movie
+
+    def rating_order(self, descending=False):
+        """
+        Column positions ordered by rating; ties are ordered by title the
+        other way round, like `iter_movies(order_by="rating")`.
+        :param descending: Best rated first.
+        :return: List of positions.
+        """
+        np = numpy()
+        if np is not None:
+            # Two stable passes: by title, then by rating (best first)
+            order = np.argsort(np.array(self.titles, dtype=object), kind="stable")
+            ratings = np.frombuffer(self.ratings, dtype=np.float64)
+            order = order[np.argsort(-ratings[order], kind="stable")].tolist()
+        else:
+            order = sorted(range(len(self.titles)), key=self.titles.__getitem__)
+            order.sort(key=self.ratings.__getitem__, reverse=True)
+        # Ascending is the exact reverse (worst first, ties by title descending)
+        return order if descending else order[::-1]
+
+    def sorted_by_rating(self, descending=True):
+        """
+        Iterate the movies by rating.
+        :param descending: Best rated first.
+        :return: Generator of (title, Movie) pairs.
+        """
+        for index in self.rating_order(descending):
+            yield self.titles[index], self.movie(index)
+
+    def stats(self):
+        """
+        Rating statistics over the columns, in the shape of
+        `movie_stats()`.
+        :return: Dict with keys "count", "sum", "average", "median", "min", "max",
+            "best" and "worst"; only "count" (0) for an empty catalog.
+        """
+        count = len(self.ratings)
+        if not count:
+            return {"count": 0}
+        np = numpy()
+        if np is not None:
+            ratings = np.frombuffer(self.ratings, dtype=np.float64)
+            rating_sum, median = float(ratings.sum()), float(np.median(ratings))
+            min_rating, max_rating = float(ratings.min()), float(ratings.max())
+            best = [self.titles[index] for index in np.flatnonzero(ratings == max_rating)]
+            worst = [self.titles[index] for index in np.flatnonzero(ratings == min_rating)]
+        else:
+            ordered = sorted(self.ratings)
+            rating_sum = sum(ordered)
+            middle = ordered[(count - 1) // 2: count // 2 + 1]
+            median = sum(middle) / len(middle)
+            min_rating, max_rating = ordered[0], ordered[-1]
+            best = [title for title, rating in zip(self.titles, self.ratings) if rating == max_rating]
+            worst = [title for title, rating in zip(self.titles, self.ratings) if rating == min_rating]
+        return {"count": count, "sum": rating_sum, "average": rating_sum / count, "median": median,
+                "min": min_rating, "max": max_rating, "best": sorted(best), "worst": sorted(worst)}
@@ -0,0 +1,60 @@
+"""
+SQLAlchemy engine factory for the movies database.
+
+An engine profile (see DB_ENGINE_PROFILES in `config.settings`) bundles the
+PRAGMAs applied to every new SQLite connection with the connection pool
+options. The "tuned" profile switches to WAL journaling, so readers (e.g.
+the website generator) run concurrently with a writer (e.g. a bulk import)
+instead of waiting for its lock, and with `synchronous=NORMAL` a commit no
+longer waits for an fsync of the database file. The "default" profile
+keeps SQLite's and SQLAlchemy's stock settings for comparison.
+
+Compare both profiles:
+    python -m benchmarks.bench_engine_profiles --rows 20000
+"""
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+from config.settings import DB_URL, DB_ENGINE_PROFILE, DB_ENGINE_PROFILES
+
+POOL_OPTIONS = ("pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping")
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """
+    Run PRAGMA statements on a raw DB-API connection.
+    :param dbapi_connection: sqlite3 connection.
+    :param pragmas: Mapping of PRAGMA name to value, applied in order.
+    :return: None
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def create_storage_engine(db_url=DB_URL, profile=DB_ENGINE_PROFILE, **overrides):
+    """
+    Create an engine configured by an engine profile.
+    :param db_url: SQLAlchemy database URL.
+    :param profile: Name of a profile in DB_ENGINE_PROFILES.
+    :param overrides: Profile keys to replace (e.g. pool_size=1, pragmas={...}).
+    :return: SQLAlchemy Engine.
+    """
+    if profile not in DB_ENGINE_PROFILES:
+        raise ValueError(f"Unknown engine profile {profile!r}")
+    options = {**DB_ENGINE_PROFILES[profile], **overrides}
+    pragmas = options.pop("pragmas", None) or {}
+
+    kwargs = {}
+    if make_url(db_url).database not in (None, "", ":memory:"):
+        # In-memory databases use a single-connection pool without these options
+        kwargs = {name: options[name] for name in POOL_OPTIONS if name in options}
+    engine = create_engine(db_url, echo=False, **kwargs)
+
+    if pragmas:
+        event.listen(engine, "connect", lambda dbapi_connection, _: apply_pragmas(dbapi_connection, pragmas))
+    return engine
@@ -0,0 +1,426 @@
+"""
+Versioned schema migrations for the movies database.
+
+The schema version is stored in `PRAGMA user_version`. Each migration runs
+in its own transaction and bumps the version when it commits. Migrations
+that need to fill a new structure from existing rows (e.g. a search index)
+do so in batched backfills, each batch committed on its own and its
+progress recorded in `schema_backfill`, so a large table is never locked
+for the whole build and an interrupted run resumes where it stopped.
+
+Run offline:
+    python -m storage.migrations [--dry-run] [--db-url sqlite:///data/movies.db]
+"""
+
+import argparse
+from collections import namedtuple
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from config.settings import DB_URL, MIGRATION_BATCH_SIZE
+from storage.engine import create_storage_engine
+
+# upgrade(connection) -> True if backfill(connection, last_id, max_id, batch_size) must run afterwards
+Migration = namedtuple("Migration", ["version", "description", "upgrade", "backfill"])
+
+MIGRATIONS = []
+
+
+def migration(version, description, backfill=None):
+    """
+    Register the decorated function as the upgrade step of a migration.
+    :param version: Schema version reached after this migration.
+    :param description: Short human-readable summary.
+    :param backfill: Optional batched backfill function.
+    :return: Decorator.
+    """
+    def register(upgrade):
+        MIGRATIONS.append(Migration(version, description, upgrade, backfill))
+        MIGRATIONS.sort(key=lambda step: step.version)
+        return upgrade
+    return register
+
+
+def object_exists(connection, object_type, name):
+    """
+    Check sqlite_master for a table, index or trigger.
+    :param connection: Open connection.
+    :param object_type: "table", "index" or "trigger".
+    :param name: Object name.
+    :return: True if it exists.
+    """
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = :type AND name = :name"),
+        {"type": object_type, "name": name}
+    ).fetchone() is not None
+
+
+@migration(1, "create movies table")
+def create_movies_table(connection):
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS movies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT UNIQUE NOT NULL,
+            year INTEGER NOT NULL,
+            rating REAL NOT NULL,
+            poster_image_url STRING NOT NULL
+        )
+    """))
+    return False
+
+
+@migration(2, "case-insensitive unique title index")
+def create_title_index(connection):
+    """
+    Titles differing only by case in an existing database get a
+    non-unique index instead, so lookups are still indexed.
+    """
+    if object_exists(connection, "index", "idx_movies_title_nocase"):
+        return False
+    try:
+        with connection.begin_nested():
+            connection.execute(text(
+                "CREATE UNIQUE INDEX idx_movies_title_nocase ON movies (title COLLATE NOCASE)"
+            ))
+    except IntegrityError:
+        print("⚠️ Some titles differ only by case - case-insensitive uniqueness is not enforced.")
+        connection.execute(text(
+            "CREATE INDEX idx_movies_title_nocase ON movies (title COLLATE NOCASE)"
+        ))
+    return False
+
+
+def backfill_title_index(index_table):
+    """
+    Build a backfill that indexes existing titles in an FTS5 table, one batch at a time.
+    :param index_table: Name of the external-content FTS5 table over movies.title.
+    :return: backfill(connection, last_id, max_id, batch_size) -> highest id processed.
+    """
+    def backfill(connection, last_id, max_id, batch_size):
+        upper = connection.execute(
+            text("""SELECT MAX(id) FROM (
+                SELECT id FROM movies WHERE id > :last_id AND id <= :max_id ORDER BY id LIMIT :batch_size
+            )"""),
+            {"last_id": last_id, "max_id": max_id, "batch_size": batch_size}
+        ).scalar()
+        if upper is None:
+            return max_id
+        connection.execute(
+            text(f"""INSERT INTO {index_table} (rowid, title)
+                SELECT id, title FROM movies WHERE id > :last_id AND id <= :upper"""),
+            {"last_id": last_id, "upper": upper}
+        )
+        return upper
+    return backfill
+
+
+backfill_search_index = backfill_title_index("movies_fts")
+
+
+@migration(3, "FTS5 title search index", backfill=backfill_search_index)
+def create_search_index(connection):
+    """
+    Rows inserted after this step are indexed by the triggers; older rows
+    are indexed by the batched backfill.
+    """
+    if object_exists(connection, "table", "movies_fts"):
+        return False
+    connection.execute(text("""
+        CREATE VIRTUAL TABLE movies_fts USING fts5(
+            title,
+            content = 'movies',
+            content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER movies_fts_ai AFTER INSERT ON movies BEGIN
+            INSERT INTO movies_fts (rowid, title) VALUES (new.id, new.title);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER movies_fts_ad AFTER DELETE ON movies BEGIN
+            INSERT INTO movies_fts (movies_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER movies_fts_au AFTER UPDATE OF title ON movies BEGIN
+            INSERT INTO movies_fts (movies_fts, rowid, title) VALUES ('delete', old.id, old.title);
+            INSERT INTO movies_fts (rowid, title) VALUES (new.id, new.title);
+        END
+    """))
+    return True
+
+
+@migration(4, "rating index for sorted listings")
+def create_rating_index(connection):
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_movies_rating_title ON movies (rating DESC, title)"
+    ))
+    return False
+
+
+@migration(5, "trigger-maintained rating aggregates")
+def create_aggregates(connection):
+    """
+    One row holding the movie count and rating sum, kept current by triggers,
+    so the statistics screen does not need to scan the table.
+    """
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS movie_aggregates (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            movie_count INTEGER NOT NULL,
+            rating_sum REAL NOT NULL
+        )
+    """))
+    connection.execute(text("""
+        INSERT OR REPLACE INTO movie_aggregates (id, movie_count, rating_sum)
+        SELECT 1, COUNT(*), COALESCE(SUM(rating), 0) FROM movies
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS movie_aggregates_ai AFTER INSERT ON movies BEGIN
+            UPDATE movie_aggregates SET movie_count = movie_count + 1, rating_sum = rating_sum + new.rating
+            WHERE id = 1;
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS movie_aggregates_ad AFTER DELETE ON movies BEGIN
+            UPDATE movie_aggregates SET movie_count = movie_count - 1, rating_sum = rating_sum - old.rating
+            WHERE id = 1;
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS movie_aggregates_au AFTER UPDATE OF rating ON movies BEGIN
+            UPDATE movie_aggregates SET rating_sum = rating_sum - old.rating + new.rating
+            WHERE id = 1;
+        END
+    """))
+    return False
+
+
+@migration(6, "movie change counter")
+def create_change_counter(connection):
+    """
+    A single counter bumped by every insert, update and delete of a movie,
+    so caches can tell in one primary key lookup whether anything changed.
+    """
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS movie_change_counter (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """))
+    connection.execute(text("INSERT OR IGNORE INTO movie_change_counter (id, version) VALUES (1, 0)"))
+    for name, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE")):
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS movie_change_counter_{name} AFTER {event} ON movies BEGIN
+                UPDATE movie_change_counter SET version = version + 1 WHERE id = 1;
+            END
+        """))
+    return False
+
+
+@migration(7, "trigram title index for fuzzy search", backfill=backfill_title_index("movies_trigram"))
+def create_trigram_index(connection):
+    """
+    Every three-character window of each title (case-folded) is indexed, so
+    misspelled titles can be matched by the trigrams they still share.
+    """
+    if object_exists(connection, "table", "movies_trigram"):
+        return False
+    connection.execute(text("""
+        CREATE VIRTUAL TABLE movies_trigram USING fts5(
+            title,
+            content = 'movies',
+            content_rowid = 'id',
+            tokenize = 'trigram',
+            detail = 'none'
+        )
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER movies_trigram_ai AFTER INSERT ON movies BEGIN
+            INSERT INTO movies_trigram (rowid, title) VALUES (new.id, new.title);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER movies_trigram_ad AFTER DELETE ON movies BEGIN
+            INSERT INTO movies_trigram (movies_trigram, rowid, title) VALUES ('delete', old.id, old.title);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER movies_trigram_au AFTER UPDATE OF title ON movies BEGIN
+            INSERT INTO movies_trigram (movies_trigram, rowid, title) VALUES ('delete', old.id, old.title);
+            INSERT INTO movies_trigram (rowid, title) VALUES (new.id, new.title);
+        END
+    """))
+    return True
+
+
+@migration(8, "change log keyed by the change counter")
+def create_change_log(connection):
+    """
+    Every insert, update and delete records the movie id with the change
+    counter value it produced. Counter values follow commit order (SQLite
+    has one writer at a time), unlike wall-clock stamps taken before the
+    commit, so "changed since version N" misses nothing. The counter
+    triggers are replaced so the bump and the log write run in one body,
+    in that order. (An explicit upsert, because INSERT OR REPLACE in a
+    trigger takes the conflict policy of an outer INSERT ... ON CONFLICT.)
+    """
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS movie_change_log (
+            movie_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL,
+            deleted INTEGER NOT NULL
+        )
+    """))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_movie_change_log_version ON movie_change_log (version)"
+    ))
+    events = (("ai", "INSERT", "new.id", 0), ("au", "UPDATE", "new.id", 0), ("ad", "DELETE", "old.id", 1))
+    for name, event, movie_id, deleted in events:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS movie_change_counter_{name}"))
+        connection.execute(text(f"""
+            CREATE TRIGGER movie_change_counter_{name} AFTER {event} ON movies BEGIN
+                UPDATE movie_change_counter SET version = version + 1 WHERE id = 1;
+                INSERT INTO movie_change_log (movie_id, version, deleted)
+                SELECT {movie_id}, version, {deleted} FROM movie_change_counter WHERE id = 1
+                ON CONFLICT (movie_id) DO UPDATE SET version = excluded.version, deleted = excluded.deleted;
+            END
+        """))
+    return False
+
+
+@contextmanager
+def transaction(connection):
+    """
+    Run a block in an explicit SQLite write transaction.
+    pysqlite does not open a transaction before DDL on its own, so BEGIN
+    is emitted by hand to make schema changes atomic.
+    :param connection: Open connection without an active transaction.
+    """
+    with connection.begin():
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        yield connection
+
+
+def current_version(connection):
+    """
+    Read the schema version of a database.
+    :param connection: Open connection.
+    :return: Integer version (0 for a new database).
+    """
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def pending_migrations(connection):
+    """
+    List migrations not yet applied to a database.
+    :param connection: Open connection.
+    :return: List of Migration tuples in order.
+    """
+    version = current_version(connection)
+    return [step for step in MIGRATIONS if step.version > version]
+
+
+def run_backfill(connection, step, batch_size):
+    """
+    Run (or resume) the batched backfill of a migration, one transaction per batch.
+    :return: None
+    """
+    last_id, max_id = connection.execute(
+        text("SELECT last_id, max_id FROM schema_backfill WHERE version = :version"),
+        {"version": step.version}
+    ).fetchone()
+    connection.commit()
+
+    while last_id < max_id:
+        with transaction(connection):
+            last_id = step.backfill(connection, last_id, max_id, batch_size)
+            connection.execute(
+                text("UPDATE schema_backfill SET last_id = :last_id WHERE version = :version"),
+                {"last_id": last_id, "version": step.version}
+            )
+
+
+def migrate(engine, dry_run=False, batch_size=MIGRATION_BATCH_SIZE):
+    """
+    Bring a database up to the latest schema version.
+    :param engine: SQLAlchemy engine of the database.
+    :param dry_run: Only report what would be applied.
+    :param batch_size: Rows per backfill transaction.
+    :return: List of the migrations applied (or pending, for a dry run).
+    """
+    with engine.connect() as connection:
+        pending = pending_migrations(connection)
+        connection.commit()
+        if dry_run or not pending:
+            return pending
+
+        with transaction(connection):
+            connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS schema_backfill (
+                    version INTEGER PRIMARY KEY,
+                    last_id INTEGER NOT NULL,
+                    max_id INTEGER NOT NULL
+                )
+            """))
+
+        for step in pending:
+            with transaction(connection):
+                resuming = connection.execute(
+                    text("SELECT 1 FROM schema_backfill WHERE version = :version"),
+                    {"version": step.version}
+                ).fetchone()
+                if not resuming:
+                    needs_backfill = step.upgrade(connection)
+                    if needs_backfill and step.backfill:
+                        connection.execute(
+                            text("""INSERT INTO schema_backfill (version, last_id, max_id)
+                                SELECT :version, 0, COALESCE(MAX(id), 0) FROM movies"""),
+                            {"version": step.version}
+                        )
+                        resuming = True
+                    else:
+                        connection.exec_driver_sql(f"PRAGMA user_version = {int(step.version)}")
+            if not resuming:
+                continue
+
+            run_backfill(connection, step, batch_size)
+            with transaction(connection):
+                connection.execute(text("DELETE FROM schema_backfill WHERE version = :version"),
+                                   {"version": step.version})
+                connection.exec_driver_sql(f"PRAGMA user_version = {int(step.version)}")
+    return pending
+
+
+def main(argv=None):
+    """
+    Command-line entry point: apply (or list) pending migrations.
+    :param argv: Optional argument list (defaults to sys.argv).
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Apply database schema migrations.")
+    parser.add_argument("--db-url", default=DB_URL)
+    parser.add_argument("--dry-run", action="store_true", help="only list pending migrations")
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    engine = create_storage_engine(args.db_url)
+    with engine.connect() as connection:
+        version = current_version(connection)
+    steps = migrate(engine, dry_run=args.dry_run, batch_size=args.batch_size)
+
+    if not steps:
+        print(f"Database is up to date (schema version {version}).")
+        return
+    action = "Pending" if args.dry_run else "Applied"
+    for step in steps:
+        print(f"{action}: {step.version} - {step.description}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,806 @@
 """
 SQLite-backed storage helpers for the Movie app.
 
-Creates the movies table on import if it does not exist and exposes CRUD
-functions to list, add, delete and update movies.
+Exposes CRUD functions to list, add, delete and update movies. Importing
+this module does not touch the database; call `init_db()` once at
+startup to apply pending schema migrations (see `storage.migrations`).
+
+Titles are unique regardless of case: a `COLLATE NOCASE` unique index
+serves every title-keyed lookup (add, delete, update, get) in O(log n).
+They are also indexed in an FTS5 table (`movies_fts`) that triggers keep in
+sync with `movies`, so `search_movies()` answers from the index instead of
+scanning the table. A second FTS5 table (`movies_trigram`) indexes every
+three-character window of each title; `fuzzy_search_movies()` uses it to
+find misspelled titles by the trigrams they share.
+
+Large listings should use `iter_movies()`, which streams rows in chunks
+with keyset pagination instead of materializing the whole table; it yields
+compact `Movie` records. `list_movies()` loads a column-oriented
+`MovieCatalog` (see `storage.catalog`).
+
+Interactive sessions read through `cached_stats()` and `cached_search()`,
+which answer repeated calls from memory until a write happens - our own
+(counted by `unit_of_work()`) or another process's (detected with
+`PRAGMA data_version`). Listings and random picks are deliberately not
+cached: `iter_movies()` keeps memory bounded, and `random_movie()` costs
+about as much as the cache's validity check.
+
+Scripted bulk changes should use the batch functions (`add_movies`,
+`delete_movies`, `update_ratings`), which run one `executemany` per call,
+and `unit_of_work()` to commit several calls as one transaction.
 """
 
-from sqlalchemy import create_engine, text
-from data.ombd_client import fetch_movie_data
-from config.settings import DB_URL
+import random
+import re
+import string
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from config.settings import (DB_URL, SEARCH_RESULT_LIMIT, LIST_CHUNK_SIZE, STATS_USE_AGGREGATES,
+                             CATALOG_CACHE_ENABLED, CATALOG_CACHE_ENTRIES, RANDOM_MAX_ATTEMPTS, TOP_N,
+                             FUZZY_QUERY_TRIGRAMS, FUZZY_PROBE_LIMIT, FUZZY_POSTINGS_LIMIT, FUZZY_CANDIDATES, FUZZY_MIN_SIMILARITY)
+from instrumentation import timed, count
+from storage.catalog import Movie, MovieCatalog
+from storage.engine import create_storage_engine
+from storage.migrations import migrate, transaction
+
+# Create the engine with the configured profile (PRAGMAs and pool, see storage.engine)
+engine = create_storage_engine(DB_URL)
+
+# Titles looked up per query by the batch write functions
+LOOKUP_BATCH_SIZE = 500
+
+# Trigrams of a fuzzy query probed at most (one compound SELECT term each; SQLite allows 500)
+MAX_PROBED_TRIGRAMS = 200
+
+# SQLite's NOCASE collation folds ASCII letters only
+NOCASE_TABLE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+@timed("storage.init_db")
+def init_db(bind=None):
+    """
+    Bring the database schema up to date by applying pending migrations.
+    :param bind: Engine to initialise (defaults to the module engine).
+    :return: List of the migrations applied.
+    """
+    return migrate(bind or engine)
+
+
+# Keyset pagination per sort order: ORDER BY clause (ascending form) and
+# the columns that make up the unique sort key
+LISTING_ORDERS = {
+    "id": ("id", ("id",)),
+    "title": ("title", ("title",)),
+    "rating": ("rating, title DESC", ("rating", "title")),
+}
+
+
+@timed("storage.iter_movies")
+def iter_movies(order_by="id", descending=False, min_rating=None, max_rating=None,
+                year_from=None, year_to=None, min_id=None, after=None, chunk_size=LIST_CHUNK_SIZE):
+    """
+    Stream movies in chunks using keyset pagination, so memory stays bounded.
+    Each chunk is a separate indexed query starting after the last row seen.
+    :param order_by: "id", "title" or "rating" (ties on rating are ordered by title).
+    :param descending: Reverse the order (e.g. best rated first).
+    :param min_rating: Only movies rated at least this.
+    :param max_rating: Only movies rated at most this.
+    :param year_from: Only movies released in or after this year.
+    :param year_to: Only movies released in or before this year.
+    :param min_id: Only movies with an id of at least this (e.g. to resume a listing).
+    :param after: Sort key of the last movie already seen, e.g. {"id": 42} or
+        {"rating": 8.3, "title": "Heat"}; the listing continues after it.
+    :param chunk_size: Rows fetched per query.
+    :return: Generator of (title, Movie) pairs; each Movie also carries its id
+        and reads like a {"id", "year", "rating", "poster_image_url"} dict.
+    """
+    if order_by not in LISTING_ORDERS:
+        raise ValueError(f"Cannot order movies by {order_by!r}")
+    order_clause, key_columns = LISTING_ORDERS[order_by]
+    if after is not None and any(after.get(column) is None for column in key_columns):
+        raise ValueError(f"Ordering by {order_by!r} continues after {', '.join(key_columns)}")
+
+    filters = []
+    params = {"min_rating": min_rating, "max_rating": max_rating,
+              "year_from": year_from, "year_to": year_to, "min_id": min_id, "limit": chunk_size}
+    for column, operator, name in (("rating", ">=", "min_rating"), ("rating", "<=", "max_rating"),
+                                   ("year", ">=", "year_from"), ("year", "<=", "year_to"),
+                                   ("id", ">=", "min_id")):
+        if params[name] is not None:
+            filters.append(f"{column} {operator} :{name}")
+
+    if descending:
+        # "rating, title DESC" -> "rating DESC, title"
+        order_clause = ", ".join(
+            part[:-5] if part.endswith(" DESC") else f"{part} DESC" for part in order_clause.split(", ")
+        )
+    comparison = "<" if descending else ">"
+    if order_by == "rating":
+        # Rating goes one way and the title tie-break the other, so spell the row comparison out
+        # (the redundant first range lets SQLite seek the rating index directly)
+        keyset = (f"rating {comparison}= :last_rating AND (rating {comparison} :last_rating OR "
+                  f"(rating = :last_rating AND title {'>' if descending else '<'} :last_title))")
+    else:
+        keyset = f"{key_columns[0]} {comparison} :last_{key_columns[0]}"
+
+    last_row = after
+    while True:
+        conditions = list(filters)
+        if last_row is not None:
+            conditions.append(keyset)
+            params.update({f"last_{column}": last_row[column] for column in key_columns})
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with engine.connect() as connection:
+            rows = connection.execute(
+                text(
+                    f"""SELECT id, title, year, rating, poster_image_url
+                    FROM movies
+                    {where}
+                    ORDER BY {order_clause}
+                    LIMIT :limit"""
+                ),
+                    params
+            ).mappings().fetchall()
+        count("storage.rows_read", len(rows))
+
+        for row in rows:
+            yield row["title"], Movie(row["title"], row["year"], row["rating"], row["poster_image_url"], row["id"])
+        if len(rows) < chunk_size:
+            return
+        last_row = rows[-1]
+
 
-# Create the engine (echo=True logs SQL statements for debugging)
-engine = create_engine(DB_URL, echo=False)
+def decade_range(decade):
+    """
+    Turn a decade into a year range.
+    :param decade: First year of the decade, e.g. 1990.
+    :return: Tuple (year_from, year_to), e.g. (1990, 1999).
+    :raises ValueError: If the year does not start a decade.
+    """
+    if decade % 10:
+        raise ValueError(f"{decade} does not start a decade (e.g. 1990)")
+    return decade, decade + 9
 
-# Create the movies table if it does not exist
-with engine.connect() as connection:
-    connection.execute(text("""
-        CREATE TABLE IF NOT EXISTS movies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT UNIQUE NOT NULL,
-            year INTEGER NOT NULL,
-            rating REAL NOT NULL,
-            poster_image_url STRING NOT NULL   
-        )               
-    """))
-    connection.commit()
+
+@timed("storage.top_movies")
+def top_movies(limit=TOP_N, offset=0, year_from=None, year_to=None, decade=None):
+    """
+    One page of the rating leaderboard, read from the (rating DESC, title)
+    index: the best rated movies first, ties ordered by title. Only the rows
+    of the requested page are read (plus the index entries skipped by the
+    offset and, with filters, the rows checked against them).
+    Tied movies share a rank, and the next rank skips accordingly (1, 2, 2, 4),
+    so a movie's rank does not depend on the page it is shown on.
+    :param limit: Movies per page.
+    :param offset: Movies skipped (page * limit for later pages).
+    :param year_from: Only movies released in or after this year.
+    :param year_to: Only movies released in or before this year.
+    :param decade: Only movies of this decade, e.g. 1990 (combined with the year range).
+    :return: List of dicts with keys "rank", "title", "year", "rating", "poster_image_url".
+    """
+    if decade is not None:
+        first_year, last_year = decade_range(decade)
+        year_from = first_year if year_from is None else max(year_from, first_year)
+        year_to = last_year if year_to is None else min(year_to, last_year)
+    conditions, parameters = [], []
+    for column, operator, value in (("year", ">=", year_from), ("year", "<=", year_to)):
+        if value is not None:
+            conditions.append(f"{column} {operator} ?")
+            parameters.append(value)
+    where = "".join(f" AND {condition}" for condition in conditions)
+
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(
+            f"""SELECT title, year, rating, poster_image_url
+            FROM movies INDEXED BY idx_movies_rating_title
+            WHERE 1{where}
+            ORDER BY rating DESC, title
+            LIMIT ? OFFSET ?""",
+            (*parameters, limit, offset)
+        ).fetchall()
+        if not rows:
+            return []
+        # Rank of the first row: one more than the number of better rated movies
+        better = connection.exec_driver_sql(
+            f"SELECT COUNT(*) FROM movies WHERE rating > ?{where}", (rows[0][2], *parameters)
+        ).scalar()
+    count("storage.rows_read", len(rows))
+
+    ranking, rank, previous = [], better + 1, rows[0][2]
+    for position, (title, year, rating, poster_image_url) in enumerate(rows, start=offset + 1):
+        if rating != previous:
+            rank, previous = position, rating
+        ranking.append({"rank": rank, "title": title, "year": year, "rating": rating,
+                        "poster_image_url": poster_image_url})
+    return ranking
+
+
+@timed("storage.change_counter")
+def change_counter():
+    """
+    Read the movie change counter, bumped by every insert, update and delete
+    (from any process). Cheap enough to check before serving a cached answer.
+    :return: Integer that grows with every change.
+    """
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT version FROM movie_change_counter WHERE id = 1")).scalar()
+
+
+@timed("storage.movie_changes_since")
+def movie_changes_since(since):
+    """
+    List movies inserted, updated or deleted after a change counter value (indexed).
+    :param since: Counter value, usually the "version" of an earlier call (0 for everything).
+    :return: Dict with "changed" and "deleted" id lists and "version", the
+        counter read before the lookup (use it as the next `since`).
+    """
+    with engine.connect() as connection:
+        version = connection.execute(text("SELECT version FROM movie_change_counter WHERE id = 1")).scalar()
+        rows = connection.execute(
+            text("SELECT movie_id, deleted FROM movie_change_log WHERE version > :since ORDER BY movie_id"),
+            {"since": since}
+        ).fetchall()
+    return {"changed": [movie_id for movie_id, deleted in rows if not deleted],
+            "deleted": [movie_id for movie_id, deleted in rows if deleted], "version": version}
+
+
+def poster_urls(movie_ids):
+    """
+    Stream the poster URLs of several movies by id (primary key lookups).
+    :param movie_ids: Iterable of movie ids; ids of deleted movies are skipped.
+    :return: Generator of poster URLs.
+    """
+    movie_ids = list(movie_ids)
+    for start in range(0, len(movie_ids), LOOKUP_BATCH_SIZE):
+        chunk = movie_ids[start:start + LOOKUP_BATCH_SIZE]
+        with engine.connect() as connection:
+            result = connection.exec_driver_sql(
+                f"SELECT poster_image_url FROM movies WHERE id IN ({', '.join('?' * len(chunk))})", tuple(chunk)
+            )
+            rows = result.fetchall()
+        count("storage.rows_read", len(rows))
+        for row in rows:
+            yield row[0]
 
 
+@timed("storage.count_movies")
+def count_movies(use_aggregates=STATS_USE_AGGREGATES):
+    """
+    Count the movies in the database.
+    :param use_aggregates: Read the trigger-maintained count from movie_aggregates instead of scanning.
+    :return: Number of rows in the movies table.
+    """
+    with engine.connect() as connection:
+        if use_aggregates:
+            return connection.execute(
+                text("SELECT movie_count FROM movie_aggregates WHERE id = 1")
+            ).scalar() or 0
+        return connection.execute(text("SELECT COUNT(*) FROM movies")).scalar()
+
+
+@timed("storage.movie_stats")
+def movie_stats(use_aggregates=STATS_USE_AGGREGATES):
+    """
+    Compute rating statistics in SQL without loading the catalog.
+    Count and sum come from the trigger-maintained aggregates row (or one
+    COUNT/SUM pass), min/max and the tied best/worst titles from the rating
+    index, and the median from an indexed ORDER BY ... OFFSET.
+    :param use_aggregates: Read count/sum from movie_aggregates instead of scanning.
+    :return: Dict with keys "count", "sum", "average", "median", "min", "max",
+        "best" and "worst" (lists of titles); only "count" (0) for an empty table.
+    """
+    with engine.connect() as connection:
+        if use_aggregates:
+            row = connection.execute(
+                text("SELECT movie_count, rating_sum FROM movie_aggregates WHERE id = 1")
+            ).fetchone()
+        else:
+            row = connection.execute(text("SELECT COUNT(*), SUM(rating) FROM movies")).fetchone()
+        count, rating_sum = row if row else (0, 0.0)
+        if not count:
+            return {"count": 0}
+
+        # Separate statements: SQLite seeks an index for a lone MIN() or MAX(), but scans for both
+        min_rating = connection.execute(text("SELECT MIN(rating) FROM movies")).scalar()
+        max_rating = connection.execute(text("SELECT MAX(rating) FROM movies")).scalar()
+        middle = connection.execute(
+            text("SELECT rating FROM movies ORDER BY rating LIMIT :limit OFFSET :offset"),
+            {"limit": 2 - count % 2, "offset": (count - 1) // 2}
+        ).scalars().all()
+        best = connection.execute(
+            text("SELECT title FROM movies WHERE rating = :rating ORDER BY title"), {"rating": max_rating}
+        ).scalars().all()
+        worst = connection.execute(
+            text("SELECT title FROM movies WHERE rating = :rating ORDER BY title"), {"rating": min_rating}
+        ).scalars().all()
+
+    return {"count": count, "sum": rating_sum, "average": rating_sum / count,
+            "median": sum(middle) / len(middle), "min": min_rating, "max": max_rating,
+            "best": best, "worst": worst}
+
+
+@timed("storage.list_movies")
 def list_movies():
     """
-    Retrieve all movies from the database.
+    Load the whole catalog into a compact, column-oriented snapshot.
+    Prefer `iter_movies()` to walk large catalogs once; use this when stats,
+    sorting or random picks run over the same snapshot repeatedly.
+    :return: MovieCatalog, a mapping of title to Movie (readable like the old
+        {"year", "rating", "poster_image_url"} dicts).
+    """
+    with engine.connect() as connection:
+        catalog = MovieCatalog.from_rows(connection.exec_driver_sql(
+            "SELECT title, year, rating, poster_image_url FROM movies ORDER BY id"
+        ))
+    count("storage.rows_read", len(catalog))
+    return catalog
+
+
+class CatalogCache:
+    """
+    Read-through cache for whole-catalog reads, keyed by call.
+
+    Entries are valid for one database version: a local counter bumped after
+    every unit_of_work() of this process, plus `PRAGMA data_version` read on
+    a dedicated connection, which changes whenever another connection (or
+    process) commits. Checking both costs no table access.
+    """
+
+    def __init__(self, max_entries=CATALOG_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.counters = {"hits": 0, "misses": 0, "invalidations": 0}
+        self._lock = threading.RLock()
+        self._local_version = 0
+        self._entries = OrderedDict()
+        self._engine = None
+        self._watcher = None
+        self._version = None
+
+    def invalidate(self):
+        """
+        Mark the cached entries stale (called after our own writes).
+        :return: None
+        """
+        with self._lock:
+            self._local_version += 1
+
+    def _data_version(self):
+        if self._engine is not engine:
+            # The module engine was replaced (tests, benchmarks): watch the new one
+            self.close()
+            self._engine = engine
+        if self._watcher is None:
+            self._watcher = engine.raw_connection()
+        cursor = self._watcher.cursor()
+        try:
+            cursor.execute("PRAGMA data_version")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def get(self, key, load):
+        """
+        Return the cached value for a key, loading it on a miss.
+        :param key: Hashable description of the call.
+        :param load: Function computing the value.
+        :return: Cached or freshly loaded value (treat as read-only).
+        """
+        with self._lock:
+            version = (self._local_version, self._data_version())
+            if version != self._version:
+                if self._entries:
+                    self.counters["invalidations"] += 1
+                    self._entries.clear()
+                self._version = version
+            if key in self._entries:
+                self.counters["hits"] += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.counters["misses"] += 1
+            value = self._entries[key] = load()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return value
+
+    def stats(self):
+        """
+        Return the counters, the number of entries and the hit rate.
+        :return: Dict.
+        """
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {**self.counters, "entries": len(self._entries),
+                    "hit_rate": self.counters["hits"] / lookups if lookups else 0.0}
+
+    def close(self):
+        """
+        Drop all entries and release the watcher connection.
+        :return: None
+        """
+        with self._lock:
+            if self._watcher is not None:
+                self._watcher.close()
+            self._entries.clear()
+            self._engine = self._watcher = self._version = None
+
+
+catalog_cache = CatalogCache()
+
+
+def cached_stats():
+    """
+    `movie_stats()`, answered from memory while the database is unchanged.
+    :return: Dict as returned by movie_stats().
+    """
+    if not CATALOG_CACHE_ENABLED:
+        return movie_stats()
+    return catalog_cache.get("stats", movie_stats)
+
+
+def cached_search(query, limit=SEARCH_RESULT_LIMIT):
+    """
+    `search_movies()`, answered from memory while the database is unchanged.
+    :return: Mapping as returned by search_movies() (shared; do not modify).
+    """
+    if not CATALOG_CACHE_ENABLED:
+        return search_movies(query, limit)
+    return catalog_cache.get(("search", query, limit), lambda: search_movies(query, limit))
+
+
+@timed("storage.has_movies")
+def has_movies():
+    """
+    Check whether the database contains at least one movie.
+    :return: True if the movies table is not empty.
+    """
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT 1 FROM movies LIMIT 1")).fetchone() is not None
+
+
+def build_search_query(query):
+    """
+    Turn free text into an FTS5 MATCH expression.
+    Every word must match, and the last one may be a prefix
+    (so "star wa" finds "Star Wars").
+    :param query: Text typed by the user.
+    :return: The MATCH expression, or None if the text contains no words.
+    """
+    tokens = re.findall(r"\w+", query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens[:-1]]
+    terms.append(f'"{tokens[-1]}"*')
+    return " ".join(terms)
+
+
+@timed("storage.search_movies")
+def search_movies(query, limit=SEARCH_RESULT_LIMIT):
+    """
+    Search titles through the FTS5 index, best matches first (bm25 rank).
+    :param query: Words or word prefixes to look for.
+    :param limit: Maximum number of results.
     :return: Mapping of title to a dict with keys "year", "rating", and "poster_image_url".
     """
+    match = build_search_query(query)
+    if match is None:
+        return {}
     with engine.connect() as connection:
         result = connection.execute(
             text(
-                """SELECT title, year, rating , poster_image_url 
-                FROM movies"""
-            )
+                """SELECT m.title, m.year, m.rating, m.poster_image_url
+                FROM movies_fts
+                JOIN movies AS m ON m.id = movies_fts.rowid
+                WHERE movies_fts MATCH :match
+                ORDER BY movies_fts.rank
+                LIMIT :limit"""
+            ),
+                {"match": match, "limit": limit}
         )
-        movies = result.fetchall()
-    return {row[0]: {"year": row[1], "rating": row[2], "poster_image_url": row[3]} for row in movies}
+        movies = {row[0]: {"year": row[1], "rating": row[2], "poster_image_url": row[3]} for row in result}
+    count("storage.rows_read", len(movies))
+    return movies
 
 
-def add_movie(title, year, rating, poster_image_url):
+def title_trigrams(title, padded=True):
     """
-    Add a new movie to the database.
-    Fetches metadata from OMDb (demonstration call) and inserts the
-    provided fields into the local SQLite database.
+    Split a case-folded title into its three-character windows.
+    Padding (two spaces in front, one behind) adds trigrams for the start and
+    end of the title, so similarity favours titles that begin and end alike.
+    :param title: Movie title or search text.
+    :param padded: Add the padding trigrams (the index stores unpadded ones).
+    :return: Set of trigrams.
     """
-    movie_data = fetch_movie_data(title)
+    folded = title.casefold().strip()
+    if padded:
+        folded = f"  {folded} "
+    return {folded[index:index + 3] for index in range(len(folded) - 2)}
+
 
+def title_similarity(first, second):
+    """
+    Trigram similarity of two titles (shared trigrams / all trigrams).
+    :return: Float from 0 (nothing in common) to 1 (same title ignoring case).
+    """
+    first, second = title_trigrams(first), title_trigrams(second)
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+@timed("storage.fuzzy_search_movies")
+def fuzzy_search_movies(query, limit=SEARCH_RESULT_LIMIT, min_similarity=FUZZY_MIN_SIMILARITY):
+    """
+    Find titles similar to a possibly misspelled query, most similar first.
+    Every trigram of the query is probed in the index (counting at most
+    FUZZY_PROBE_LIMIT titles), and only the rarest ones are looked up, so
+    common trigrams like "the" never cost a long posting list. The titles
+    sharing the most of them are re-ranked by full trigram similarity.
+    :param query: Title or search text, typos allowed.
+    :param limit: Maximum number of results.
+    :param min_similarity: Drop titles less similar than this (0-1).
+    :return: Mapping of title to a dict with keys "year", "rating", "poster_image_url"
+        and "similarity".
+    """
+    trigrams = sorted(title_trigrams(query, padded=False))[:MAX_PROBED_TRIGRAMS]
+    if not trigrams:
+        return {}
+    phrases = ['"' + trigram.replace('"', '""') + '"' for trigram in trigrams]
     with engine.connect() as connection:
-        try:
+        # Plain qmark placeholders, as in existing_titles()
+        probes = " UNION ALL ".join(
+            "SELECT ?, (SELECT COUNT(*) FROM (SELECT 1 FROM movies_trigram WHERE movies_trigram MATCH ? LIMIT ?))"
+            for _ in phrases
+        )
+        frequencies = connection.exec_driver_sql(
+            probes, tuple(value for phrase in phrases for value in (phrase, phrase, FUZZY_PROBE_LIMIT))
+        ).fetchall()
+        rarest = [phrase for phrase, titles in sorted(frequencies, key=lambda row: row[1]) if titles]
+        rarest = rarest[:FUZZY_QUERY_TRIGRAMS]
+        if not rarest:
+            return {}
+        postings = " UNION ALL ".join(
+            "SELECT rowid FROM (SELECT rowid FROM movies_trigram WHERE movies_trigram MATCH ? LIMIT ?)"
+            for _ in rarest
+        )
+        parameters = [value for phrase in rarest for value in (phrase, FUZZY_POSTINGS_LIMIT)]
+        rows = connection.exec_driver_sql(
+            f"""SELECT m.title, m.year, m.rating, m.poster_image_url
+            FROM (SELECT rowid, COUNT(*) AS shared FROM ({postings}) GROUP BY rowid
+                  ORDER BY shared DESC LIMIT ?) AS candidates
+            JOIN movies AS m ON m.id = candidates.rowid""",
+            (*parameters, FUZZY_CANDIDATES)
+        ).fetchall()
+    count("storage.rows_read", len(rows))
+
+    query_trigrams = title_trigrams(query)
+    scored = []
+    for title, year, rating, poster_image_url in rows:
+        title_grams = title_trigrams(title)
+        similarity = len(query_trigrams & title_grams) / len(query_trigrams | title_grams)
+        if similarity >= min_similarity:
+            scored.append((similarity, title, year, rating, poster_image_url))
+    scored.sort(key=lambda movie: (-movie[0], movie[1]))
+    return {title: {"year": year, "rating": rating, "poster_image_url": poster_image_url,
+                    "similarity": round(similarity, 3)}
+            for similarity, title, year, rating, poster_image_url in scored[:limit]}
+
+
+def movie_matches(movie, min_rating=None, max_rating=None, year_from=None, year_to=None):
+    """
+    Check a movie against the listing filters of iter_movies().
+    :param movie: Dict with "year" and "rating".
+    :return: True if every given filter holds.
+    """
+    return ((min_rating is None or movie["rating"] >= min_rating) and
+            (max_rating is None or movie["rating"] <= max_rating) and
+            (year_from is None or movie["year"] >= year_from) and
+            (year_to is None or movie["year"] <= year_to))
+
+
+@timed("storage.random_movie")
+def random_movie(min_rating=None, max_rating=None, year_from=None, year_to=None, weighted=False,
+                 rng=random, max_attempts=RANDOM_MAX_ATTEMPTS):
+    """
+    Pick a random movie without loading the catalog.
+    Random ids between the smallest and largest id are looked up by primary
+    key until one exists and passes the filters; with `weighted`, a hit is
+    accepted with probability rating / best rating, so picks are proportional
+    to the rating. Each attempt is one O(log n) lookup, and the expected
+    number of attempts depends only on how sparse the ids are, how selective
+    the filters are and (weighted) on best / average rating, not on the
+    catalog size. If every attempt misses, the matching movies are counted
+    through the indexes (the aggregates row when unfiltered) and one is
+    picked uniformly by its position with OFFSET, again accepted in
+    proportion to its rating (against the best matching rating; unweighted
+    if that is 0) when `weighted`. The fallback gives up after
+    RANDOM_MAX_ATTEMPTS rounds, the last of which accepts any row.
+    :param min_rating: Only movies rated at least this.
+    :param max_rating: Only movies rated at most this.
+    :param year_from: Only movies released in or after this year.
+    :param year_to: Only movies released in or before this year.
+    :param weighted: Pick movies in proportion to their rating.
+    :param rng: Random number generator (anything with randint() and random()).
+    :param max_attempts: Lookups before falling back to counting the matching rows.
+    :return: Dict with keys "title", "year", "rating", "poster_image_url", or None
+        if no movie matches.
+    """
+    filters = {"min_rating": min_rating, "max_rating": max_rating, "year_from": year_from, "year_to": year_to}
+    columns = "title, year, rating, poster_image_url"
+    with engine.connect() as connection:
+        # Separate statements: SQLite seeks an index for a lone MIN() or MAX(), but scans for both
+        lowest = connection.exec_driver_sql("SELECT MIN(id) FROM movies").scalar()
+        if lowest is None:
+            return None
+        highest = connection.exec_driver_sql("SELECT MAX(id) FROM movies").scalar()
+        best = connection.exec_driver_sql("SELECT MAX(rating) FROM movies").scalar() if weighted else None
+
+        for _ in range(max_attempts):
+            movie_id = rng.randint(lowest, highest)
+            row = connection.exec_driver_sql(f"SELECT {columns} FROM movies WHERE id = ?", (movie_id,)).fetchone()
+            if row is None:
+                continue
+            movie = {"title": row[0], "year": row[1], "rating": row[2], "poster_image_url": row[3]}
+            if not movie_matches(movie, **filters):
+                continue
+            if weighted and best > 0 and rng.random() * best >= movie["rating"]:
+                continue
+            count("storage.rows_read")
+            return movie
+
+        conditions, parameters = [], []
+        for column, operator, name in (("rating", ">=", "min_rating"), ("rating", "<=", "max_rating"),
+                                       ("year", ">=", "year_from"), ("year", "<=", "year_to")):
+            if filters[name] is not None:
+                conditions.append(f"{column} {operator} ?")
+                parameters.append(filters[name])
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        if weighted:
+            # Weigh against the best matching rating: the global best may never accept a match
+            best = connection.exec_driver_sql(f"SELECT MAX(rating) FROM movies{where}", tuple(parameters)).scalar()
+            weighted = bool(best and best > 0)
+        # The last round accepts any row, so races with deletes cannot keep the loop going
+        for attempt in range(RANDOM_MAX_ATTEMPTS + 1):
+            if conditions:
+                total = connection.exec_driver_sql(f"SELECT COUNT(*) FROM movies{where}", tuple(parameters)).scalar()
+            else:
+                total = connection.exec_driver_sql("SELECT movie_count FROM movie_aggregates WHERE id = 1").scalar()
+            if not total:
+                return None
+            # No ORDER BY: the rows are skipped in the order of the index that served the count
+            row = connection.exec_driver_sql(
+                f"SELECT {columns} FROM movies{where} LIMIT 1 OFFSET ?", (*parameters, rng.randint(0, total - 1))
+            ).fetchone()
+            if row is None:
+                continue  # rows were deleted since counting
+            if weighted and attempt < RANDOM_MAX_ATTEMPTS and rng.random() * best >= row[2]:
+                continue
+            count("storage.rows_read")
+            return {"title": row[0], "year": row[1], "rating": row[2], "poster_image_url": row[3]}
+        return None
+
+
+@timed("storage.get_movie")
+def get_movie(title):
+    """
+    Look up one movie by title (case-insensitive, indexed).
+    :param title: Movie title.
+    :return: Dict with keys "title", "year", "rating", "poster_image_url", or None if not found.
+    """
+    with engine.connect() as connection:
+        row = connection.execute(
+            text(
+                """SELECT title, year, rating, poster_image_url
+                FROM movies
+                WHERE title = :title COLLATE NOCASE"""
+            ),
+                {"title": title}
+        ).fetchone()
+    if row is None:
+        return None
+    return {"title": row[0], "year": row[1], "rating": row[2], "poster_image_url": row[3]}
+
+
+@timed("storage.list_titles")
+def list_titles():
+    """
+    Retrieve only the titles of all stored movies.
+    :return: List of movie titles.
+    """
+    with engine.connect() as connection:
+        titles = connection.execute(text("SELECT title FROM movies")).scalars().all()
+    count("storage.rows_read", len(titles))
+    return titles
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Group many writes into one transaction (one commit, one fsync).
+    Pass the yielded connection to the write functions; everything is
+    committed when the block ends, or rolled back if it raises.
+    The write lock is taken up front (BEGIN IMMEDIATE).
+
+        with unit_of_work() as connection:
+            add_movies(rows, connection=connection)
+            update_ratings({"Alien": 8.6}, connection=connection)
+
+    :return: Context manager yielding an open connection.
+    """
+    try:
+        with engine.connect() as connection, transaction(connection):
+            yield connection
+    finally:
+        catalog_cache.invalidate()
+
+
+@contextmanager
+def writing(connection=None):
+    """
+    Use the caller's unit of work, or run in a transaction of its own.
+    :param connection: Connection of an open unit of work, or None.
+    :return: Context manager yielding a connection.
+    """
+    if connection is not None:
+        yield connection
+    else:
+        with unit_of_work() as connection:
+            yield connection
+
+
+def title_key(title):
+    """
+    Fold a title the way SQLite's NOCASE collation does (ASCII letters only).
+    :param title: Movie title.
+    :return: Comparison key.
+    """
+    return title.translate(NOCASE_TABLE)
+
+
+def existing_titles(connection, titles):
+    """
+    Find which of many titles are stored (case-insensitive, indexed).
+    :param connection: Open connection.
+    :param titles: Iterable of titles.
+    :return: Set of title_key() values of the stored titles.
+    """
+    titles = list(dict.fromkeys(titles))
+    found = set()
+    for start in range(0, len(titles), LOOKUP_BATCH_SIZE):
+        chunk = titles[start:start + LOOKUP_BATCH_SIZE]
+        # Plain qmark placeholders: binding hundreds of named parameters costs more than the query
+        result = connection.exec_driver_sql(
+            f"SELECT title FROM movies WHERE title COLLATE NOCASE IN ({', '.join('?' * len(chunk))})",
+            tuple(chunk)
+        )
+        found.update(title_key(row[0]) for row in result)
+    return found
+
+
+def titles_are_unique(connection):
+    """
+    Check whether the NOCASE title index enforces uniqueness.
+    Migration 2 falls back to a non-unique index on databases that already
+    held titles differing only by case; ON CONFLICT cannot target that one.
+    :param connection: Open connection.
+    :return: True if the index is unique.
+    """
+    return any(row[1] == "idx_movies_title_nocase" and row[2]
+               for row in connection.exec_driver_sql("PRAGMA index_list(movies)"))
+
+
+@timed("storage.add_movie")
+def add_movie(title, year, rating, poster_image_url, connection=None):
+    """
+    Add a new movie to the database.
+    Inserts the provided fields (e.g. as fetched from OMDb by the caller)
+    into the local SQLite database.
+    :param connection: Optional connection of an open unit_of_work().
+    """
+    try:
+        with writing(connection) as connection:
             connection.execute(
                 text(
                     """INSERT INTO movies (title, year, rating, poster_image_url)     
@@ -59,57 +808,169 @@ def add_movie(title, year, rating, poster_image_url):
                 ),
                     {"title": title, "year": year, "rating": rating, "poster_image_url": poster_image_url}
             )
-            connection.commit()
-            print(f"Movie '{title}' added successfully.")
-        except Exception as e:
-            print(f"Error: {e}")
+        print(f"Movie '{title}' added successfully.")
+    except Exception as e:
+        count("storage.errors")
+        print(f"Error: {e}")
 
 
-def delete_movie(title):
+@timed("storage.add_movies")
+def add_movies(movies, upsert=False, connection=None):
+    """
+    Insert many movies with one executemany in a single transaction.
+    Titles that already exist (case-insensitive) are skipped, or with
+    `upsert` their year, rating and poster are overwritten
+    (INSERT ... ON CONFLICT DO UPDATE, or UPDATE after INSERT where the
+    title index is not unique).
+    :param movies: Iterable of dicts with keys "title", "year", "rating", "poster_image_url".
+    :param upsert: Update existing movies instead of skipping them.
+    :param connection: Optional connection of an open unit_of_work().
+    :return: List with one outcome per movie: "inserted", "updated" or "skipped".
+    """
+    rows = list(movies)
+    if not rows:
+        return []
+    with writing(connection) as connection:
+        known = existing_titles(connection, (row["title"] for row in rows))
+        outcomes = []
+        for row in rows:
+            key = title_key(row["title"])
+            if key in known:
+                outcomes.append("updated" if upsert else "skipped")
+            else:
+                known.add(key)
+                outcomes.append("inserted")
+
+        conflict_target = upsert and titles_are_unique(connection)
+        if conflict_target:
+            connection.execute(
+                text(
+                    """INSERT INTO movies (title, year, rating, poster_image_url)
+                    VALUES (:title, :year, :rating, :poster_image_url)
+                    ON CONFLICT (title COLLATE NOCASE) DO UPDATE SET
+                        year = excluded.year, rating = excluded.rating,
+                        poster_image_url = excluded.poster_image_url"""
+                ),
+                    rows
+            )
+        elif "inserted" in outcomes:
+            connection.execute(
+                text(
+                    """INSERT OR IGNORE INTO movies (title, year, rating, poster_image_url)
+                    VALUES (:title, :year, :rating, :poster_image_url)"""
+                ),
+                    [row for row, outcome in zip(rows, outcomes) if outcome == "inserted"]
+            )
+        if upsert and not conflict_target and "updated" in outcomes:
+            # After the inserts, so a title repeated within the batch ends with its last values
+            connection.execute(
+                text(
+                    """UPDATE movies
+                    SET year = :year, rating = :rating, poster_image_url = :poster_image_url
+                    WHERE title = :title COLLATE NOCASE"""
+                ),
+                    [row for row, outcome in zip(rows, outcomes) if outcome == "updated"]
+            )
+    return outcomes
+
+
+@timed("storage.delete_movie")
+def delete_movie(title, connection=None):
     """
     Delete a movie from the database by its title.
-    :param title: The movie title to remove.
+    :param title: The movie title to remove (case-insensitive comparison).
+    :param connection: Optional connection of an open unit_of_work().
     :return: None
     """
-    with engine.connect() as connection:
-        try:
+    try:
+        with writing(connection) as connection:
             result = connection.execute(
                 text(
                     """DELETE FROM movies 
-                    WHERE title = :title"""
+                    WHERE title = :title COLLATE NOCASE"""
                 ),
                     {"title": title}
             )
-            connection.commit()
-            if result.rowcount == 0:
-                print(f"⚠️Movie '{title}' not found in database")
-            else:
-                print(f"Movie '{title}' was successfully deleted")
-        except Exception as e:
-            print(f"Error: {e}")
+        if result.rowcount == 0:
+            print(f"⚠️Movie '{title}' not found in database")
+        else:
+            print(f"Movie '{title}' was successfully deleted")
+    except Exception as e:
+        count("storage.errors")
+        print(f"Error: {e}")
+
 
+@timed("storage.delete_movies")
+def delete_movies(titles, connection=None):
+    """
+    Delete many movies with one executemany in a single transaction.
+    :param titles: Iterable of titles (case-insensitive comparison).
+    :param connection: Optional connection of an open unit_of_work().
+    :return: List with one outcome per title: "deleted" or "not found".
+    """
+    titles = list(titles)
+    if not titles:
+        return []
+    with writing(connection) as connection:
+        known = existing_titles(connection, titles)
+        outcomes = []
+        for title in titles:
+            key = title_key(title)
+            outcomes.append("deleted" if key in known else "not found")
+            known.discard(key)
+        if "deleted" in outcomes:
+            connection.exec_driver_sql(
+                "DELETE FROM movies WHERE title = ? COLLATE NOCASE",
+                [(title,) for title, outcome in zip(titles, outcomes) if outcome == "deleted"]
+            )
+    return outcomes
 
-def update_movie(title, rating):
+
+@timed("storage.update_movie")
+def update_movie(title, rating, connection=None):
     """
     Update a movie's rating in the database.
     :param title: Movie title (case-insensitive comparison).
     :param rating: New rating value to set.
+    :param connection: Optional connection of an open unit_of_work().
     :return: None
     """
-    with engine.connect() as connection:
-        try:
+    try:
+        with writing(connection) as connection:
             result = connection.execute(
                 text(
                     """UPDATE movies 
-                    SET rating = :rating 
-                    WHERE LOWER (title) = :title"""
+                    SET rating = :rating
+                    WHERE title = :title COLLATE NOCASE"""
                 ),
-                    {"title": title.lower(), "rating": rating}
+                    {"title": title, "rating": rating}
             )
-            connection.commit()
-            if result.rowcount == 0:
-                print(f"⚠️Movie '{title}' not found in database")
-            else:
-                print(f"Movie '{title}' was successfully updated")
-        except Exception as e:
-            print(f"Error: {e}")
+        if result.rowcount == 0:
+            print(f"⚠️Movie '{title}' not found in database")
+        else:
+            print(f"Movie '{title}' was successfully updated")
+    except Exception as e:
+        count("storage.errors")
+        print(f"Error: {e}")
+
+
+@timed("storage.update_ratings")
+def update_ratings(ratings, connection=None):
+    """
+    Re-rate many movies with one executemany in a single transaction.
+    :param ratings: Mapping of title to rating, or iterable of (title, rating) pairs.
+    :param connection: Optional connection of an open unit_of_work().
+    :return: List with one outcome per pair: "updated" or "not found".
+    """
+    pairs = list(ratings.items() if hasattr(ratings, "items") else ratings)
+    if not pairs:
+        return []
+    with writing(connection) as connection:
+        known = existing_titles(connection, (title for title, _ in pairs))
+        outcomes = ["updated" if title_key(title) in known else "not found" for title, _ in pairs]
+        if "updated" in outcomes:
+            connection.exec_driver_sql(
+                "UPDATE movies SET rating = ? WHERE title = ? COLLATE NOCASE",
+                [(rating, title) for (title, rating), outcome in zip(pairs, outcomes) if outcome == "updated"]
+            )
+    return outcomes
@@ -0,0 +1,35 @@
+"""
+Shared pytest fixtures: temporary databases for the storage layer and
+the OMDb response cache, so tests never touch data/movies.db, and a small
+catalog with rating ties for the listing, ranking and catalog tests.
+"""
+import pytest
+import data.ombd_client as client
+import main
+import storage.movie_storage_sql as storage
+from storage.engine import create_storage_engine
+
+# Stored in this order (ids 1-7); Heat, Jaws and Up tie at 8.3, Brazil and Avatar at 7.9
+MOVIES = [("Heat", 1995, 8.3), ("Alien", 1979, 8.5), ("Cars", 2006, 7.2),
+          ("Brazil", 1985, 7.9), ("Up", 2009, 8.3), ("Avatar", 2009, 7.9), ("Jaws", 1975, 8.3)]
+
+
+@pytest.fixture
+def temp_storage(monkeypatch, tmp_path):
+    """Point storage and the OMDb cache at temporary databases"""
+    engine = create_storage_engine(f"sqlite:///{tmp_path / 'movies.db'}")
+    storage.init_db(engine)
+    monkeypatch.setattr(storage, "engine", engine)
+    client.set_cache(client.ResponseCache(db_url=f"sqlite:///{tmp_path / 'cache.db'}"))
+    yield engine
+    client.set_cache(None)
+    engine.dispose()
+
+
+@pytest.fixture
+def catalog(temp_storage, monkeypatch):
+    """Temporary database filled with MOVIES, also used by the menu commands"""
+    storage.add_movies({"title": title, "year": year, "rating": rating, "poster_image_url": "N/A"}
+                       for title, year, rating in MOVIES)
+    monkeypatch.setattr(main, "_storage", storage)
+    return temp_storage
@@ -0,0 +1,96 @@
+"""
+This module contains tests for the extended statistics report.
+"""
+import math
+import statistics
+from array import array
+
+import pytest
+
+import analytics
+import main
+import storage.catalog as catalog_module
+import storage.movie_storage_sql as storage
+
+MOVIES = [("Heat", 1995, 8.3), ("Alien", 1979, 8.5), ("Cars", 2006, 7.2), ("Brazil", 1985, 7.9),
+          ("Up", 2009, 8.3), ("Avatar", 2009, 7.9), ("Jaws", 1975, 8.3), ("Saw", 2004, 10.0)]
+
+
+@pytest.fixture(params=["stdlib", "numpy"])
+def backend(request, monkeypatch):
+    """Run a test with and without NumPy"""
+    if request.param == "stdlib":
+        monkeypatch.setattr(catalog_module, "_numpy", False)
+    else:
+        pytest.importorskip("numpy")
+    return request.param
+
+
+@pytest.fixture
+def filled(temp_storage, monkeypatch):
+    """Temporary database filled with a few movies"""
+    storage.add_movies({"title": title, "year": year, "rating": rating, "poster_image_url": "N/A"}
+                       for title, year, rating in MOVIES)
+    monkeypatch.setattr(main, "_storage", storage)
+    return temp_storage
+
+
+def test_report_matches_reference_formulas(filled, backend):
+    """Test every figure against a straightforward computation"""
+    years = [year for _, year, _ in MOVIES]
+    ratings = [rating for _, _, rating in MOVIES]
+    report = analytics.report()
+
+    assert report["count"] == len(MOVIES)
+    assert report["mean"] == pytest.approx(statistics.fmean(ratings))
+    assert report["stdev"] == pytest.approx(statistics.pstdev(ratings))
+    quantiles = statistics.quantiles(ratings, n=100, method="inclusive")
+    for point, value in report["percentiles"].items():
+        expected = {0: min(ratings), 100: max(ratings)}.get(point) or quantiles[point - 1]
+        assert value == pytest.approx(expected)
+    assert report["year_rating_correlation"] == pytest.approx(statistics.correlation(years, ratings))
+
+    counts = [bucket["count"] for bucket in report["histogram"]]
+    assert counts == [0, 0, 0, 0, 0, 0, 0, 3, 4, 1]  # 10.0 counts in the last bin
+    assert [(decade["from"], decade["count"]) for decade in report["decades"]] == \
+           [(1970, 2), (1980, 1), (1990, 1), (2000, 4)]
+    assert report["decades"][-1] == pytest.approx({"from": 2000, "count": 4, "mean": 33.4 / 4,
+                                                   "min": 7.2, "max": 10.0})
+    assert report["years"][-1] == {"from": 2009, "count": 2, "mean": pytest.approx(8.1), "min": 7.9, "max": 8.3}
+
+
+def test_functions_on_plain_sequences(backend):
+    """Test the building blocks on columns passed in directly"""
+    columns = (array("i", [2000, 2000, 2010]), array("d", [1.0, 3.0, 5.0]))
+    assert analytics.percentiles(columns[1], (0, 50, 100)) == {0: 1.0, 50: 3.0, 100: 5.0}
+    assert analytics.correlation(*columns) == pytest.approx(math.sqrt(3) / 2)
+    assert analytics.correlation(columns[0], array("d", [4.0] * 3)) is None
+    assert analytics.group_by(*columns, bucket=100) == [{"from": 2000, "count": 3, "mean": 3.0,
+                                                         "min": 1.0, "max": 5.0}]
+
+
+def test_stats_command_extended(filled, capsys, monkeypatch):
+    """Test the --extended flag and the menu entry; the stats command asks nothing"""
+    assert "extended" not in main.script_stats()
+    assert main.run_script_command("stats", {"extended": True})["extended"]["count"] == len(MOVIES)
+
+    monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail(f"unexpected prompt {prompt!r}"))
+    main.command_show_all_stats()
+    assert "Percentiles" not in capsys.readouterr().out
+    main.command_show_extended_stats()
+    output = capsys.readouterr().out
+    assert "Percentiles: p10" in output and "2000s        4 movies" in output
+
+
+def test_columns_skip_raw_omdb_strings(temp_storage):
+    """Test that year ranges are coerced and non-numeric ratings skipped when loading columns"""
+    storage.add_movie("Lost", "2004–2010", "8.3", "N/A")
+    storage.add_movie("Pending", 2025, "N/A", "N/A")
+    storage.add_movie("Heat", 1995, 8.3, "N/A")
+    years, ratings = analytics.load_columns(chunk_size=2)
+    assert list(years) == [2004, 1995] and list(ratings) == [8.3, 8.3]
+
+
+def test_empty_database(temp_storage):
+    """Test the report of an empty database"""
+    assert analytics.report() == {"count": 0}
@@ -0,0 +1,129 @@
+"""
+This module contains tests for the read-only JSON API.
+"""
+import http.client
+import json
+import time
+from urllib.parse import urlsplit
+
+import pytest
+
+import api_server
+import storage.movie_storage_sql as storage
+
+
+@pytest.fixture
+def api(temp_storage):
+    """Serve the temporary database on a free port"""
+    storage.add_movies({"title": title, "year": year, "rating": rating, "poster_image_url": "N/A"}
+                       for title, year, rating in (("Alien", 1979, 8.5), ("Heat", 1995, 8.3),
+                                                   ("Up", 2009, 8.2), ("Amélie", 2001, 8.3)))
+    server, url = api_server.start_server(port=0, workers=2)
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=5)
+
+    def get(path, headers=None):
+        connection.request("GET", path, headers=headers or {})
+        response = connection.getresponse()
+        body = response.read()
+        return response.status, response.getheader("ETag"), json.loads(body) if body else None
+
+    get.server = server
+    yield get
+    connection.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_pagination_and_filters(api):
+    """Test pages, next links, totals and query validation"""
+    status, _, first = api("/movies?per_page=3&order=title")
+    assert status == 200 and first["total"] == 4
+    assert [movie["title"] for movie in first["movies"]] == ["Alien", "Amélie", "Heat"]
+    assert first["next"] == "/movies?per_page=3&order=title&page=2&after_title=Heat"
+    _, _, second = api(first["next"])
+    assert [movie["title"] for movie in second["movies"]] == ["Up"] and second["next"] is None
+    assert api("/movies?per_page=3&order=title&page=2")[2]["movies"] == second["movies"]
+
+    _, _, recent = api("/movies?year_from=2000&order=rating")
+    assert {movie["title"] for movie in recent["movies"]} == {"Up", "Amélie"}
+    assert api("/movies?per_page=0")[0] == 400
+    assert api("/movies?page=x")[0] == 400
+    assert api("/movies?order=rating&after_rating=8")[0] == 400
+
+
+def test_keyset_next_links(api):
+    """Test that following next links walks every movie once in each order"""
+    for order in ("id", "title", "rating"):
+        seen, link = [], f"/movies?per_page=1&order={order}&descending=1"
+        while link:
+            _, _, page = api(link)
+            seen += [movie["title"] for movie in page["movies"]]
+            link = page["next"]
+        _, _, everything = api(f"/movies?per_page=10&order={order}&descending=1")
+        assert seen == [movie["title"] for movie in everything["movies"]]
+
+
+def test_single_movie_search_stats_and_errors(api):
+    """Test the remaining endpoints and JSON errors"""
+    assert api("/movies/am%C3%A9lie")[2]["title"] == "Amélie"
+    status, _, error = api("/movies/Nope")
+    assert status == 404 and "not found" in error["error"]
+    assert api("/search?q=hea")[2]["movies"][0]["title"] == "Heat"
+    assert api("/search")[0] == 400
+    assert api("/stats")[2]["count"] == 4
+    assert [movie["rank"] for movie in api("/top?limit=3")[2]["movies"]] == [1, 2, 2]
+    assert api("/top?decade=1995")[0] == 400
+    assert api("/random")[2]["title"] in {"Alien", "Heat", "Up", "Amélie"}
+    assert api("/nowhere")[0] == 404
+
+
+def test_etags_cache_hits_and_invalidation(api):
+    """Test 304 answers, cache hits and invalidation after a write"""
+    status, etag, _ = api("/stats")
+    assert status == 200 and etag
+    assert api("/stats", {"If-None-Match": etag})[:2] == (304, etag)
+    assert api.server.cache.stats()["hits"] == 1
+    assert api("/stats", {"If-None-Match": f'"x{etag[1:-1]}x"'})[0] == 200
+
+    storage.update_movie("Up", 9.9)
+    status, new_etag, stats = api("/stats", {"If-None-Match": etag})
+    assert status == 200 and new_etag != etag and stats["max"] == 9.9
+    assert api.server.cache.stats()["not_modified"] == 1
+
+
+def test_if_none_match_compares_whole_etags():
+    """Test list, weak and wildcard If-None-Match values"""
+    assert api_server.etag_matches('"a", W/"7-abc" ', '"7-abc"')
+    assert api_server.etag_matches("*", '"7-abc"')
+    assert not api_server.etag_matches('"17-abcd"', '"7-abc"')
+    assert not api_server.etag_matches(None, '"7-abc"')
+
+
+def test_idle_connections_do_not_hold_workers(temp_storage, monkeypatch):
+    """Test that keep-alive connections beyond the worker count are served, capped and timed out"""
+    monkeypatch.setattr(api_server.ApiRequestHandler, "timeout", 0.5)
+    server, url = api_server.start_server(port=0, workers=1, max_connections=2)
+    parts = urlsplit(url)
+    connections = [http.client.HTTPConnection(parts.hostname, parts.port, timeout=5) for _ in range(3)]
+    try:
+        # Both connections stay open, yet the single worker answers each of them
+        for connection in connections[:2]:
+            connection.request("GET", "/health")
+            assert connection.getresponse().status == 200
+        connections[2].request("GET", "/health")
+        response = connections[2].getresponse()
+        assert response.status == 503 and response.getheader("Retry-After") == "1"
+        response.read()
+
+        # Idle connections are closed, which frees their slots
+        time.sleep(1.0)
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=5)
+        connection.request("GET", "/health")
+        assert connection.getresponse().status == 200
+        connection.close()
+    finally:
+        for connection in connections:
+            connection.close()
+        server.shutdown()
+        server.server_close()
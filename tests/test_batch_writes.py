@@ -0,0 +1,84 @@
+"""
+This module contains tests for the batched write functions and unit of work.
+"""
+import time
+
+import pytest
+
+import storage.movie_storage_sql as storage
+from storage.engine import create_storage_engine
+
+
+def movie(title, rating=5.0, year=2000):
+    """Build a row for add_movies()"""
+    return {"title": title, "year": year, "rating": rating, "poster_image_url": "N/A"}
+
+
+def test_add_movies_reports_outcomes_and_upserts(temp_storage):
+    """Test per-row outcomes for new, existing and repeated titles"""
+    assert storage.add_movies([movie("Alien"), movie("Heat")]) == ["inserted", "inserted"]
+    assert storage.add_movies([movie("ALIEN", 9.0), movie("Up"), movie("up")]) == ["skipped", "inserted", "skipped"]
+    assert storage.get_movie("alien")["rating"] == 5.0
+
+    outcomes = storage.add_movies([movie("alien", 8.5, 1979), movie("Brazil")], upsert=True)
+    assert outcomes == ["updated", "inserted"]
+    assert storage.get_movie("Alien") == {"title": "Alien", "year": 1979, "rating": 8.5, "poster_image_url": "N/A"}
+    assert storage.count_movies() == 4
+
+
+def test_upsert_on_legacy_case_duplicates(tmp_path, monkeypatch):
+    """Test upserts where migration 2 could only create a non-unique title index"""
+    engine = create_storage_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.connect() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE movies (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT UNIQUE NOT NULL, "
+            "year INTEGER NOT NULL, rating REAL NOT NULL, poster_image_url STRING NOT NULL)")
+        connection.exec_driver_sql("INSERT INTO movies (title, year, rating, poster_image_url) "
+                                   "VALUES ('Alien', 1979, 8.5, 'N/A'), ('ALIEN', 1979, 8.0, 'N/A')")
+        connection.commit()
+    storage.init_db(engine)
+    monkeypatch.setattr(storage, "engine", engine)
+
+    outcomes = storage.add_movies([movie("alien", 7.0, 1980), movie("Heat"), movie("heat", 6.0)], upsert=True)
+    assert outcomes == ["updated", "inserted", "updated"]
+    assert {storage.get_movie(title)["rating"] for title in ("Alien", "ALIEN", "Heat")} == {7.0, 6.0}
+    assert storage.count_movies() == 3
+    engine.dispose()
+
+
+def test_delete_movies_and_update_ratings(temp_storage):
+    """Test batch delete and re-rating with unknown titles"""
+    storage.add_movies(movie(f"Movie {index}") for index in range(5))
+    assert storage.update_ratings({"movie 1": 9.0, "Nope": 1.0}) == ["updated", "not found"]
+    assert storage.get_movie("Movie 1")["rating"] == 9.0
+    assert storage.delete_movies(["Movie 0", "MOVIE 0", "Nope"]) == ["deleted", "not found", "not found"]
+    assert storage.count_movies() == 4
+    assert storage.movie_stats()["sum"] == pytest.approx(4 * 5.0 - 5.0 + 9.0)
+
+
+def test_unit_of_work_commits_or_rolls_back_as_one(temp_storage):
+    """Test that grouped operations are atomic"""
+    with storage.unit_of_work() as connection:
+        storage.add_movies([movie("Alien"), movie("Heat")], connection=connection)
+        storage.update_ratings([("Alien", 8.0)], connection=connection)
+        storage.delete_movie("Heat", connection=connection)
+    assert storage.list_titles() == ["Alien"]
+    assert storage.get_movie("Alien")["rating"] == 8.0
+
+    with pytest.raises(RuntimeError):
+        with storage.unit_of_work() as connection:
+            storage.add_movies([movie("Up")], connection=connection)
+            storage.delete_movies(["Alien"], connection=connection)
+            raise RuntimeError("abort")
+    assert storage.list_titles() == ["Alien"]
+
+
+def test_rerating_many_movies_is_fast(temp_storage):
+    """Test that a large re-rating runs as one batch, not one commit per row"""
+    count = 20_000
+    storage.add_movies(movie(f"Movie {index}") for index in range(count))
+    started = time.perf_counter()
+    outcomes = storage.update_ratings((f"Movie {index}", 7.5) for index in range(count))
+    assert time.perf_counter() - started < 5
+    assert outcomes.count("updated") == count
+    assert storage.movie_stats()["average"] == pytest.approx(7.5)
@@ -0,0 +1,31 @@
+"""
+This module contains smoke tests for the benchmark suite and its regression check.
+"""
+import storage.movie_storage_sql as storage
+from benchmarks import suite
+
+
+def test_synthetic_catalog_is_reproducible():
+    """Test that the same seed always yields the same distinct movies"""
+    first = list(suite.synthetic_movies(500))
+    assert first == list(suite.synthetic_movies(500))
+    assert len({title for title, *_ in first}) == 500
+
+
+def test_suite_runs_on_a_tiny_catalog():
+    """Test that every benchmark runs and the real engine is restored"""
+    engine = storage.engine
+    document = suite.run_suite(sizes=[50], repeat=1, include_client=False)
+    assert storage.engine is engine
+    results = document["results"]["50"]
+    assert results["list_movies"]["operations"] == 50
+    assert results["sorted_listing"]["operations"] == 50
+    assert all(result["median_s"] >= 0 for result in results.values())
+
+
+def test_compare_flags_slowdowns_over_threshold():
+    """Test the regression check"""
+    baseline = {"results": {"1000": {"stats": {"median_s": 1.0}, "search": {"median_s": 1.0}}}}
+    current = {"results": {"1000": {"stats": {"median_s": 1.2}, "search": {"median_s": 1.5},
+                                    "new": {"median_s": 9.0}}}}
+    assert suite.compare(current, baseline, threshold=0.25) == [("1000", "search", 1.0, 1.5)]
@@ -0,0 +1,71 @@
+"""
+This module contains tests for the bulk importer.
+It runs imports against a local fake OMDb server and a temporary database.
+"""
+import bulk_import
+import data.ombd_client as client
+import storage.movie_storage_sql as storage
+from benchmarks.fake_omdb_server import start_server
+
+
+def test_import_reports_imported_skipped_and_failed(temp_storage, tmp_path):
+    """Test a mixed import: new, duplicate, already stored and unknown titles"""
+    storage.add_movies([{"title": "Alien", "year": 1979, "rating": 8.5, "poster_image_url": "N/A"}])
+    titles_file = tmp_path / "titles.jsonl"
+    titles_file.write_text('Inception\n{"title": "Heat"}\n\ninception\n{"title": "Bro\nalien\nMissing Movie\n',
+                           encoding="utf-8")
+
+    server, url = start_server()
+    try:
+        report = bulk_import.import_titles(bulk_import.read_titles(titles_file), workers=4,
+                                           requests_per_second=0, batch_size=2, api_url=url)
+    finally:
+        server.shutdown()
+
+    assert report["imported"] == 2
+    assert sorted(reason for _, reason in report["skipped"]) == ["already in database", "duplicate in input"]
+    assert sorted(title for title, _ in report["failed"]) == ["Missing Movie", "line 5"]
+    assert set(storage.list_titles()) == {"Alien", "Inception", "Heat"}
+
+
+def test_network_errors_are_reported_as_failures(temp_storage, monkeypatch):
+    """Test that an unreachable OMDb turns into failed entries, not a crash"""
+    monkeypatch.setattr(client, "OMDB_MAX_RETRIES", 0)
+    report = bulk_import.import_titles(["Heat"], requests_per_second=0, api_url="http://127.0.0.1:9/")
+
+    assert report["imported"] == 0
+    assert [title for title, _ in report["failed"]] == ["Heat"]
+
+
+def test_incomplete_payloads_become_failures():
+    """Test that OMDb answers without a title, year or rating are rejected, not raised"""
+    payload = {"Title": "Heat", "Year": "1995", "imdbRating": "8.3", "Poster": "N/A"}
+    assert bulk_import.payload_to_row(payload)[0]["title"] == "Heat"
+    for broken in ({"Year": "1995", "imdbRating": "8.3"}, {**payload, "Year": None},
+                   {**payload, "imdbRating": None}):
+        row, error = bulk_import.payload_to_row(broken)
+        assert row is None and error
+
+
+def test_existing_titles_are_checked_per_batch(temp_storage, monkeypatch):
+    """Test that stored titles are looked up per batch (NOCASE), not preloaded"""
+    storage.add_movies([{"title": "Alien", "year": 1979, "rating": 8.5, "poster_image_url": "N/A"}])
+    answers = {"Alien 1979": "Alien", "Aliens": "Aliens"}
+    asked = []
+
+    def fake_payload(title, api_url=None, limiter=None):
+        asked.append(title)
+        return {"Title": answers[title], "Year": "1986", "imdbRating": "8.4", "Poster": "N/A"}
+
+    def no_preload():
+        raise AssertionError("all stored titles were loaded")
+
+    monkeypatch.setattr(bulk_import, "fetch_movie_payload", fake_payload)
+    monkeypatch.setattr(storage, "list_titles", no_preload)
+    report = bulk_import.import_titles(["ALIEN", "Alien 1979", "Aliens", "aliens"], requests_per_second=0,
+                                       batch_size=2)
+
+    assert sorted(asked) == ["Alien 1979", "Aliens"]
+    assert report["imported"] == 1
+    assert sorted(reason for _, reason in report["skipped"]) == [
+        "already in database", "duplicate in input", "resolves to existing 'Alien'"]
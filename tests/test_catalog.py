@@ -0,0 +1,72 @@
+"""
+This module contains tests for the compact, column-oriented movie catalog.
+"""
+import random
+
+import pytest
+
+import storage.catalog as catalog_module
+import storage.movie_storage_sql as storage
+from storage.catalog import Movie, MovieCatalog
+
+
+@pytest.fixture(params=["stdlib", "numpy"])
+def catalog(request, catalog, monkeypatch):
+    """The shared catalog (see conftest) loaded into memory, with and without NumPy"""
+    if request.param == "stdlib":
+        monkeypatch.setattr(catalog_module, "_numpy", False)
+    else:
+        pytest.importorskip("numpy")
+    return storage.list_movies()
+
+
+def test_catalog_reads_like_the_old_mapping(catalog):
+    """Test dict-style access, equality with dicts and attribute access"""
+    assert list(catalog) == ["Heat", "Alien", "Cars", "Brazil", "Up", "Avatar", "Jaws"]
+    assert catalog["Alien"]["rating"] == 8.5 and catalog["Alien"].year == 1979
+    assert catalog["Alien"] == {"year": 1979, "rating": 8.5, "poster_image_url": "N/A"}
+    assert catalog.get("Nope") is None and "Heat" in catalog
+    assert dict(catalog["Up"]) == {"year": 2009, "rating": 8.3, "poster_image_url": "N/A"}
+
+
+def test_stats_and_rating_order_match_storage(catalog):
+    """Test that column stats and sorting agree with the SQL implementations"""
+    expected = storage.movie_stats()
+    stats = catalog.stats()
+    assert stats.pop("sum") == pytest.approx(expected.pop("sum"))
+    assert stats.pop("average") == pytest.approx(expected.pop("average"))
+    assert stats == expected
+
+    for descending in (True, False):
+        assert [title for title, _ in catalog.sorted_by_rating(descending)] == \
+               [title for title, _ in storage.iter_movies(order_by="rating", descending=descending)]
+
+
+def test_random_pick_and_empty_catalog(catalog):
+    """Test random picks and the empty catalog"""
+    title, movie = catalog.random(random.Random(1))
+    assert catalog[title] == movie
+    assert MovieCatalog().random() is None and MovieCatalog().stats() == {"count": 0}
+    assert Movie("Up", 2009, 8.3, "N/A") != Movie("Up", 2009, 8.2, "N/A")
+
+
+def test_raw_omdb_strings_are_coerced_or_skipped(temp_storage):
+    """Test rows stored with OMDb's raw year range and rating strings"""
+    storage.add_movie("Lost", "2004–2010", "8.3", "N/A")
+    storage.add_movie("Pending", 2025, "N/A", "N/A")
+    storage.add_movie("Heat", 1995, 8.3, "N/A")
+    catalog = storage.list_movies()
+    assert list(catalog) == ["Lost", "Heat"] and catalog.skipped == 1
+    assert catalog["Lost"] == {"year": 2004, "rating": 8.3, "poster_image_url": "N/A"}
+
+    columns = MovieCatalog(["Lost", "Pending"], ["2004–2010", "2025"], ["8.3", "N/A"], ["N/A", "N/A"])
+    assert list(columns.items()) == [("Lost", Movie("Lost", 2004, 8.3, "N/A"))] and columns.skipped == 1
+
+
+def test_streamed_listing_yields_movie_records(catalog):
+    """Test that iter_movies() yields compact records that still read like the old dicts"""
+    title, movie = next(storage.iter_movies())
+    assert isinstance(movie, Movie) and movie.title == title == "Heat"
+    assert movie["id"] == 1 and movie.get("rating") == 8.3
+    assert movie == {"id": 1, "year": 1995, "rating": 8.3, "poster_image_url": "N/A"}
+    assert catalog["Heat"].get("id") is None and "id" not in catalog["Heat"].keys()
@@ -0,0 +1,60 @@
+"""
+This module contains tests for the read-through catalog cache.
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+import main
+import storage.movie_storage_sql as storage
+
+
+@pytest.fixture
+def cache(temp_storage):
+    """Fresh catalog cache over a small temporary database"""
+    storage.add_movies({"title": title, "year": 2000, "rating": rating, "poster_image_url": "N/A"}
+                       for title, rating in (("Alien", 8.5), ("Heat", 8.3), ("Up", 8.2)))
+    cache = storage.CatalogCache()
+    storage_cache, storage.catalog_cache = storage.catalog_cache, cache
+    yield cache
+    cache.close()
+    storage.catalog_cache = storage_cache
+
+
+def test_repeated_reads_are_served_from_memory(cache):
+    """Test hits for stats and searches"""
+    first = storage.cached_stats()
+    assert storage.cached_stats() is first and first["count"] == 3
+    assert list(storage.cached_search("hea")) == ["Heat"]
+    assert storage.cached_search("hea") is storage.cached_search("hea")
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 2
+
+
+def test_own_writes_invalidate(cache):
+    """Test that a write through the storage layer is seen immediately"""
+    assert "Jaws" not in storage.cached_search("jaws")
+    storage.add_movie("Jaws", 1975, 8.1, "N/A")
+    assert "Jaws" in storage.cached_search("jaws")
+    storage.update_movie("Jaws", 9.9)
+    assert storage.cached_stats()["max"] == 9.9
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_external_writes_invalidate(cache, temp_storage):
+    """Test that a commit from another connection is detected through data_version"""
+    assert storage.cached_stats()["count"] == 3
+    other = create_engine(temp_storage.url)
+    with other.begin() as connection:
+        connection.execute(text("DELETE FROM movies WHERE title = 'Up'"))
+    other.dispose()
+    assert storage.cached_stats()["count"] == 2
+
+
+def test_list_and_search_commands_do_not_load_the_catalog(cache, monkeypatch, capsys):
+    """Test that listing streams rows and search checks emptiness without the full catalog"""
+    monkeypatch.setattr(main, "_storage", storage)
+    monkeypatch.setattr(storage, "list_movies", lambda: pytest.fail("catalog loaded"))
+    monkeypatch.setattr("builtins.input", lambda prompt: "heat")
+    main.command_list_movies()
+    main.command_search_movie()
+    output = capsys.readouterr().out
+    assert "3 MOVIES IN TOTAL" in output and "Heat, 8.3" in output
@@ -0,0 +1,105 @@
+"""
+This module contains tests for catalog export, import and snapshots.
+"""
+import sqlite3
+
+import pytest
+
+import catalog_transfer as transfer
+import storage.movie_storage_sql as storage
+
+MOVIES = [("Heat", 1995, 8.3, "https://example.invalid/heat.jpg"), ("Amélie, \"Le Fabuleux\"", 2001, 8.3, "N/A"),
+          ("Alien", 1979, 8.5, "N/A"), ("Cars", 2006, 7.2, "N/A"), ("Up", 2009, 8.3, "N/A")]
+
+
+@pytest.fixture
+def filled(temp_storage):
+    """Temporary database filled with a few movies"""
+    storage.add_movies({"title": title, "year": year, "rating": rating, "poster_image_url": poster}
+                       for title, year, rating, poster in MOVIES)
+    return temp_storage
+
+
+def stored():
+    return sorted((title, data["year"], data["rating"], data["poster_image_url"])
+                  for title, data in storage.iter_movies())
+
+
+@pytest.mark.parametrize("name", ["movies.csv", "movies.jsonl.gz"])
+def test_export_import_round_trip(filled, tmp_path, name):
+    """Test that an export loads back unchanged, in small chunks"""
+    path = str(tmp_path / name)
+    assert transfer.export_catalog(path, chunk_size=2)["rows"] == len(MOVIES)
+    storage.delete_movies([title for title, *_ in MOVIES])
+
+    report = transfer.import_catalog(path, batch_size=2)
+    assert (report["inserted"], report["records"], report["failed"]) == (len(MOVIES), len(MOVIES), 0)
+    assert stored() == sorted(MOVIES)
+    assert report["rows_per_second"] > 0
+
+    report = transfer.import_catalog(path, upsert=False)
+    assert report["skipped"] == len(MOVIES)
+
+
+def test_interrupted_import_resumes(filled, tmp_path, monkeypatch):
+    """Test that a failed import continues after the last committed batch"""
+    path = str(tmp_path / "movies.csv")
+    transfer.export_catalog(path)
+    storage.delete_movies([title for title, *_ in MOVIES])
+
+    add_movies = storage.add_movies
+    calls = []
+
+    def failing_add_movies(rows, upsert=False):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise OSError("disk full")
+        return add_movies(rows, upsert=upsert)
+
+    monkeypatch.setattr(storage, "add_movies", failing_add_movies)
+    with pytest.raises(OSError):
+        transfer.import_catalog(path, batch_size=2)
+    assert storage.count_movies() == 2
+
+    report = transfer.import_catalog(path, batch_size=2)
+    assert report["resumed_from"] == 2 and report["inserted"] == len(MOVIES) - 2
+    assert calls == [2, 2, 2, 1]
+    assert stored() == sorted(MOVIES)
+    assert not (tmp_path / "movies.csv.progress").exists()
+
+
+def test_invalid_records_are_counted(temp_storage, tmp_path):
+    """Test that bad records are reported and the rest imported"""
+    path = tmp_path / "movies.jsonl"
+    path.write_text('{"title": "Heat", "year": 1995, "rating": 8.3}\n\n'
+                    '{"title": "", "year": 2000, "rating": 5}\n'
+                    '{"title": "Bad", "year": "soon", "rating": 5}\n'
+                    '{"title": "Truncated", "year": 20\n'
+                    '{"title": "Worse", "year": 2000, "rating": 11}\n'
+                    '{"title": "Up", "year": 2009, "rating": 8.3}\n', encoding="utf-8")
+    report = transfer.import_catalog(str(path))
+    assert (report["inserted"], report["failed"], len(report["errors"])) == (2, 4, 4)
+    assert "line 5 is not valid JSON" in report["errors"][2]
+    assert storage.get_movie("Heat")["poster_image_url"] == "N/A"
+    with pytest.raises(ValueError):
+        transfer.detect_format("movies.xml")
+
+
+@pytest.mark.parametrize("pages", [-1, 1])
+def test_snapshot_of_live_database(filled, tmp_path, pages):
+    """Test the online backup copy, also while a writer commits between steps"""
+    path = tmp_path / "snapshot.db"
+    writes = []
+
+    def progress(status, remaining, total):
+        # One write in the middle of a stepwise copy makes it start over once
+        if remaining and pages == 1 and not writes:
+            writes.append(storage.update_ratings([("Heat", 9.0)]))
+
+    report = transfer.snapshot_database(str(path), pages=pages, sleep=0, progress=progress)
+    assert report["rows"] == len(MOVIES) and report["bytes"] == path.stat().st_size
+    with sqlite3.connect(path) as copy:
+        assert copy.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+        assert copy.execute("SELECT COUNT(*) FROM movies_fts WHERE movies_fts MATCH 'alien'").fetchone() == (1,)
+        expected = 9.0 if pages == 1 else 8.3
+        assert copy.execute("SELECT rating FROM movies WHERE title = 'Heat'").fetchone() == (expected,)
@@ -0,0 +1,71 @@
+"""
+This module contains tests for the SQLite engine profiles.
+"""
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from storage.engine import create_storage_engine
+from storage.migrations import migrate
+
+INSERT = "INSERT INTO movies (title, year, rating, poster_image_url) VALUES (:title, 2000, 5.0, 'N/A')"
+
+
+def pragma(engine, name):
+    """Read a PRAGMA value through a pooled connection"""
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_tuned_profile_applies_pragmas(tmp_path):
+    """Test that every connection of the tuned profile is configured"""
+    engine = create_storage_engine(f"sqlite:///{tmp_path / 'tuned.db'}", profile="tuned")
+    assert pragma(engine, "journal_mode") == "wal"
+    assert pragma(engine, "synchronous") == 1  # NORMAL
+    assert pragma(engine, "temp_store") == 2  # MEMORY
+    assert pragma(engine, "cache_size") == -64 * 1024
+    assert engine.pool.size() == 5
+    engine.dispose()
+
+
+def test_default_profile_keeps_stock_settings(tmp_path):
+    """Test that the default profile changes nothing"""
+    engine = create_storage_engine(f"sqlite:///{tmp_path / 'default.db'}", profile="default")
+    assert pragma(engine, "journal_mode") == "delete"
+    engine.dispose()
+    with pytest.raises(ValueError):
+        create_storage_engine(f"sqlite:///{tmp_path / 'x.db'}", profile="turbo")
+
+
+def test_reader_runs_concurrently_with_writer(tmp_path):
+    """Test that an open read transaction neither blocks nor sees a writer's commit"""
+    engine = create_storage_engine(f"sqlite:///{tmp_path / 'wal.db'}", profile="tuned",
+                                   pragmas={"journal_mode": "WAL", "busy_timeout": 100})
+    migrate(engine)
+    with engine.begin() as connection:
+        connection.execute(text(INSERT), [{"title": f"Movie {index}"} for index in range(10)])
+
+    errors = []
+
+    def write():
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(INSERT), {"title": "Written meanwhile"})
+        except Exception as e:
+            errors.append(e)
+
+    with engine.connect() as reader:
+        reader.exec_driver_sql("BEGIN")
+        before = reader.execute(text("SELECT COUNT(*) FROM movies")).scalar()
+        writer = threading.Thread(target=write)
+        writer.start()
+        writer.join()
+        # The snapshot of the read transaction is stable
+        assert reader.execute(text("SELECT COUNT(*) FROM movies")).scalar() == before == 10
+        reader.exec_driver_sql("COMMIT")
+
+    assert not errors
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM movies")).scalar() == 11
+    engine.dispose()
@@ -0,0 +1,75 @@
+"""
+This module contains tests for the trigram index behind fuzzy search and
+the near-duplicate check.
+"""
+import pytest
+from sqlalchemy import text
+
+import data.ombd_client as client
+import main
+import storage.movie_storage_sql as storage
+
+TITLES = ["Inception", "Interstellar", "The Matrix", "The Matrix Reloaded", "Heat"]
+
+
+@pytest.fixture
+def catalog(temp_storage, monkeypatch):
+    """Temporary database with a few titles; OMDb must not be asked"""
+    storage.add_movies({"title": title, "year": 2000, "rating": 8.0, "poster_image_url": "N/A"} for title in TITLES)
+    monkeypatch.setattr(main, "_storage", storage)
+
+    def no_omdb(title):
+        raise AssertionError(f"OMDb was asked for {title!r}")
+
+    monkeypatch.setattr(client, "fetch_movie_payload", no_omdb)
+    return temp_storage
+
+
+def test_similarity():
+    """Test the trigram similarity measure"""
+    assert storage.title_similarity("Inception", "inception") == 1.0
+    assert 0.5 < storage.title_similarity("Incepton", "Inception") < 1.0
+    assert storage.title_similarity("Heat", "Interstellar") < 0.1
+
+
+def test_misspelled_titles_are_found(catalog):
+    """Test ranking of typo-tolerant search results"""
+    assert list(storage.fuzzy_search_movies("Incepton")) == ["Inception"]
+    assert list(storage.fuzzy_search_movies("the matrx")) == ["The Matrix", "The Matrix Reloaded"]
+    assert storage.fuzzy_search_movies("zz") == {} and storage.fuzzy_search_movies("Xyzzy") == {}
+    assert main.script_search("Incepton", fuzzy=True)[0]["similarity"] > 0.5
+
+
+def test_index_follows_writes(catalog):
+    """Test that inserts, renames and deletes reach the trigram index"""
+    storage.add_movie("Amélie", 2001, 8.3, "N/A")
+    assert "Amélie" in storage.fuzzy_search_movies("amelie", min_similarity=0.2)
+    with catalog.begin() as connection:
+        connection.execute(text("UPDATE movies SET title = 'Heatwave' WHERE title = 'Heat'"))
+    assert list(storage.fuzzy_search_movies("heatwav")) == ["Heatwave"]
+    storage.delete_movie("Heatwave")
+    assert storage.fuzzy_search_movies("heatwav") == {}
+
+
+def test_duplicates_are_caught_before_omdb(catalog):
+    """Test the scripted add: stored and similar titles never reach OMDb"""
+    assert main.script_add("inception")["outcome"] == "skipped"
+    with pytest.raises(main.ScriptError, match="Interstellar"):
+        main.script_add("Interstelar")
+
+
+def test_sequels_and_plurals_are_not_duplicates(catalog):
+    """Test that titles differing by a sequel number or plural "s" are not flagged"""
+    storage.add_movie("Alien", 1979, 8.5, "N/A")
+    assert main.title_stem("Aliens") == main.title_stem("Alien Part III") == main.title_stem("alien 3") == "alien"
+    assert main.title_stem("The Matrix") == "the matrix"
+    for title in ("Aliens", "Alien 3", "Alien IV", "Heat 2", "Inception Part II"):
+        assert main.near_duplicates(storage, title) == []
+    assert main.near_duplicates(storage, "Allien") == ["Alien"]
+
+
+def test_search_command_suggests_similar_titles(catalog, monkeypatch, capsys):
+    """Test that the interactive search falls back to suggestions"""
+    monkeypatch.setattr("builtins.input", lambda prompt: "Intersteller")
+    main.command_search_movie()
+    assert "Did you mean:\nInterstellar, 8.0" in capsys.readouterr().out
@@ -0,0 +1,106 @@
+"""
+This module contains tests for the opt-in instrumentation layer.
+"""
+import json
+from itertools import islice
+
+import pytest
+
+import instrumentation
+import storage.movie_storage_sql as storage
+
+
+@pytest.fixture
+def metrics():
+    """Enable instrumentation without exporters, clean up afterwards"""
+    instrumentation.reset()
+    instrumentation.enable(json_path=None, prometheus_path=None, profile_path=None)
+    yield instrumentation
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_disabled_instrumentation_records_nothing():
+    """Test that decorators and counters are no-ops by default"""
+    @instrumentation.timed("test.disabled")
+    def work():
+        return 42
+
+    assert work() == 42
+    instrumentation.count("test.counter")
+    assert instrumentation.snapshot()["timings"] == {} and instrumentation.snapshot()["counters"] == {}
+
+
+def test_timed_functions_generators_and_blocks(metrics):
+    """Test timing of calls, generator runs, blocks and errors"""
+    @metrics.timed("test.generator")
+    def numbers():
+        yield from range(3)
+
+    @metrics.timed("test.failing")
+    def fail():
+        raise ValueError("boom")
+
+    assert list(numbers()) == [0, 1, 2]
+    with metrics.timed("test.block"):
+        pass
+    with pytest.raises(ValueError):
+        fail()
+
+    timings = metrics.snapshot()["timings"]
+    assert timings["test.generator"]["count"] == 1
+    assert timings["test.block"]["count"] == 1
+    assert timings["test.failing"]["errors"] == 1
+
+
+def test_closing_a_partly_read_generator_is_not_an_error(metrics):
+    """Test that a generator closed early is timed without the error flag"""
+    @metrics.timed("test.partial")
+    def numbers():
+        yield from range(10)
+
+    generator = numbers()
+    assert list(islice(generator, 3)) == [0, 1, 2]
+    generator.close()
+
+    timing = metrics.snapshot()["timings"]["test.partial"]
+    assert timing["count"] == 1 and timing["errors"] == 0
+
+
+def test_storage_calls_sql_and_rows_are_measured(temp_storage, metrics):
+    """Test storage timings, per-statement SQL timings and row counters"""
+    storage.add_movies({"title": f"Movie {index}", "year": 2000, "rating": 5.0, "poster_image_url": "N/A"}
+                       for index in range(5))
+    assert len(list(storage.iter_movies(chunk_size=2))) == 5
+    storage.update_ratings({"Movie 1": 9.0})
+
+    snapshot = metrics.snapshot()
+    assert snapshot["timings"]["storage.iter_movies"]["count"] == 1
+    assert snapshot["timings"]["storage.add_movies"]["count"] == 1
+    assert snapshot["counters"]["storage.rows_read"] == 5
+    assert snapshot["counters"]["sql.movies.db.rows_written"] == 6
+    assert snapshot["timings"]["sql.movies.db.select"]["count"] >= 3
+
+
+def test_exporters(temp_storage, metrics, tmp_path):
+    """Test the Prometheus text file and the JSON summary"""
+    storage.count_movies()
+    metrics.count("storage.rows_read", 7)
+
+    metrics.write_prometheus(str(tmp_path / "metrics.prom"))
+    text = (tmp_path / "metrics.prom").read_text(encoding="utf-8")
+    assert "# TYPE movies_storage_count_movies_seconds summary" in text
+    assert "movies_storage_count_movies_seconds_count 1" in text
+    assert "movies_storage_rows_read_total 7" in text
+
+    metrics.write_json(str(tmp_path / "metrics.json"))
+    summary = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    assert summary["counters"]["storage.rows_read"] == 7
+
+
+def test_failed_statements_are_counted(temp_storage, metrics):
+    """Test that a failing SQL statement is recorded as an error"""
+    with pytest.raises(Exception):
+        with temp_storage.connect() as connection:
+            connection.exec_driver_sql("SELECT * FROM no_such_table")
+    assert metrics.snapshot()["timings"]["sql.movies.db.failed"]["errors"] == 1
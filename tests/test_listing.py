@@ -0,0 +1,46 @@
+"""
+This module contains tests for the streaming, keyset-paginated listing API.
+"""
+import pytest
+
+import storage.movie_storage_sql as storage
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 100])
+def test_orders_are_stable_across_chunks(catalog, chunk_size):
+    """Test that every order returns each movie exactly once, whatever the chunk size"""
+    by_id = [title for title, _ in storage.iter_movies(chunk_size=chunk_size)]
+    assert by_id == ["Heat", "Alien", "Cars", "Brazil", "Up", "Avatar", "Jaws"]
+
+    by_title = [title for title, _ in storage.iter_movies(order_by="title", descending=True,
+                                                          chunk_size=chunk_size)]
+    assert by_title == sorted(by_id, reverse=True)
+
+    best_first = [title for title, _ in storage.iter_movies(order_by="rating", descending=True,
+                                                            chunk_size=chunk_size)]
+    assert best_first == ["Alien", "Heat", "Jaws", "Up", "Avatar", "Brazil", "Cars"]
+
+    worst_first = [title for title, _ in storage.iter_movies(order_by="rating", chunk_size=chunk_size)]
+    assert worst_first == best_first[::-1]
+
+
+def test_filters(catalog):
+    """Test rating and year filters together with ordering"""
+    movies = storage.iter_movies(order_by="title", min_rating=8, year_from=1980, year_to=2009, chunk_size=1)
+    assert [title for title, _ in movies] == ["Heat", "Up"]
+    with pytest.raises(ValueError):
+        list(storage.iter_movies(order_by="poster_image_url"))
+
+
+def test_rating_order_uses_index(catalog):
+    """Test that sorted listings are served by the rating index, not a sort step"""
+    with catalog.connect() as connection:
+        plan = " ".join(row[-1] for row in connection.execute(storage.text(
+            "EXPLAIN QUERY PLAN SELECT title FROM movies ORDER BY rating DESC, title LIMIT 10")))
+    assert "idx_movies_rating_title" in plan and "TEMP B-TREE" not in plan
+
+
+def test_list_movies_matches_streamed_listing(catalog):
+    """Test that the materialized listing holds the same movies as iter_movies()"""
+    movies = storage.list_movies()
+    assert movies == {title: {key: data[key] for key in ("year", "rating", "poster_image_url")}
+                      for title, data in storage.iter_movies()}
@@ -0,0 +1,96 @@
+"""
+This module contains tests for the versioned schema migration runner.
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+import storage.movie_storage_sql as storage
+from storage import migrations
+
+
+def make_legacy_db(path, rows=0):
+    """Create an unversioned database as written by older releases"""
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as connection:
+        connection.execute(text(
+            "CREATE TABLE movies (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT UNIQUE NOT NULL, "
+            "year INTEGER NOT NULL, rating REAL NOT NULL, poster_image_url STRING NOT NULL)"))
+        connection.execute(text("INSERT INTO movies (title, year, rating, poster_image_url) "
+                                "VALUES (:title, 2000, 5.0, 'N/A')"),
+                           [{"title": f"Movie {index}"} for index in range(rows)])
+        connection.commit()
+    return engine
+
+
+def version_of(engine):
+    """Return the schema version stored in the database"""
+    with engine.connect() as connection:
+        return migrations.current_version(connection)
+
+
+def test_fresh_database_and_dry_run(tmp_path):
+    """Test that a dry run changes nothing and a real run reaches the latest version"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+    latest = migrations.MIGRATIONS[-1].version
+    assert [step.version for step in migrations.migrate(engine, dry_run=True)] == list(range(1, latest + 1))
+    assert version_of(engine) == 0
+    migrations.migrate(engine)
+    assert version_of(engine) == latest
+    assert migrations.migrate(engine) == []
+
+
+def test_backfill_runs_in_batches_and_resumes(tmp_path, monkeypatch):
+    """Test that an interrupted backfill resumes from the recorded progress"""
+    engine = make_legacy_db(tmp_path / "old.db", rows=7)
+    calls = []
+    original = migrations.backfill_search_index
+
+    def failing_backfill(connection, last_id, max_id, batch_size):
+        calls.append(last_id)
+        if len(calls) == 2:
+            raise RuntimeError("interrupted")
+        return original(connection, last_id, max_id, batch_size)
+
+    steps = [step._replace(backfill=failing_backfill) if step.backfill is original else step
+             for step in migrations.MIGRATIONS]
+    monkeypatch.setattr(migrations, "MIGRATIONS", steps)
+    with pytest.raises(RuntimeError):
+        migrations.migrate(engine, batch_size=3)
+    assert version_of(engine) == 2
+
+    migrations.migrate(engine, batch_size=3)
+    assert calls == [0, 3, 3, 6]
+    assert version_of(engine) == steps[-1].version
+    with engine.connect() as connection:
+        hits = connection.execute(text("SELECT rowid FROM movies_fts WHERE movies_fts MATCH 'movie'")).fetchall()
+        assert len(hits) == 7
+        assert connection.execute(text("SELECT COUNT(*) FROM schema_backfill")).scalar() == 0
+
+
+def test_failed_migration_rolls_back(tmp_path, monkeypatch):
+    """Test that a failing upgrade leaves neither schema changes nor a version bump"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+
+    def broken(connection):
+        connection.execute(text("CREATE TABLE half_done (id INTEGER)"))
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS",
+                        [migrations.MIGRATIONS[0], migrations.Migration(2, "broken", broken, None)])
+    with pytest.raises(RuntimeError):
+        migrations.migrate(engine)
+    assert version_of(engine) == 1
+    with engine.connect() as connection:
+        assert not migrations.object_exists(connection, "table", "half_done")
+
+
+def test_one_counter_bump_per_write(temp_storage):
+    """Test that every write bumps the change counter exactly once"""
+    with temp_storage.connect() as connection:
+        assert not migrations.object_exists(connection, "table", "movie_tombstones")
+        assert not migrations.object_exists(connection, "trigger", "movies_changed_ai")
+    start = storage.change_counter()
+    storage.add_movie("Heat", 1995, 8.3, "N/A")
+    storage.add_movie("Alien", 1979, 8.5, "N/A")
+    storage.update_movie("Heat", 8.0)
+    assert storage.change_counter() == start + 3
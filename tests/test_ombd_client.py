@@ -0,0 +1,143 @@
+"""
+This module contains tests for the OMDb client: response cache, retries,
+rate limiting and latency metrics.
+HTTP calls go to a fake session so no network is needed, and the cache
+is backed by a temporary SQLite file.
+"""
+import data.ombd_client as client
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise client.requests.HTTPError(f"{self.status_code} error")
+
+
+class FakeSession:
+    """Stand-in for the shared requests.Session replaying canned responses"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, params=None, **kwargs):
+        self.calls.append(params)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+INCEPTION = {"Response": "True", "Title": "Inception", "Year": "2010",
+             "imdbRating": "8.8", "Poster": "N/A"}
+NOT_FOUND = {"Response": "False", "Error": "Movie not found!"}
+
+
+def install_fake_http(monkeypatch, *responses):
+    """Replace the shared session and return the list of recorded calls"""
+    session = FakeSession(r if isinstance(r, (FakeResponse, Exception)) else FakeResponse(r)
+                          for r in responses)
+    monkeypatch.setattr(client, "get_session", lambda: session)
+    monkeypatch.setattr(client, "OMDB_BACKOFF_FACTOR", 0)
+    return session.calls
+
+
+def make_cache(tmp_path, name="cache.db", **kwargs):
+    """Create and install a cache backed by a temporary database"""
+    cache = client.ResponseCache(db_url=f"sqlite:///{tmp_path / name}", **kwargs)
+    client.set_cache(cache)
+    return cache
+
+
+def test_repeated_fetch_hits_cache(monkeypatch, tmp_path):
+    """Test that a second lookup of the same title is served from memory"""
+    calls = install_fake_http(monkeypatch, INCEPTION)
+    cache = make_cache(tmp_path)
+    first = client.fetch_movie_data("Inception")
+    second = client.fetch_movie_data("  inception ")
+    assert first == second == ("2010", "8.8", "N/A", "Inception")
+    assert len(calls) == 1
+    assert cache.stats()["memory_hits"] == 1
+    client.set_cache(None)
+
+
+def test_disk_cache_survives_new_process(monkeypatch, tmp_path):
+    """Test that a fresh cache instance reads entries persisted on disk"""
+    calls = install_fake_http(monkeypatch, INCEPTION)
+    make_cache(tmp_path)
+    client.fetch_movie_data("Inception")
+    cache = make_cache(tmp_path)
+    client.fetch_movie_data("Inception")
+    assert len(calls) == 1
+    assert cache.stats()["disk_hits"] == 1
+    client.set_cache(None)
+
+
+def test_negative_caching_and_ttl(monkeypatch, tmp_path):
+    """Test that 'not found' answers are cached and expire with their TTL"""
+    calls = install_fake_http(monkeypatch, NOT_FOUND)
+    make_cache(tmp_path, negative_ttl=0)
+    assert client.fetch_movie_data("Nope") is None
+    assert client.fetch_movie_data("Nope") is None
+    assert len(calls) == 2
+
+    make_cache(tmp_path, name="cache2.db", negative_ttl=60)
+    client.fetch_movie_data("Nope")
+    client.fetch_movie_data("Nope")
+    assert len(calls) == 3
+    client.set_cache(None)
+
+
+def test_size_bounded_eviction(monkeypatch, tmp_path):
+    """Test that memory and disk levels stay within their limits"""
+    install_fake_http(monkeypatch, INCEPTION)
+    cache = make_cache(tmp_path, max_memory_entries=2, max_disk_entries=3)
+    for index in range(5):
+        cache.put(f"title {index}", INCEPTION)
+    assert len(cache.memory) == 2
+    assert cache.get("title 0") is None
+    assert cache.get("title 4") == INCEPTION
+    assert cache.stats()["evictions"] == 3 + 2
+    client.set_cache(None)
+
+
+def test_retries_on_server_errors(monkeypatch, tmp_path):
+    """Test that 503/429 answers and connection errors are retried"""
+    calls = install_fake_http(monkeypatch, FakeResponse({}, 503), FakeResponse({}, 429),
+                              client.requests.ConnectionError("reset"), INCEPTION)
+    make_cache(tmp_path)
+    client.metrics.reset()
+    assert client.fetch_movie_data("Inception") == ("2010", "8.8", "N/A", "Inception")
+    assert len(calls) == 4
+    assert calls[0]["apikey"] == client.api_key()
+    stats = client.latency_stats()
+    assert stats["requests"] == 4 and stats["retries"] == 3 and stats["errors"] == 3
+    client.set_cache(None)
+
+
+def test_gives_up_after_max_retries(monkeypatch, tmp_path):
+    """Test that persistent failures end in None instead of an exception"""
+    calls = install_fake_http(monkeypatch, FakeResponse({}, 500))
+    make_cache(tmp_path)
+    assert client.fetch_movie_data("Inception") is None
+    assert len(calls) == client.OMDB_MAX_RETRIES + 1
+    client.set_cache(None)
+
+
+def test_token_bucket_limits_rate():
+    """Test that the token bucket spaces requests once the burst is used up"""
+    bucket = client.TokenBucket(50, capacity=1)
+    started = client.time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert client.time.monotonic() - started >= 5 / 50 * 0.9
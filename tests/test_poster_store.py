@@ -0,0 +1,185 @@
+"""
+This module contains tests for the local poster mirror, using a local HTTP
+server that stands in for the poster host.
+"""
+import os
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import storage.movie_storage_sql as storage
+import website_generator as generator
+import poster_store
+from poster_store import PosterStore, image_size, pillow, read_limited
+
+
+def png_bytes(width, height):
+    """Build a minimal valid PNG image of the given size"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    raw = b"".join(b"\x00" + b"\x00\x00\x00" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+IMAGES = {"/a.png": png_bytes(300, 450), "/b.png": png_bytes(300, 450), "/c.png": png_bytes(200, 100),
+          "/zero.png": png_bytes(0, 10), "/big.png": png_bytes(10, 10) + bytes(4096)}
+
+
+class PosterHandler(BaseHTTPRequestHandler):
+    """Serves IMAGES with an ETag and answers If-None-Match with 304"""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.path not in IMAGES:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = IMAGES[self.path]
+        etag = f'"{zlib.crc32(body)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def poster_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PosterHandler)
+    server.daemon_threads = True
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PosterStore(root=str(tmp_path / "posters"), workers=4, display_width=100, revalidate_after=0)
+
+
+def test_image_size_reads_png_header():
+    """Test that the pixel size is read from the image header"""
+    assert image_size(png_bytes(300, 450)) == (300, 450)
+    assert image_size(b"not an image") is None
+
+
+def test_sync_deduplicates_and_revalidates(store, poster_server):
+    """Test content-addressed storage, conditional requests and failures"""
+    server, base = poster_server
+    urls = [f"{base}/a.png", f"{base}/b.png", f"{base}/c.png", f"{base}/gone.png", f"{base}/a.png", "N/A"]
+
+    counts = store.sync(urls)
+    assert counts == {"downloaded": 2, "deduplicated": 1, "not_modified": 0, "fresh": 0, "failed": 1}
+    assert len(server.requests) == 4
+
+    local = store.lookup(urls, relative_to=store.root)
+    assert local[f"{base}/a.png"] == local[f"{base}/b.png"]
+    assert local[f"{base}/c.png"]["width"] == 100 and local[f"{base}/c.png"]["height"] == 50
+    assert f"{base}/gone.png" not in local
+
+    counts = store.sync(urls)
+    assert counts["not_modified"] == 3 and counts["failed"] == 1
+
+    store.revalidate_after = 3600
+    counts = store.sync(urls)
+    assert counts["fresh"] == 4 and len(server.requests) == 8
+
+
+def test_concurrent_stores_of_one_image(store):
+    """Test that threads storing the same image store it once and all succeed"""
+    data = png_bytes(30, 45)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: store.store_image(data, "image/png"), range(32)))
+    assert len({result[:3] for result in results}) == 1
+    assert sum(result[3] for result in results) == 1
+    files = [name for _, _, names in os.walk(store.root) for name in names if name != "index.db"]
+    assert os.path.basename(results[0][0]) in files and len(files) == (2 if pillow() else 1)
+
+
+def test_empty_and_oversized_posters_fail_alone(store, poster_server, monkeypatch):
+    """Test that a zero-width image or a too large download fails without stopping the sync"""
+    _, base = poster_server
+    monkeypatch.setattr(poster_store, "POSTER_MAX_BYTES", 2048)
+    with pytest.raises(ValueError):
+        store.store_image(png_bytes(0, 10), "image/png")
+
+    counts = store.sync([f"{base}/zero.png", f"{base}/big.png", f"{base}/c.png"])
+    assert counts["failed"] == 2 and counts["downloaded"] == 1
+
+
+def test_streamed_reads_stop_at_the_limit():
+    """Test that a body without Content-Length is abandoned once it passes the limit"""
+    class Response:
+        headers = {}
+
+        def __init__(self, chunks):
+            self.chunks = chunks
+
+        def iter_content(self, chunk_size):
+            return self.chunks
+
+    endless = (bytes(100) for _ in iter(int, 1))
+    with pytest.raises(ValueError):
+        read_limited(Response(endless), 250)
+    assert read_limited(Response([b"ab", b"cd"]), 10) == b"abcd"
+
+
+def test_thumbnails_with_pillow(store):
+    """Test that a JPEG thumbnail at the display width is stored and used"""
+    pytest.importorskip("PIL")
+    path, width, height, stored = store.store_image(png_bytes(300, 450), "image/png")
+    assert path.endswith("-100w.jpg") and (width, height) == (100, 150) and stored
+    assert os.path.exists(os.path.join(store.root, path))
+
+
+def test_sync_covers_only_changed_movies(temp_storage, store, poster_server):
+    """Test that after the first sync only posters of changed movies are requested"""
+    server, base = poster_server
+    storage.add_movies([{"title": "A", "year": 2001, "rating": 5.0, "poster_image_url": f"{base}/a.png"},
+                        {"title": "C", "year": 2002, "rating": 5.0, "poster_image_url": f"{base}/c.png"}])
+    store.revalidate_after = 3600
+    assert generator.sync_posters(store)["downloaded"] == 2
+    assert generator.sync_posters(store) == {"downloaded": 0, "deduplicated": 0, "not_modified": 0,
+                                             "fresh": 0, "failed": 0}
+
+    storage.add_movies([{"title": "B", "year": 2003, "rating": 5.0, "poster_image_url": f"{base}/b.png"}])
+    storage.update_movie("A", 9.0)
+    counts = generator.sync_posters(store)
+    assert counts["deduplicated"] == 1 and counts["fresh"] == 1
+    assert sorted(server.requests) == ["/a.png", "/b.png", "/c.png"]
+
+    # Posters due for revalidation are checked even when their movie did not change
+    store.revalidate_after = 0
+    assert generator.sync_posters(store)["not_modified"] == 3
+
+
+def test_site_references_local_posters(store, poster_server, tmp_path):
+    """Test that mirrored posters are rendered with size and lazy loading"""
+    _, base = poster_server
+    movies = {"Known": {"year": 2001, "poster_image_url": f"{base}/a.png"},
+              "Unknown": {"year": 2002, "poster_image_url": "N/A"}}
+    store.sync(data["poster_image_url"] for data in movies.values())
+
+    output = tmp_path / "site" / "index.html"
+    output.parent.mkdir()
+    generator.generate_site(movies, output_path=str(output), movies_per_page=0, title="TITLE", posters=store)
+    html = output.read_text(encoding="utf-8")
+
+    src = store.lookup([f"{base}/a.png"], str(output.parent))[f"{base}/a.png"]["src"]
+    assert src.startswith("../posters/")
+    assert f"src='{src}' width='100' height='150' loading='lazy'" in html
+    assert "src='N/A'" in html
@@ -0,0 +1,70 @@
+"""
+This module contains tests for random picks sampled in SQLite.
+"""
+import random
+from collections import Counter
+
+import storage.movie_storage_sql as storage
+
+
+def fill(count, rating=lambda index: 5.0):
+    """Store movies "Movie 0" ... with the given ratings"""
+    storage.add_movies({"title": f"Movie {index}", "year": 1950 + index, "rating": rating(index),
+                        "poster_image_url": "N/A"} for index in range(count))
+
+
+def test_empty_database_and_no_match(temp_storage):
+    """Test that nothing is picked when nothing matches"""
+    assert storage.random_movie() is None
+    fill(5)
+    assert storage.random_movie(min_rating=9) is None
+
+
+def test_picks_are_uniform_and_respect_filters(temp_storage):
+    """Test a roughly uniform distribution and the rating/year filters"""
+    fill(10, rating=lambda index: index)
+    rng = random.Random(7)
+    picks = Counter(storage.random_movie(rng=rng)["title"] for _ in range(2000))
+    assert len(picks) == 10 and min(picks.values()) > 120
+
+    for _ in range(50):
+        movie = storage.random_movie(min_rating=3, max_rating=6, year_to=1955, rng=rng)
+        assert 3 <= movie["rating"] <= 5 and movie["year"] <= 1955
+
+
+def test_weighted_picks_follow_ratings(temp_storage):
+    """Test that weighted picks are proportional to the rating"""
+    storage.add_movies([{"title": "Good", "year": 2000, "rating": 9.0, "poster_image_url": "N/A"},
+                        {"title": "Bad", "year": 2000, "rating": 1.0, "poster_image_url": "N/A"}])
+    rng = random.Random(3)
+    picks = Counter(storage.random_movie(weighted=True, rng=rng)["title"] for _ in range(2000))
+    assert 0.85 < picks["Good"] / 2000 < 0.95
+
+
+def test_sparse_ids_fall_back_to_the_next_row(temp_storage):
+    """Test that a catalog with large id gaps still yields every movie"""
+    fill(200)
+    storage.delete_movies([f"Movie {index}" for index in range(200) if index % 50])
+    rng = random.Random(1)
+    picks = {storage.random_movie(rng=rng, max_attempts=1)["title"] for _ in range(200)}
+    assert picks == {"Movie 0", "Movie 50", "Movie 100", "Movie 150"}
+
+
+def test_fallback_picks_are_uniform(temp_storage):
+    """Test that picks stay uniform when every random id misses"""
+    fill(10, rating=lambda index: index)
+    rng = random.Random(5)
+    picks = Counter(storage.random_movie(rng=rng, max_attempts=0)["title"] for _ in range(2000))
+    assert len(picks) == 10 and min(picks.values()) > 120
+
+    picks = Counter(storage.random_movie(min_rating=6, rng=rng, max_attempts=0)["title"] for _ in range(800))
+    assert set(picks) == {f"Movie {index}" for index in range(6, 10)} and min(picks.values()) > 140
+    assert storage.random_movie(min_rating=20, max_attempts=0) is None
+
+
+def test_weighted_pick_among_zero_ratings(temp_storage):
+    """Test that weighted picks terminate when every matching movie is rated 0"""
+    fill(6, rating=lambda index: 0.0 if index < 3 else 8.0)
+    rng = random.Random(2)
+    picks = {storage.random_movie(max_rating=0, weighted=True, rng=rng)["title"] for _ in range(100)}
+    assert picks == {"Movie 0", "Movie 1", "Movie 2"}
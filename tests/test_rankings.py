@@ -0,0 +1,51 @@
+"""
+This module contains tests for the indexed rating leaderboard.
+"""
+import pytest
+
+import main
+import storage.movie_storage_sql as storage
+import website_generator as generator
+
+def ranks(movies):
+    return [(movie["rank"], movie["title"]) for movie in movies]
+
+
+def test_ties_share_stable_ranks(catalog):
+    """Test competition ranking, also for pages starting inside a tie"""
+    assert ranks(storage.top_movies(5)) == [(1, "Alien"), (2, "Heat"), (2, "Jaws"), (2, "Up"), (5, "Avatar")]
+    assert ranks(storage.top_movies(3, offset=3)) == [(2, "Up"), (5, "Avatar"), (5, "Brazil")]
+    assert storage.top_movies(3, offset=10) == []
+
+
+def test_year_and_decade_filters(catalog):
+    """Test leaderboards of a year range and of a decade"""
+    assert ranks(storage.top_movies(decade=2000)) == [(1, "Up"), (2, "Avatar"), (3, "Cars")]
+    assert ranks(storage.top_movies(year_from=1980, year_to=1999)) == [(1, "Heat"), (2, "Brazil")]
+    with pytest.raises(ValueError):
+        storage.top_movies(decade=1995)
+    with pytest.raises(main.ScriptError):
+        main.script_top(decade=1995)
+
+
+def test_leaderboard_reads_the_rating_index(catalog):
+    """Test that the ranking query walks the index instead of sorting"""
+    with catalog.connect() as connection:
+        plan = " ".join(row[-1] for row in connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT title FROM movies INDEXED BY idx_movies_rating_title "
+            "WHERE 1 AND year >= 1990 ORDER BY rating DESC, title LIMIT 100"))
+    assert "idx_movies_rating_title" in plan and "TEMP B-TREE" not in plan
+
+
+def test_menu_and_top_page(catalog, monkeypatch, capsys, tmp_path):
+    """Test the ranking command with a decade and the generated top page"""
+    monkeypatch.setattr("builtins.input", lambda prompt: "1970")
+    main.command_movies_sorted_by_rating()
+    assert "TOP 2 OF THE 1970s\n\n1.  8.5 - Alien\n2.  8.3 - Jaws" in capsys.readouterr().out
+
+    output = tmp_path / "top.html"
+    assert generator.generate_top_page(output_path=str(output), limit=3, title="TITLE") == [str(output)]
+    html = output.read_text(encoding="utf-8")
+    assert "TITLE - TOP 3" in html and html.index("Alien") < html.index("Heat") < html.index("Jaws")
+    assert "#2" in html and "Up" not in html
+    assert generator.generate_top_page(output_path=str(output), limit=3, title="TITLE") == []
@@ -0,0 +1,138 @@
+"""
+This module contains tests for the non-interactive scripting mode of main.py.
+"""
+import io
+import json
+
+import pytest
+import requests
+
+import data.ombd_client as client
+import main
+import storage.movie_storage_sql as storage
+from benchmarks.fake_omdb_server import fake_payload
+
+
+@pytest.fixture
+def scripting(temp_storage, monkeypatch):
+    """Run scripted commands against the temporary database and a fake OMDb"""
+    monkeypatch.setattr(main, "_storage", storage)
+    monkeypatch.setattr(client, "fetch_movie_payload", lambda title: fake_payload(title))
+    storage.add_movies({"title": title, "year": 2000, "rating": rating, "poster_image_url": "N/A"}
+                       for title, rating in (("Alien", 8.5), ("Heat", 8.3), ("Up", 8.2)))
+
+
+def run_batch(lines):
+    """Run batch lines and return (failures, decoded responses)"""
+    output = io.StringIO()
+    failures = main.run_batch([json.dumps(line) if isinstance(line, dict) else line for line in lines], output)
+    return failures, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_batch_runs_commands_in_one_process(scripting):
+    """Test a mixed batch with per-line results and errors"""
+    failures, responses = run_batch([
+        {"id": 1, "command": "add", "title": "Inception"},
+        {"id": 2, "command": "update", "title": "alien", "rating": 9.1},
+        {"id": 3, "command": "delete", "titles": ["Heat", "Nope"]},
+        {"id": 4, "command": "sorted", "limit": 2},
+        {"id": 5, "command": "add", "title": "Missing Movie"},
+        {"id": 6, "command": "fly"},
+        "",
+        "not json",
+        {"command": "stats"},
+    ])
+    assert failures == 3
+    assert [response.get("id") for response in responses] == [1, 2, 3, 4, 5, 6, None, None]
+    assert responses[0]["result"]["outcome"] == "inserted"
+    assert responses[1]["result"] == {"title": "alien", "rating": 9.1, "outcome": "updated"}
+    assert [item["outcome"] for item in responses[2]["result"]] == ["deleted", "not found"]
+    best = [title for title, _ in storage.iter_movies(order_by="rating", descending=True)][:2]
+    assert [movie["title"] for movie in responses[3]["result"]] == best
+    assert not responses[4]["ok"] and "not found" in responses[4]["error"]
+    assert not responses[5]["ok"] and not responses[6]["ok"]
+    assert responses[7]["result"]["count"] == 3
+
+
+def test_subcommands_print_json(scripting, capsys):
+    """Test single subcommands, streamed listings and error exits"""
+    assert main.main(["list", "--order", "title", "--limit", "2"]) == 0
+    movies = json.loads(capsys.readouterr().out)
+    assert [movie["title"] for movie in movies] == ["Alien", "Heat"]
+
+    assert main.main(["search", "hea"]) == 0
+    assert json.loads(capsys.readouterr().out)[0]["title"] == "Heat"
+
+    assert main.main(["random"]) == 0
+    assert json.loads(capsys.readouterr().out)["title"] in {"Alien", "Heat", "Up"}
+
+    assert main.main(["update", "Up", "11"]) == 1
+    assert "between 0 and 10" in capsys.readouterr().err
+
+    assert main.main(["list", "--limit", "-1"]) == 1
+    assert "limit must be >= 0" in capsys.readouterr().err
+
+
+def test_runtime_errors_are_reported_and_bugs_surface(scripting, monkeypatch, capsys):
+    """Test that OMDb failures exit with a JSON error and a TypeError in a handler is not hidden"""
+    def unreachable(title):
+        raise requests.ConnectionError("no route to host")
+
+    monkeypatch.setattr(client, "fetch_movie_payload", unreachable)
+    assert main.main(["add", "Inception"]) == 1
+    assert "OMDb request failed" in json.loads(capsys.readouterr().err)["error"]
+
+    with pytest.raises(main.ScriptError, match="bad arguments"):
+        main.run_script_command("update", {"title": "Up"})
+
+    def broken(title, rating):
+        return len(rating)
+
+    monkeypatch.setitem(main.SCRIPT_COMMANDS, "update", broken)
+    with pytest.raises(TypeError):
+        main.run_script_command("update", {"title": "Up", "rating": 5})
+
+
+def test_interactive_add_normalizes_the_omdb_answer(scripting, monkeypatch, capsys):
+    """Test that the add command stores the first year of a range and a numeric rating"""
+    answers = {"Lost": {"Response": "True", "Title": "Lost", "Year": "2004–2010", "imdbRating": "8.3",
+                        "Poster": "N/A"},
+               "Pending": {"Response": "True", "Title": "Pending", "Year": "2025", "imdbRating": "N/A",
+                           "Poster": "N/A"}}
+    monkeypatch.setattr(client, "fetch_movie_payload", answers.get)
+    for title in answers:
+        monkeypatch.setattr("builtins.input", lambda prompt, title=title: title)
+        main.command_add_movie()
+    assert storage.get_movie("Lost") == {"title": "Lost", "year": 2004, "rating": 8.3, "poster_image_url": "N/A"}
+    assert storage.get_movie("Pending") is None
+    assert "invalid rating 'N/A'" in capsys.readouterr().out
+
+
+def test_batch_arguments_are_type_checked(scripting):
+    """Test readable errors for mistyped JSONL arguments, and numeric strings accepted"""
+    storage.add_movie("I", 2000, 5.0, "N/A")
+    failures, responses = run_batch([
+        {"command": "delete", "titles": "Inception"},
+        {"command": "update", "title": "Up", "rating": "x"},
+        {"command": "list", "limit": "2"},
+        {"command": "list", "min_rating": "x"},
+        {"command": "random", "weighted": "yes"},
+        {"command": "update", "title": "Up", "rating": "9"},
+        {"command": "add", "title": 7},
+    ])
+    assert failures == 5
+    errors = [response.get("error") for response in responses]
+    assert errors[0] == "titles must be a list of strings" and storage.get_movie("I") is not None
+    assert errors[1] == "rating must be a number" and errors[3] == "min_rating must be a number"
+    assert len(responses[2]["result"]) == 2 and errors[4] == "weighted must be true or false"
+    assert responses[5]["result"]["rating"] == 9.0 and errors[6] == "title must be a string"
+
+
+def test_non_json_omdb_answer_is_a_script_error(scripting, monkeypatch):
+    """Test that an OMDb body that is not JSON is reported, not raised"""
+    def garbled(title):
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+    monkeypatch.setattr(client, "fetch_movie_payload", garbled)
+    with pytest.raises(main.ScriptError, match="OMDb request failed"):
+        main.script_add("Inception")
@@ -0,0 +1,51 @@
+"""
+This module contains tests for the FTS5-backed title search.
+"""
+from sqlalchemy import create_engine
+
+import storage.movie_storage_sql as storage
+
+
+def add(title, rating=7.0):
+    """Insert one movie into the temporary database"""
+    storage.add_movies([{"title": title, "year": 2000, "rating": rating, "poster_image_url": "N/A"}])
+
+
+def test_prefix_and_token_queries(temp_storage):
+    """Test that words and word beginnings match, case-insensitively"""
+    for title in ("Star Wars", "Star Trek", "The Lord of the Rings", "Amélie"):
+        add(title)
+    assert set(storage.search_movies("star")) == {"Star Wars", "Star Trek"}
+    assert list(storage.search_movies("star wa")) == ["Star Wars"]
+    assert list(storage.search_movies("LORD rings")) == ["The Lord of the Rings"]
+    assert list(storage.search_movies("amelie")) == ["Amélie"]
+    assert storage.search_movies("!!!") == {}
+
+
+def test_index_follows_updates_and_deletes(temp_storage):
+    """Test that triggers keep the index in sync and limit is honoured"""
+    for index in range(5):
+        add(f"Alien {index}")
+    storage.delete_movie("Alien 0")
+    assert "Alien 0" not in storage.search_movies("alien")
+    assert len(storage.search_movies("alien", limit=2)) == 2
+    with temp_storage.connect() as connection:
+        connection.execute(storage.text("UPDATE movies SET title = 'Aliens' WHERE title = 'Alien 1'"))
+        connection.commit()
+    assert list(storage.search_movies("aliens")) == ["Aliens"]
+
+
+def test_existing_table_is_indexed(tmp_path):
+    """Test that an index added to a pre-existing database is backfilled"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.connect() as connection:
+        connection.execute(storage.text(
+            "CREATE TABLE movies (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT UNIQUE NOT NULL, "
+            "year INTEGER NOT NULL, rating REAL NOT NULL, poster_image_url STRING NOT NULL)"))
+        connection.execute(storage.text("INSERT INTO movies (title, year, rating, poster_image_url) "
+                                        "VALUES ('Heat', 1995, 8.3, 'N/A')"))
+        connection.commit()
+    storage.init_db(engine)
+    with engine.connect() as connection:
+        assert connection.execute(storage.text(
+            "SELECT rowid FROM movies_fts WHERE movies_fts MATCH 'heat'")).fetchall() == [(1,)]
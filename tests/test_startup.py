@@ -0,0 +1,30 @@
+"""
+This module contains startup regression tests: the menu must come up
+without importing the storage layer, the OMDb client or the generator.
+"""
+import subprocess
+import sys
+
+from benchmarks.startup_report import import_times, module_subtree, PROJECT_ROOT
+
+# Cumulative time allowed for `import main` (it used to take ~400 ms)
+STARTUP_BUDGET_MS = 100
+
+HEAVY_MODULES = ["dotenv", "sqlalchemy", "requests", "storage.movie_storage_sql", "data.ombd_client", "website_generator"]
+
+
+def test_import_main_stays_within_budget():
+    """Test the import cost of the entry point against the budget"""
+    subtree = module_subtree(import_times("main"), "main")
+    imported = {entry["module"] for entry in subtree}
+    assert not imported & set(HEAVY_MODULES)
+    assert subtree[-1]["cumulative_us"] / 1000 < STARTUP_BUDGET_MS
+
+
+def test_exit_does_not_load_subsystems():
+    """Test that choosing Exit never initializes storage, client or generator"""
+    script = ("import sys, builtins; builtins.input = lambda *args: '0'; import main; main.main(); "
+              f"print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    completed = subprocess.run([sys.executable, "-c", script], cwd=PROJECT_ROOT,
+                               capture_output=True, text=True, check=True)
+    assert completed.stdout.strip().splitlines()[-1] == "[]"
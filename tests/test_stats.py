@@ -0,0 +1,62 @@
+"""
+This module contains tests for the SQL-side statistics engine and the
+trigger-maintained aggregates row.
+"""
+import random
+import statistics
+
+import pytest
+
+import storage.movie_storage_sql as storage
+
+
+def add_random_movies(count, seed=1):
+    """Insert movies with random (often tied) ratings and return them"""
+    generator = random.Random(seed)
+    movies = {f"Movie {index}": generator.randint(10, 90) / 10 for index in range(count)}
+    storage.add_movies({"title": title, "year": 2000, "rating": rating, "poster_image_url": "N/A"}
+                       for title, rating in movies.items())
+    return movies
+
+
+def expected_stats(movies):
+    """Compute the statistics the way the old Python loops did"""
+    ratings = list(movies.values())
+    return {"count": len(ratings), "average": statistics.mean(ratings), "median": statistics.median(ratings),
+            "best": sorted(t for t, r in movies.items() if r == max(ratings)),
+            "worst": sorted(t for t, r in movies.items() if r == min(ratings))}
+
+
+@pytest.mark.parametrize("count", [1, 2, 7, 50])
+@pytest.mark.parametrize("use_aggregates", [True, False])
+def test_stats_match_python_reference(temp_storage, count, use_aggregates):
+    """Test that SQL statistics equal the pure-Python results"""
+    movies = add_random_movies(count)
+    stats = storage.movie_stats(use_aggregates=use_aggregates)
+    expected = expected_stats(movies)
+    assert stats["count"] == expected["count"]
+    assert stats["average"] == pytest.approx(expected["average"])
+    assert stats["median"] == pytest.approx(expected["median"])
+    assert stats["best"] == expected["best"] and stats["worst"] == expected["worst"]
+
+
+def test_aggregates_follow_writes(temp_storage):
+    """Test that the triggers keep count and sum current on insert, update and delete"""
+    assert storage.movie_stats() == {"count": 0}
+    movies = add_random_movies(10)
+    storage.update_movie("Movie 3", 10.0)
+    storage.delete_movie("Movie 5")
+    movies["Movie 3"] = 10.0
+    del movies["Movie 5"]
+    stats = storage.movie_stats()
+    assert stats["count"] == 9
+    assert stats["sum"] == pytest.approx(sum(movies.values()))
+    assert stats["best"] == ["Movie 3"]
+
+
+def test_min_and_max_seek_the_rating_index(temp_storage):
+    """Test that each rating extreme is an index seek rather than a scan"""
+    with temp_storage.connect() as connection:
+        for sql in ("SELECT MIN(rating) FROM movies", "SELECT MAX(rating) FROM movies"):
+            plan = " ".join(row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + sql))
+            assert "SEARCH" in plan and "idx_movies_rating_title" in plan
@@ -0,0 +1,49 @@
+"""
+This module contains tests for case-insensitive, indexed title lookups
+used by add, delete, update and get.
+"""
+from sqlalchemy import create_engine, text
+
+import storage.movie_storage_sql as storage
+
+
+def query_plan(engine, sql, params):
+    """Return the EXPLAIN QUERY PLAN details for a statement"""
+    with engine.connect() as connection:
+        return " ".join(row[-1] for row in connection.execute(text("EXPLAIN QUERY PLAN " + sql), params))
+
+
+def test_add_delete_update_agree_on_case(temp_storage):
+    """Test that every title-keyed operation ignores case"""
+    storage.add_movie("Inception", 2010, 8.8, "N/A")
+    storage.add_movie("INCEPTION", 2010, 1.0, "N/A")
+    assert storage.list_titles() == ["Inception"]
+
+    storage.update_movie("inception", 9.0)
+    assert storage.get_movie("iNcEpTiOn")["rating"] == 9.0
+
+    storage.delete_movie("INCEPTION")
+    assert storage.get_movie("Inception") is None
+
+
+def test_lookups_use_the_nocase_index(temp_storage):
+    """Test that update and delete are served by the title index, not a scan"""
+    for sql in ("UPDATE movies SET rating = 1 WHERE title = :title COLLATE NOCASE",
+                "DELETE FROM movies WHERE title = :title COLLATE NOCASE"):
+        plan = query_plan(temp_storage, sql, {"title": "x"})
+        assert "idx_movies_title_nocase" in plan
+
+
+def test_migration_of_database_with_case_duplicates(tmp_path):
+    """Test that an old database with case-duplicates still gets an index"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.connect() as connection:
+        connection.execute(text(
+            "CREATE TABLE movies (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT UNIQUE NOT NULL, "
+            "year INTEGER NOT NULL, rating REAL NOT NULL, poster_image_url STRING NOT NULL)"))
+        connection.execute(text("INSERT INTO movies (title, year, rating, poster_image_url) "
+                                "VALUES ('Heat', 1995, 8.3, 'N/A'), ('HEAT', 1995, 8.3, 'N/A')"))
+        connection.commit()
+    storage.init_db(engine)
+    assert "idx_movies_title_nocase" in query_plan(
+        engine, "SELECT * FROM movies WHERE title = :title COLLATE NOCASE", {"title": "heat"})
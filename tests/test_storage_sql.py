@@ -1,36 +1,33 @@
 """
 This module contains tests for the SQL storage functions for movies.
 It exercises the add_movie, list_movies, update_movie, and delete_movie
-functions to ensure proper CRUD operations on the movie database.
+functions to ensure proper CRUD operations on a temporary movie database.
 """
 from storage.movie_storage_sql import add_movie, list_movies, delete_movie, update_movie
 
 
-def test_add_movie():
+def test_add_movie(temp_storage):
     """Test adding a movie"""
     add_movie("Inception", 2010, 8.8, "N/A")
+    assert "Inception" in list_movies()
 
 
-def test_list_movie():
+def test_list_movie(temp_storage):
     """Test listing movies"""
-    movies = list_movies()
-    print(movies)
+    add_movie("Inception", 2010, 8.8, "N/A")
+    movie = list_movies()["Inception"]
+    assert (movie["year"], movie["rating"], movie["poster_image_url"]) == (2010, 8.8, "N/A")
 
 
-def test_update_movie():
+def test_update_movie(temp_storage):
     """Test updating a movie's rating"""
+    add_movie("Inception", 2010, 8.8, "N/A")
     update_movie("Inception", 9.0)
-    print(list_movies())
+    assert list_movies()["Inception"]["rating"] == 9.0
 
 
-def test_delete_movie():
+def test_delete_movie(temp_storage):
     """Test deleting a movie"""
+    add_movie("Inception", 2010, 8.8, "N/A")
     delete_movie("Inception")
-    print(list_movies())  # Should be empty if it was the only movie
-
-
-# Run the tests in order
-test_add_movie()
-test_list_movie()
-test_update_movie()
-test_delete_movie()
\ No newline at end of file
+    assert "Inception" not in list_movies()
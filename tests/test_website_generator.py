@@ -0,0 +1,124 @@
+"""
+This module contains tests for the streaming website generator.
+"""
+import storage.movie_storage_sql as storage
+import website_generator as generator
+from sqlalchemy import text
+
+from config.settings import TEMPLATE_PATH, PH_TITLE, PH_MOVIE_GRID, PH_PAGINATION
+
+MOVIES = {f"Movie {index}": {"year": 2000 + index, "rating": 5.0, "poster_image_url": f"p{index}.jpg"}
+          for index in range(7)}
+
+
+def reference_page(movies):
+    """Render the page the way the old in-memory generator did"""
+    html = generator.load_html_template(TEMPLATE_PATH)
+    html = html.replace(PH_TITLE, "TITLE").replace(PH_PAGINATION, "")
+    grid = "".join(generator.serialize_one_movie(title, data) for title, data in movies.items())
+    return html.replace(PH_MOVIE_GRID, grid)
+
+
+def test_single_page_matches_in_memory_rendering(tmp_path):
+    """Test that the streamed page equals the old in-memory rendering"""
+    output = tmp_path / "index.html"
+    pages = generator.generate_site(MOVIES, output_path=str(output), movies_per_page=0, title="TITLE")
+    assert pages == [str(output)]
+    assert output.read_text(encoding="utf-8") == reference_page(MOVIES)
+
+
+def test_write_streamed_in_chunks(tmp_path):
+    """Test that fragments are written completely whatever the chunk size"""
+    output = tmp_path / "out.html"
+    count, content_hash, replaced = generator.write_streamed(str(output), "<ol>", iter(["a", "b", "c"]),
+                                                             "</ol>", chunk_size=2)
+    assert count == 3 and replaced
+    assert output.read_text(encoding="utf-8") == "<ol>abc</ol>"
+    assert not list(tmp_path.glob("*.tmp"))
+
+    _, _, replaced = generator.write_streamed(str(output), "<ol>", ["a", "b", "c"], "</ol>",
+                                              previous_hash=content_hash)
+    assert not replaced
+
+
+def test_pagination_splits_grid_and_removes_stale_pages(tmp_path):
+    """Test page files, navigation links and cleanup of leftover pages"""
+    output = tmp_path / "index.html"
+    (tmp_path / "page-9.html").write_text("old", encoding="utf-8")
+    pages = generator.generate_site(MOVIES, output_path=str(output), movies_per_page=3, title="TITLE")
+    assert [p.rsplit("/", 1)[-1] for p in pages] == ["index.html", "page-2.html", "page-3.html"]
+    assert not (tmp_path / "page-9.html").exists()
+
+    first = output.read_text(encoding="utf-8")
+    last = (tmp_path / "page-3.html").read_text(encoding="utf-8")
+    assert first.count("<li>") == 3 and last.count("<li>") == 1
+    assert "href='page-2.html'" in first and "Previous" not in first
+    assert "href='page-2.html'" in last and "Next" not in last
+
+
+def test_site_streams_from_storage(temp_storage, tmp_path):
+    """Test that by default the movies stored in the database are rendered"""
+    storage.add_movies({"title": title, **data} for title, data in MOVIES.items())
+    output = tmp_path / "index.html"
+    generator.generate_site(output_path=str(output), movies_per_page=0, title="TITLE")
+    assert output.read_text(encoding="utf-8") == reference_page(MOVIES)
+
+
+def test_incremental_regeneration_touches_only_changed_pages(temp_storage, tmp_path):
+    """Test that edits re-render only affected pages and unchanged files keep their mtime"""
+    storage.add_movies({"title": title, **data} for title, data in MOVIES.items())
+    output = str(tmp_path / "index.html")
+
+    def generate():
+        return sorted(p.rsplit("/", 1)[-1] for p in generator.generate_site(output_path=output, movies_per_page=3))
+
+    assert generate() == ["index.html", "page-2.html", "page-3.html"]
+    mtime = (tmp_path / "index.html").stat().st_mtime_ns
+    assert generate() == []
+
+    # Updating a movie shown on page 2 rewrites only that page
+    with temp_storage.connect() as connection:
+        connection.execute(text("UPDATE movies SET poster_image_url = 'new.jpg' WHERE title = 'Movie 4'"))
+        connection.commit()
+    assert generate() == ["page-2.html"]
+    # A rating change is not shown on the site, so no file changes
+    storage.update_movie("Movie 0", 9.9)
+    assert generate() == []
+
+    # Appending fills the last page; deleting from page 1 shifts everything after it
+    storage.add_movies([{"title": "Movie 7", "year": 2020, "rating": 5.0, "poster_image_url": "p7.jpg"}])
+    assert generate() == ["page-3.html"]
+    storage.delete_movie("Movie 1")
+    assert generate() == ["index.html", "page-2.html", "page-3.html"]
+    assert (tmp_path / "page-3.html").read_text(encoding="utf-8").count("<li>") == 1
+    assert (tmp_path / "index.html").stat().st_mtime_ns != mtime
+
+    # Deleting the only movie of the last page removes it and its link
+    storage.delete_movie("Movie 7")
+    assert generate() == ["page-2.html"]
+    assert not (tmp_path / "page-3.html").exists()
+    assert "Next" not in (tmp_path / "page-2.html").read_text(encoding="utf-8")
+
+
+def test_incremental_regeneration_after_empty_catalog(temp_storage, tmp_path):
+    """Test that a site built from an empty catalog picks up movies added later"""
+    output = str(tmp_path / "index.html")
+    generator.generate_site(output_path=output, movies_per_page=3)
+    storage.add_movies({"title": title, **data} for title, data in MOVIES.items())
+    assert len(generator.generate_site(output_path=output, movies_per_page=3)) == 3
+    assert (tmp_path / "page-3.html").read_text(encoding="utf-8").count("<li>") == 1
+
+
+def test_write_committed_during_a_build_is_not_missed(temp_storage, tmp_path):
+    """Test that a change made before a build but committed after it shows up in the next build"""
+    storage.add_movies({"title": title, **data} for title, data in MOVIES.items())
+    output = str(tmp_path / "index.html")
+    generator.generate_site(output_path=output, movies_per_page=3)
+
+    with storage.unit_of_work() as connection:
+        storage.update_ratings([("Movie 0", 1.0)], connection=connection)
+        connection.execute(text("UPDATE movies SET poster_image_url = 'late.jpg' WHERE title = 'Movie 4'"))
+        # The build reads the database while this transaction is still open
+        assert generator.generate_site(output_path=output, movies_per_page=3) == []
+    assert generator.generate_site(output_path=output, movies_per_page=3) == [str(tmp_path / "page-2.html")]
+    assert "late.jpg" in (tmp_path / "page-2.html").read_text(encoding="utf-8")
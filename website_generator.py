@@ -4,10 +4,42 @@ Generate a static HTML page for the Movie app.
 This module reads movie data, renders per-movie HTML snippets, replaces
 placeholders in the template, and writes the final page to
 `static/index.html`.
+
+Movies are streamed from storage and their `<li>` fragments are written
+to the output file in chunks between the template head and tail, so the
+page is never held in memory. The grid is split into `index.html`,
+`page-2.html`, ... with MOVIES_PER_PAGE movies per page; 0 writes the whole
+catalog to one page, which every edit then re-renders in full.
+
+Regeneration is incremental: `.site_manifest.json` next to the output
+keeps a content hash and id range per page, and only pages touched by
+rows changed since the last run are re-rendered. A fragment is cheaper to
+re-render from its row than to look up, so pages (not single fragments)
+are the cached unit.
+
+A "Top N" leaderboard (`static/top.html`) is rendered from the rating
+index, so it reads only the N best rated movies.
+
+Before rendering, a poster sync stage mirrors the poster images into a
+local content-addressed store (see `poster_store`), and the pages then
+reference the local copies with width/height and lazy loading. Like the
+pages, the sync only looks at movies changed since the last one.
 """
 
-from storage.movie_storage_sql import list_movies
-from config.settings import HOMEPAGE_TITLE, TEMPLATE_PATH, OUTPUT_PATH, PH_TITLE, PH_MOVIE_GRID
+import bisect
+import glob
+import hashlib
+import json
+import os
+import re
+from itertools import chain, islice
+
+from instrumentation import timed, enable_from_settings
+from storage.movie_storage_sql import (iter_movies, change_counter, movie_changes_since, poster_urls, init_db,
+                                       top_movies)
+from config.settings import (HOMEPAGE_TITLE, TEMPLATE_PATH, OUTPUT_PATH, PH_TITLE, PH_MOVIE_GRID,
+                             PH_PAGINATION, MOVIES_PER_PAGE, WRITE_CHUNK_SIZE, POSTER_MIRROR,
+                             TOP_N, TOP_OUTPUT_PATH)
 
 
 def replace_template_placeholder(template, placeholder, replaced_text):
@@ -31,34 +63,78 @@ def load_html_template(file_name):
         return fileobj.read()
 
 
-def serialize_one_movie(title, data):
+def split_template(template, title):
+    """
+    Fill in the page title and split the template around the movie grid.
+    :param template: The template HTML.
+    :param title: Homepage title.
+    :return: Tuple (head, tail) - the text before and after the grid placeholder.
+    """
+    html = replace_template_placeholder(template, PH_TITLE, title)
+    head, _, tail = html.partition(PH_MOVIE_GRID)
+    return head, tail
+
+
+def serialize_one_movie(title, data, poster=None):
     """
     Serialize a single movie into an HTML list item.
     :param title: Movie title.
-    :param data: Dictionary with at least keys "year" and "poster_image_url".
+    :param data: Dictionary with at least keys "year" and "poster_image_url"
+        (and "rank" for leaderboard entries).
+    :param poster: Optional local poster {"src", "width", "height"} from the poster store.
     :return: An HTML `<li>` snippet representing the movie.
     """
-    output = "<li>"
-    output += "<div class='movie'>"
-    output += (f"<img class='movie-poster' src='{data.get('poster_image_url', '--')}' "
-               f"alt= 'Poster image not available.'/>")
-    output += f"<div class='movie-title'>{title}</div>"
-    output += f"<div class='movie-year'>{data.get('year')}</div>"
-    output += "</div>"
-    output += "</li>"
-    return output
+    if poster:
+        size = f"width='{poster['width']}' height='{poster['height']}' " if poster.get("width") else ""
+        image = (f"<img class='movie-poster' src='{poster['src']}' {size}loading='lazy' "
+                 f"alt= 'Poster image not available.'/>")
+    else:
+        image = (f"<img class='movie-poster' src='{data.get('poster_image_url', '--')}' "
+                 f"alt= 'Poster image not available.'/>")
+    rank = f"<div class='movie-rank'>#{data['rank']}</div>" if data.get("rank") else ""
+    return ("<li>"
+            "<div class='movie'>"
+            f"{rank}"
+            f"{image}"
+            f"<div class='movie-title'>{title}</div>"
+            f"<div class='movie-year'>{data.get('year')}</div>"
+            "</div>"
+            "</li>")
+
+
+def render_movies(movies_data, posters=None, relative_to=".", chunk_size=WRITE_CHUNK_SIZE):
+    """
+    Lazily serialize movies into `<li>` fragments.
+    :param movies_data: Mapping of title to movie data dictionaries, or an
+        iterable of (title, data) pairs such as `iter_movies()`.
+    :param posters: Optional PosterStore; mirrored posters are referenced locally.
+    :param relative_to: Directory of the page (poster paths are relative to it).
+    :param chunk_size: Movies per batched poster lookup.
+    :return: Generator of HTML fragments.
+    """
+    items = iter(movies_data.items() if hasattr(movies_data, "items") else movies_data)
+    if posters is None:
+        for title, data in items:
+            yield serialize_one_movie(title, data)
+        return
+
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        local = posters.lookup((data.get("poster_image_url") for _, data in chunk), relative_to)
+        for title, data in chunk:
+            yield serialize_one_movie(title, data, local.get(data.get("poster_image_url")))
 
 
 def show_all_movies(movies_data):
     """
     Serialize all movies into one HTML block.
-    :param movies_data: Mapping of title to movie data dictionaries.
+    :param movies_data: Mapping of title to movie data dictionaries, or an
+        iterable of (title, data) pairs such as `iter_movies()`.
     :return: Concatenated `<li>` snippets for all movies.
     """
-    output = ""
-    for title, data in movies_data.items():
-        output += serialize_one_movie(title, data)
-    return output
+    return "".join(render_movies(movies_data))
 
 
 def safe_to_file(text, file_name):
@@ -72,19 +148,391 @@ def safe_to_file(text, file_name):
         fileobj.write(text)
 
 
+@timed("generator.write_streamed")
+def write_streamed(file_name, head, fragments, tail, chunk_size=WRITE_CHUNK_SIZE, previous_hash=None):
+    """
+    Write head, fragments and tail to a file, buffering `chunk_size` fragments per write.
+    The page is written to a temporary file and moved into place at the end,
+    so readers never see a half-written page. If its content hash equals
+    `previous_hash`, the existing file is kept untouched (mtime unchanged).
+    :param file_name: Output file path.
+    :param head: Text before the fragments.
+    :param fragments: Iterable of HTML fragments.
+    :param tail: Text after the fragments.
+    :param chunk_size: Number of fragments joined per write call.
+    :param previous_hash: SHA-256 of the file from the last run, if known.
+    :return: Tuple (fragment count, content hash, whether the file was replaced).
+    """
+    temp_name = f"{file_name}.tmp"
+    digest = hashlib.sha256()
+    fragments = iter(fragments)
+    count = 0
+    with open(temp_name, "w", encoding="utf-8") as fileobj:
+        def write(text):
+            fileobj.write(text)
+            digest.update(text.encode("utf-8"))
+
+        write(head)
+        while True:
+            chunk = list(islice(fragments, chunk_size))
+            if not chunk:
+                break
+            write("".join(chunk))
+            count += len(chunk)
+        write(tail)
+
+    content_hash = digest.hexdigest()
+    if content_hash == previous_hash and os.path.exists(file_name):
+        os.remove(temp_name)
+        return count, content_hash, False
+    os.replace(temp_name, file_name)
+    return count, content_hash, True
+
+
+def page_file_name(output_path, page):
+    """
+    Return the file name of a page: the output path for page 1, page-N.html next to it otherwise.
+    :param output_path: Path of the first page (e.g. static/index.html).
+    :param page: 1-based page number.
+    :return: File path of the page.
+    """
+    if page == 1:
+        return output_path
+    return os.path.join(os.path.dirname(output_path), f"page-{page}.html")
+
+
+def render_pagination(output_path, page, has_next):
+    """
+    Build the navigation links between pages.
+    Only neighbours are linked, so a page does not change when pages are
+    added or removed further away (keeps incremental regeneration cheap).
+    :param output_path: Path of the first page.
+    :param page: Current 1-based page number.
+    :param has_next: Whether a following page exists.
+    :return: HTML `<nav>` snippet, or an empty string for a single page.
+    """
+    if page == 1 and not has_next:
+        return ""
+
+    def link(number, label):
+        return f"<a href='{os.path.basename(page_file_name(output_path, number))}'>{label}</a>"
+
+    parts = []
+    if page > 1:
+        parts.append(link(page - 1, "&laquo; Previous"))
+    parts.append(f"<span>Page {page}</span>")
+    if has_next:
+        parts.append(link(page + 1, "Next &raquo;"))
+    return f"<nav class='pagination'>{''.join(parts)}</nav>"
+
+
+def remove_stale_pages(output_path, page_count):
+    """
+    Delete page-N.html files left over from an earlier run with more pages.
+    :param output_path: Path of the first page.
+    :param page_count: Number of pages written by this run.
+    :return: None
+    """
+    for file_name in glob.glob(os.path.join(os.path.dirname(output_path), "page-*.html")):
+        match = re.fullmatch(r"page-(\d+)\.html", os.path.basename(file_name))
+        if match and int(match.group(1)) > page_count:
+            os.remove(file_name)
+
+
+def manifest_file_name(output_path):
+    """
+    Return the path of the incremental-build manifest next to the output.
+    :param output_path: Path of the first page.
+    :return: Manifest file path.
+    """
+    return os.path.join(os.path.dirname(output_path), ".site_manifest.json")
+
+
+def load_manifest(file_name):
+    """
+    Load the manifest of the previous run.
+    :param file_name: Manifest file path.
+    :return: Manifest dict, or None if missing or unreadable.
+    """
+    try:
+        with open(file_name, "r", encoding="utf-8") as fileobj:
+            return json.load(fileobj)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(file_name, manifest):
+    """
+    Atomically write the manifest.
+    :param file_name: Manifest file path.
+    :param manifest: Dict with "config", "last_version" and "pages".
+    :return: None
+    """
+    with open(f"{file_name}.tmp", "w", encoding="utf-8") as fileobj:
+        json.dump(manifest, fileobj)
+    os.replace(f"{file_name}.tmp", file_name)
+
+
+def write_page(page_items, page, has_next, head, tail, output_path, previous=None, posters=None):
+    """
+    Render one page of a paginated site.
+    :param page_items: List of (title, data) pairs on this page.
+    :param page: 1-based page number.
+    :param has_next: Whether a following page exists.
+    :param head: Template text before the grid.
+    :param tail: Template text after the grid (with the pagination placeholder).
+    :param output_path: Path of the first page.
+    :param previous: Manifest entry of this page from the last run, if any.
+    :param posters: Optional PosterStore for local poster references.
+    :return: Tuple (manifest entry, whether the file was replaced).
+    """
+    file_name = page_file_name(output_path, page)
+    page_tail = replace_template_placeholder(tail, PH_PAGINATION, render_pagination(output_path, page, has_next))
+    fragments = render_movies(page_items, posters, os.path.dirname(output_path))
+    _, content_hash, replaced = write_streamed(file_name, head, fragments, page_tail,
+                                               previous_hash=(previous or {}).get("hash"))
+    ids = [data.get("id") for _, data in page_items]
+    entry = {"file": os.path.basename(file_name), "hash": content_hash,
+             "first_id": ids[0] if ids else None, "last_id": ids[-1] if ids else None}
+    return entry, replaced
+
+
+def write_pages(items, head, tail, output_path, movies_per_page, first_page=1, previous_pages=(), posters=None):
+    """
+    Write consecutive pages of `movies_per_page` movies until `items` runs out.
+    Only one page of movies is held in memory at a time.
+    :param items: Iterator of (title, data) pairs.
+    :param first_page: Number of the first page to write.
+    :param previous_pages: Manifest entries of the last run (indexed by page - 1).
+    :param posters: Optional PosterStore for local poster references.
+    :return: Tuple (list of manifest entries, list of replaced file paths).
+    """
+    entries, replaced_files = [], []
+    page = first_page
+    pending = next(items, None)
+    while True:
+        page_items = [] if pending is None else [pending]
+        page_items.extend(islice(items, movies_per_page - 1))
+        pending = next(items, None)
+        previous = previous_pages[page - 1] if page - 1 < len(previous_pages) else None
+        entry, replaced = write_page(page_items, page, pending is not None, head, tail, output_path, previous,
+                                     posters)
+        entries.append(entry)
+        if replaced:
+            replaced_files.append(page_file_name(output_path, page))
+        if pending is None:
+            return entries, replaced_files
+        page += 1
+
+
+def affected_pages(pages, changes):
+    """
+    Work out which pages of the last run a set of row changes touches.
+    Pages hold consecutive id ranges, and new rows always get higher ids,
+    so inserts only touch the last page.
+    :param pages: Manifest entries of the last run.
+    :param changes: Result of `movie_changes_since()`.
+    :return: Tuple (index of the first page whose content shifts, or None;
+        set of indexes of pages with updated movies before that).
+    """
+    last_ids = [entry["last_id"] for entry in pages]
+    shift_from = None
+    updated = set()
+    for movie_id in changes["changed"]:
+        index = bisect.bisect_left(last_ids, movie_id)
+        if index >= len(pages):
+            shift_from = min(shift_from if shift_from is not None else index, len(pages) - 1)
+        else:
+            updated.add(index)
+    for movie_id in changes["deleted"]:
+        index = bisect.bisect_left(last_ids, movie_id)
+        if index < len(pages):
+            shift_from = min(shift_from if shift_from is not None else index, index)
+    if shift_from is not None:
+        updated = {index for index in updated if index < shift_from}
+    return shift_from, updated
+
+
+@timed("generator.generate_site")
+def generate_site(movies_data=None, template_path=TEMPLATE_PATH, output_path=OUTPUT_PATH,
+                  movies_per_page=MOVIES_PER_PAGE, title=HOMEPAGE_TITLE, incremental=True, posters=None,
+                  refresh=False):
+    """
+    Stream the movie grid into one page, or several pages of `movies_per_page` movies.
+    When rendering from storage, a manifest next to the output records the
+    content hash and id range of every page. The next run asks storage what
+    changed since then and re-renders only the affected pages, and files whose
+    content did not change are not rewritten.
+    :param movies_data: Movies to render (defaults to streaming them from storage).
+    :param template_path: HTML template with title, grid and pagination placeholders.
+    :param output_path: Path of the (first) output page.
+    :param movies_per_page: Movies per page; 0 or None writes a single page.
+    :param title: Homepage title.
+    :param incremental: Reuse the manifest of the last run (storage input only).
+    :param posters: Optional PosterStore; mirrored posters are referenced locally.
+    :param refresh: Re-render every page even without movie changes (e.g. after
+        new posters were mirrored); unchanged files are still not rewritten.
+    :return: List of the file paths that were (re)written.
+    """
+    head, tail = split_template(load_html_template(template_path), title)
+
+    if movies_data is not None:
+        items = iter(movies_data.items() if hasattr(movies_data, "items") else movies_data)
+        if not movies_per_page:
+            write_streamed(output_path, head, render_movies(items, posters, os.path.dirname(output_path)),
+                           replace_template_placeholder(tail, PH_PAGINATION, ""))
+            remove_stale_pages(output_path, 1)
+            return [output_path]
+        entries, replaced_files = write_pages(items, head, tail, output_path, movies_per_page, posters=posters)
+        remove_stale_pages(output_path, len(entries))
+        return replaced_files
+
+    manifest_path = manifest_file_name(output_path)
+    poster_root = os.path.abspath(posters.root) if posters is not None else ""
+    config = hashlib.sha256(f"{head}\0{tail}\0{movies_per_page}\0{poster_root}".encode("utf-8")).hexdigest()
+    manifest = load_manifest(manifest_path) if incremental else None
+    if not manifest or manifest.get("config") != config:
+        manifest = {"config": config, "last_version": None, "pages": []}
+    pages = manifest["pages"]
+
+    # A page without movies (empty catalog) has no id range to place changes in
+    empty_page = movies_per_page and any(entry["last_id"] is None for entry in pages)
+    if manifest.get("last_version") is None or not pages or empty_page or refresh:
+        shift_from, updated = 0, set()
+        version = change_counter()
+    else:
+        changes = movie_changes_since(manifest["last_version"])
+        version = changes["version"]
+        if not changes["changed"] and not changes["deleted"]:
+            return []
+        shift_from, updated = (0, set()) if not movies_per_page else affected_pages(pages, changes)
+
+    replaced_files = []
+    if not movies_per_page:
+        _, content_hash, replaced = write_streamed(
+            output_path, head, render_movies(iter_movies(), posters, os.path.dirname(output_path)),
+            replace_template_placeholder(tail, PH_PAGINATION, ""),
+            previous_hash=pages[0]["hash"] if pages else None)
+        if replaced:
+            replaced_files.append(output_path)
+        new_pages = [{"file": os.path.basename(output_path), "hash": content_hash}]
+    else:
+        new_pages = list(pages)
+        for index in sorted(updated):
+            page_items = list(islice(iter_movies(min_id=pages[index]["first_id"], chunk_size=movies_per_page),
+                                     movies_per_page))
+            new_pages[index], replaced = write_page(page_items, index + 1, index < len(pages) - 1,
+                                                    head, tail, output_path, pages[index], posters)
+            if replaced:
+                replaced_files.append(page_file_name(output_path, index + 1))
+
+        if shift_from is not None:
+            start_id = pages[shift_from]["first_id"] if shift_from < len(pages) else None
+            entries, replaced = write_pages(iter_movies(min_id=start_id), head, tail, output_path,
+                                            movies_per_page, first_page=shift_from + 1, previous_pages=pages,
+                                            posters=posters)
+            new_pages = new_pages[:shift_from] + entries
+            replaced_files.extend(replaced)
+            if shift_from > 0 and entries[0]["first_id"] is None:
+                # Every movie from this page on was deleted: the previous page becomes the last one
+                new_pages = new_pages[:shift_from]
+                replaced_files.remove(page_file_name(output_path, shift_from + 1))
+                index = shift_from - 1
+                page_items = list(islice(iter_movies(min_id=pages[index]["first_id"], chunk_size=movies_per_page),
+                                         movies_per_page))
+                new_pages[index], replaced = write_page(page_items, index + 1, False, head, tail, output_path,
+                                                        pages[index], posters)
+                if replaced:
+                    replaced_files.append(page_file_name(output_path, index + 1))
+        remove_stale_pages(output_path, len(new_pages))
+
+    save_manifest(manifest_path, {"config": config, "last_version": version, "pages": new_pages})
+    return replaced_files
+
+
+@timed("generator.generate_top_page")
+def generate_top_page(output_path=TOP_OUTPUT_PATH, template_path=TEMPLATE_PATH, limit=TOP_N,
+                      title=HOMEPAGE_TITLE, posters=None):
+    """
+    Write the "Top N" leaderboard page from the rating index.
+    The file is only replaced if its content changed.
+    :param output_path: Path of the page.
+    :param template_path: HTML template with title, grid and pagination placeholders.
+    :param limit: Number of movies ranked.
+    :param title: Homepage title (the page is titled "<title> - TOP <limit>").
+    :param posters: Optional PosterStore; mirrored posters are referenced locally.
+    :return: List with the output path if the file was (re)written, else empty.
+    """
+    head, tail = split_template(load_html_template(template_path), f"{title} - TOP {limit}")
+    previous_hash = None
+    if os.path.exists(output_path):
+        with open(output_path, "rb") as fileobj:
+            previous_hash = hashlib.sha256(fileobj.read()).hexdigest()
+    ranking = ((movie["title"], movie) for movie in top_movies(limit))
+    _, _, replaced = write_streamed(output_path, head, render_movies(ranking, posters, os.path.dirname(output_path)),
+                                    replace_template_placeholder(tail, PH_PAGINATION, ""),
+                                    previous_hash=previous_hash)
+    return [output_path] if replaced else []
+
+
+def sync_posters(posters):
+    """
+    Mirror the posters of movies changed since the last sync, plus the
+    mirrored posters due for revalidation. The first sync (or one after the
+    change counter went backwards, e.g. a restored database) covers the
+    whole catalog.
+    :param posters: PosterStore to sync.
+    :return: Dict of sync counts (see `PosterStore.sync`).
+    """
+    since = posters.synced_version()
+    version = change_counter()
+    if since is None or since > version:
+        urls = (data.get("poster_image_url") for _, data in iter_movies())
+    else:
+        changes = movie_changes_since(since)
+        version = changes["version"]
+        urls = poster_urls(changes["changed"])
+    counts = posters.sync(chain(urls, posters.due_urls()))
+    posters.save_synced_version(version)
+    return counts
+
+
+def build_website():
+    """
+    Build the website without printing anything.
+    Mirrors new or stale posters first (when POSTER_MIRROR is enabled), then
+    streams movie data from storage, fills the template placeholders, and
+    writes the rendered page(s) to the output path. Only pages affected by
+    changes since the last run are re-rendered, unless new posters arrived.
+    The "Top N" page is written next to them (unless TOP_OUTPUT_PATH is None).
+    :return: Dict with "files" (rewritten paths) and "posters" (sync counts or None).
+    """
+    posters, counts, refresh = None, None, False
+    if POSTER_MIRROR:
+        from poster_store import PosterStore  # imports requests only when mirroring
+        posters = PosterStore()
+        with timed("generator.poster_sync"):
+            counts = sync_posters(posters)
+        refresh = counts["downloaded"] + counts["deduplicated"] > 0
+    files = generate_site(posters=posters, refresh=refresh)
+    if TOP_OUTPUT_PATH:
+        files += generate_top_page(posters=posters)
+    return {"files": files, "posters": counts}
+
+
 def main():
     """
-    Build and write the final HTML page.
-    Reads movie data, fills the template placeholders, and writes the
-    rendered page to the output path.
+    Build and write the final HTML page(s) and report what was done.
     """
-    movies_data = list_movies()
-    movie_info = show_all_movies(movies_data)
-    html = load_html_template(TEMPLATE_PATH)
-    html_with_title = replace_template_placeholder(html,PH_TITLE, HOMEPAGE_TITLE)
-    final_html = replace_template_placeholder(html_with_title, PH_MOVIE_GRID, movie_info)
-    safe_to_file(final_html, OUTPUT_PATH)
-    print("Website was successfully generated.")
+    result = build_website()
+    counts = result["posters"]
+    if counts is not None:
+        print(f"Posters: {counts['downloaded']} downloaded, {counts['deduplicated']} deduplicated, "
+              f"{counts['not_modified'] + counts['fresh']} up to date, {counts['failed']} failed.")
+    print(f"Website was successfully generated ({len(result['files'])} file(s) updated).")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    enable_from_settings()
+    init_db()
+    main()